@@ -1,3 +1,13 @@
-__all__ = ['Outgoing', 'Incoming', 'All']
+__all__ = ['Outgoing', 'Incoming', 'All', 'unit_of_work']
 
 from neo4jrestclient.client import Incoming, Outgoing, All
+
+
+def unit_of_work():
+    """
+    Return a context manager that defers saving models until the end of its
+    block, then saves them all in one request. See
+    `neo4django.db.models.session`.
+    """
+    from neo4django.db.models.session import UnitOfWork
+    return UnitOfWork()
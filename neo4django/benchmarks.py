@@ -1,8 +1,25 @@
+"""
+A benchmark runner for neo4django.
+
+    python -m neo4django.benchmarks [options] [benchmark names]
+
+Each benchmark is timed over a number of repetitions after warming up, and
+reported with percentiles and the number of Neo4j requests it made per run.
+Results can be saved as JSON and compared against an earlier run.
+
+Responses can be recorded from a live database with `--record` and replayed
+later with `--replay`, so benchmarks can be run (and regressions in request
+counts caught) without Neo4j. Replayed timings only measure client overhead.
+"""
 from inspect import isfunction
+from optparse import OptionParser
 from time import time
-from db import models
+import json
+import sys
 
-import requests
+from neo4django.db import models, connections, DEFAULT_DB_ALIAS
+from neo4django.budget import RequestBudget
+from neo4django.metrics import Histogram
 
 
 ####################
@@ -34,7 +51,7 @@ class Child(models.NodeModel):
         app_label = 'benchmark'
     name = models.StringProperty()
     age = models.IntegerProperty()
-    parents = models.Relationship(Parent, 'CHILD_OF')
+    parents = models.Relationship(Parent, 'CHILD_OF', related_name='children')
 
 
 class Employer(models.NodeModel):
@@ -44,38 +61,90 @@ class Employer(models.NodeModel):
     employees = models.Relationship(Parent, 'EMPLOYS')
 
 
+############
+# FIXTURES #
+############
+
+def simple_models():
+    for i in xrange(100):
+        SimpleModel.objects.create(name=str(i), age=i)
+
+
+def indexed_models():
+    for i in xrange(100):
+        IndexedModel.objects.create(name=str(i), age=i)
+
+
+def fresh_indexed_models():
+    # for benchmarks that change the data, so each run starts the same
+    cleandb()
+    indexed_models()
+
+
+def employers():
+    for i in xrange(10):
+        employer = Employer(name=str(i))
+        employees = [Parent(name=str(x)) for x in xrange(5)]
+        for employee in employees:
+            employee.children = [Child(name=str(x), age=x) for x in xrange(2)]
+        employer.employees = employees
+        employer.save()
+
+
 ##############
 # BENCHMARKS #
 ##############
+# Benchmarks are functions ending in `_benchmark`. Optional attributes-
+#   setup - a fixture function run once, before warming up
+#   per_run_setup - a fixture run before each (untimed) repetition
+#   number - the default number of repetitions
+#   priority - higher priority benchmarks run first
 
 def simple_creation_benchmark():
     for i in xrange(100):
         SimpleModel.objects.create(name=str(i), age=i)
-simple_creation_benchmark.priority = True
+simple_creation_benchmark.priority = 2
 
 
 def indexed_creation_benchmark():
     for i in xrange(100):
         IndexedModel.objects.create(name=str(i), age=i)
-indexed_creation_benchmark.priority = True
+indexed_creation_benchmark.priority = 2
 
 
 def related_creation_benchmark():
-    for i in xrange(100):
-        employer = Employer(name=str(i))
-        employees = [Parent(name=str(x)) for x in xrange(5)]
-        for employee in employees:
-            employee.children = [Child(name=str(x)) for x in xrange(2)]
-        employer.employees = employees
-        employer.save()
-related_creation_benchmark.priority = True
+    employers()
+related_creation_benchmark.priority = 2
+
+
+def indexed_lookup_benchmark():
+    for i in xrange(0, 100, 10):
+        IndexedModel.objects.get(name=str(i))
+indexed_lookup_benchmark.setup = indexed_models
+
+
+def range_query_benchmark():
+    for i in xrange(0, 100, 10):
+        list(IndexedModel.objects.filter(age__gte=i, age__lt=i + 20))
+range_query_benchmark.setup = indexed_models
+
+
+def unindexed_filter_benchmark():
+    for i in xrange(0, 100, 10):
+        list(SimpleModel.objects.filter(age__gte=i, age__lt=i + 20))
+unindexed_filter_benchmark.setup = simple_models
+
+
+def spanning_filter_benchmark():
+    for i in xrange(5):
+        list(Child.objects.filter(parents__name=str(i)))
+spanning_filter_benchmark.setup = employers
 
 
 def get_names_benchmark():
     parents = Parent.objects.all()
     [p.name for p in parents]
-get_names_benchmark.number = 10
-get_names_benchmark.priority = False
+get_names_benchmark.setup = employers
 
 
 def get_related_benchmark():
@@ -83,46 +152,238 @@ def get_related_benchmark():
     for e in employers:
         for p in e.employees.all():
             p.name
-get_related_benchmark.number = 10
-get_related_benchmark.priority = False
+get_related_benchmark.setup = employers
 
 
-def get_select_related_benchmark():
-    employers = Employer.objects.all().select_related()
-    for e in employers:
-        for p in e.employees.all():
-            p.name
-get_select_related_benchmark.number = 10
-get_select_related_benchmark.priority = False
+def select_related_at_depth(depth):
+    def benchmark():
+        for e in Employer.objects.all().select_related(depth=depth):
+            for p in e.employees.all():
+                p.name
+    benchmark.setup = employers
+    return benchmark
 
+select_related_1_benchmark = select_related_at_depth(1)
+select_related_2_benchmark = select_related_at_depth(2)
+select_related_3_benchmark = select_related_at_depth(3)
 
-################
-# BENCHMARKING #
-################
 
-from django.conf import settings
+def count_benchmark():
+    for i in xrange(10):
+        IndexedModel.objects.filter(age__gte=i * 10).count()
+count_benchmark.setup = indexed_models
+
 
+def update_benchmark():
+    IndexedModel.objects.filter(age__lt=50).update(name='updated')
+update_benchmark.setup = indexed_models
 
-def cleandb():
-    host = settings.NEO4J_DATABASES['default']['HOST']
-    port = settings.NEO4J_DATABASES['default']['PORT']
-    key = getattr(settings, 'NEO4J_DELETE_KEY', None)
-    if key:
-        requests.delete('http://%s:%s/cleandb/%s' % (host, port, key))
 
-cleandb()
+def delete_benchmark():
+    IndexedModel.objects.filter(age__lt=50).delete()
+delete_benchmark.per_run_setup = fresh_indexed_models
 
-benchmarks = sorted((f for f in locals().items()
-                     if isfunction(f[1]) and
-                     f[0].endswith('_benchmark')), key=lambda f: -f[1].priority)
-for b in benchmarks:
-    num_runs = getattr(b[1], 'number', 1)
-    #yes, we're using time() for now, since it's io-bound it makes sense
-    start = time()
-    for i in xrange(num_runs):
-        b[1]()
-    end = time()
 
-    print "'%s':%.3f" % (b[0][:-10], (end - start) / num_runs)
+def deep_iteration_benchmark():
+    for e in Employer.objects.all():
+        for p in e.employees.all():
+            for c in p.children.all():
+                c.name
+deep_iteration_benchmark.setup = employers
+
+
+#######################
+# RECORDING/REPLAYING #
+#######################
+
+class ResponseRecorder(object):
+    """
+    Patches the REST client to record responses to a JSON file, or to replay
+    previously recorded responses instead of contacting Neo4j. Responses are
+    keyed by method, url and body, and replayed in the order they were seen.
+    """
+    def __init__(self, filename, replay=False):
+        self.filename = filename
+        self.replay = replay
+        self.responses = {}
+        if replay:
+            with open(filename) as f:
+                self.responses = json.load(f)
+
+    @staticmethod
+    def _key(method, url, data):
+        return '%s %s %s' % (method, url, json.dumps(data, sort_keys=True))
+
+    def install(self):
+        from neo4jrestclient.request import Request
+        self._request_cls = Request
+        self._original = Request.__dict__['_request']
+        recorder = self
+
+        def _request(req, method, url, data={}, headers={}):
+            key = recorder._key(method, url, data)
+            if recorder.replay:
+                return recorder._replay_response(key)
+            response, content = recorder._original(req, method, url, data,
+                                                   headers)
+            recorder.responses.setdefault(key, []).append(
+                (dict(response), content))
+            return response, content
+
+        Request._request = _request
+
+    def _replay_response(self, key):
+        import httplib2
+        try:
+            info, content = self.responses[key].pop(0)
+        except (KeyError, IndexError):
+            raise ValueError('No recorded response for request %s.' % key)
+        return httplib2.Response(info), content
+
+    def uninstall(self):
+        self._request_cls._request = self._original
+        if not self.replay:
+            with open(self.filename, 'w') as f:
+                json.dump(self.responses, f)
+
+
+################
+# BENCHMARKING #
+################
 
-cleandb()
+def all_benchmarks():
+    """
+    Return (name, function) pairs for every benchmark, highest priority first.
+    """
+    found = ((name[:-len('_benchmark')], f)
+             for name, f in globals().items()
+             if isfunction(f) and name.endswith('_benchmark'))
+    return sorted(found, key=lambda b: (-getattr(b[1], 'priority', 0), b[0]))
+
+
+def cleandb(using=DEFAULT_DB_ALIAS):
+    connections[using].cleandb()
+
+
+def measure(func, warmup=1, repetitions=None):
+    """
+    Run a benchmark and return a dict of its timings (in seconds) and the
+    number of Neo4j requests made per run.
+    """
+    cleandb()
+    setup = getattr(func, 'setup', None)
+    per_run_setup = getattr(func, 'per_run_setup', None)
+    if setup is not None:
+        setup()
+    repetitions = repetitions or getattr(func, 'number', 5)
+    timings = Histogram(max_samples=repetitions)
+    requests = Histogram(max_samples=repetitions)
+    for i in xrange(warmup + repetitions):
+        if per_run_setup is not None:
+            per_run_setup()
+        with RequestBudget(max_requests=None, max_repeats=None,
+                           action='warn') as budget:
+            #yes, we're using time(), since it's io-bound it makes sense
+            start = time()
+            func()
+            end = time()
+        if i >= warmup:
+            timings.add(end - start)
+            requests.add(budget.count)
+    result = timings.summary()
+    result['requests'] = requests.summary()['mean']
+    return result
+
+
+def run(names=None, warmup=1, repetitions=None, out=sys.stdout):
+    """
+    Run the named benchmarks (or all of them) and return a dict of results by
+    benchmark name.
+    """
+    benchmarks = all_benchmarks()
+    if names:
+        unknown = set(names) - set(n for n, f in benchmarks)
+        if unknown:
+            raise ValueError('Unknown benchmarks: %s' % ', '.join(unknown))
+        benchmarks = [(n, f) for n, f in benchmarks if n in names]
+    results = {}
+    try:
+        for name, func in benchmarks:
+            results[name] = result = measure(func, warmup, repetitions)
+            out.write('%-28s mean %.3fs  p50 %.3fs  p90 %.3fs  '
+                      'requests %.1f\n' % (name, result['mean'], result['p50'],
+                                           result['p90'], result['requests']))
+    finally:
+        cleandb()
+    return results
+
+
+def compare(results, baseline, threshold=0.1, out=sys.stdout):
+    """
+    Write the change in mean time and requests per run from a baseline, and
+    return the names of benchmarks that regressed by more than `threshold`.
+    """
+    regressions = []
+    for name in sorted(results):
+        if name not in baseline:
+            continue
+        new, old = results[name], baseline[name]
+        time_change = (new['mean'] - old['mean']) / old['mean'] \
+                if old['mean'] else 0
+        flag = ''
+        if time_change > threshold or new['requests'] > old['requests']:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        out.write('%-28s time %+.1f%%  requests %.1f -> %.1f%s\n' %
+                  (name, time_change * 100, old['requests'], new['requests'],
+                   flag))
+    return regressions
+
+
+def main(argv=None):
+    parser = OptionParser(usage='%prog [options] [benchmark names]')
+    parser.add_option('-w', '--warmup', type='int', default=1,
+                      help='untimed runs before timing each benchmark')
+    parser.add_option('-n', '--repetitions', type='int', default=None,
+                      help='timed runs of each benchmark')
+    parser.add_option('-o', '--output', help='save results to a JSON file')
+    parser.add_option('-c', '--compare',
+                      help='compare against results saved by --output')
+    parser.add_option('-t', '--threshold', type='float', default=0.1,
+                      help='fractional slowdown reported as a regression')
+    parser.add_option('--record', help='record Neo4j responses to a file')
+    parser.add_option('--replay',
+                      help='replay Neo4j responses recorded with --record')
+    parser.add_option('-l', '--list', action='store_true',
+                      help='list the available benchmarks')
+    options, names = parser.parse_args(argv)
+
+    if options.list:
+        for name, func in all_benchmarks():
+            print name
+        return 0
+
+    recorder = None
+    if options.record or options.replay:
+        recorder = ResponseRecorder(options.replay or options.record,
+                                    replay=bool(options.replay))
+        recorder.install()
+    try:
+        results = run(names, warmup=options.warmup,
+                      repetitions=options.repetitions)
+    finally:
+        if recorder is not None:
+            recorder.uninstall()
+
+    if options.output:
+        with open(options.output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if options.compare:
+        with open(options.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, options.threshold):
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,158 @@
+"""
+Request budgets- count the Neo4j requests made by a block of code, and catch
+repeated queries (like the N+1 pattern from loading related objects one at a
+time) before they reach production.
+
+    from neo4django.budget import RequestBudget
+
+    with RequestBudget(max_requests=20) as budget:
+        ...
+    print budget.summary()
+
+Budgets only count requests made by the current thread, so they're safe to use
+in threaded servers- see `neo4django.middleware.RequestBudgetMiddleware`.
+
+Defaults come from the following settings:
+
+    `NEO4DJANGO_REQUEST_BUDGET` - the number of requests allowed, or None.
+    `NEO4DJANGO_REPEATED_REQUEST_THRESHOLD` - how many times a single query
+        fingerprint can be seen before being reported as repeated (default 10).
+    `NEO4DJANGO_REQUEST_BUDGET_ACTION` - 'warn' to log exceeded budgets, or
+        'raise' to raise `RequestBudgetExceeded` (default 'warn').
+"""
+import logging
+import threading
+
+from collections import defaultdict
+
+from django.conf import settings as _settings
+from django.db.models.fields import NOT_PROVIDED
+
+from .exceptions import RequestBudgetExceeded
+from . import metrics
+
+WARN, RAISE = 'warn', 'raise'
+
+logger = logging.getLogger('neo4django.budget')
+
+_local = threading.local()
+_callback_lock = threading.Lock()
+_callback_registered = False
+
+
+def _budget_stack():
+    try:
+        return _local.budgets
+    except AttributeError:
+        _local.budgets = stack = []
+        return stack
+
+
+def _count_request(req, method, url, data, headers):
+    stack = _budget_stack()
+    if not stack:
+        return
+    op = metrics.current_operation()
+    fingerprint = ((op.fingerprint if op is not None else None) or
+                   metrics.request_fingerprint(method, url, data))
+    label = op.label if op is not None else None
+    for budget in list(stack):
+        budget.record(fingerprint, label)
+
+
+def _register_callback():
+    global _callback_registered
+    with _callback_lock:
+        if not _callback_registered:
+            from .db import Neo4djangoRequest
+            Neo4djangoRequest.register_pre_request_callback(_count_request)
+            _callback_registered = True
+
+
+class RequestBudget(object):
+    """
+    A context manager counting the Neo4j requests made by this thread, and how
+    often each query fingerprint repeats. Budgets can be nested- requests count
+    toward each enclosing budget.
+    """
+    def __init__(self, max_requests=NOT_PROVIDED, max_repeats=NOT_PROVIDED,
+                 action=None, name=None):
+        # limits default to the settings, while None means no limit
+        if max_requests is NOT_PROVIDED:
+            max_requests = getattr(_settings, 'NEO4DJANGO_REQUEST_BUDGET',
+                                   None)
+        if max_repeats is NOT_PROVIDED:
+            max_repeats = getattr(_settings,
+                                  'NEO4DJANGO_REPEATED_REQUEST_THRESHOLD', 10)
+        if action is None:
+            action = getattr(_settings, 'NEO4DJANGO_REQUEST_BUDGET_ACTION',
+                             WARN)
+        if action not in (WARN, RAISE):
+            raise ValueError("A request budget action must be '%s' or '%s'."
+                             % (WARN, RAISE))
+        self.max_requests = max_requests
+        self.max_repeats = max_repeats
+        self.action = action
+        self.name = name
+        self.count = 0
+        self.fingerprints = defaultdict(int)
+        self.labels = {}
+
+    def __enter__(self):
+        _register_callback()
+        _budget_stack().append(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _budget_stack().remove(self)
+        if exc_type is not None:
+            return
+        if self.exceeded or self.repeated():
+            logger.warning(self.summary(), extra={'budget': self})
+        else:
+            logger.debug(self.summary(), extra={'budget': self})
+
+    def record(self, fingerprint, label=None):
+        """
+        Count a request. If the budget is set to raise, this will raise a
+        `RequestBudgetExceeded` as soon as the budget is exceeded.
+        """
+        self.count += 1
+        self.fingerprints[fingerprint] += 1
+        if label is not None:
+            self.labels[fingerprint] = label
+        if self.action == RAISE:
+            if self.max_requests is not None and self.count > self.max_requests:
+                raise RequestBudgetExceeded(self.summary())
+            if (self.max_repeats is not None and
+                self.fingerprints[fingerprint] > self.max_repeats):
+                raise RequestBudgetExceeded(self.summary())
+
+    @property
+    def exceeded(self):
+        return self.max_requests is not None and self.count > self.max_requests
+
+    def repeated(self):
+        """
+        Return (fingerprint, operation label, count) triples for fingerprints
+        seen more than `max_repeats` times, most repeated first.
+        """
+        if self.max_repeats is None:
+            return []
+        return sorted(((fp, self.labels.get(fp, None), count)
+                       for fp, count in self.fingerprints.iteritems()
+                       if count > self.max_repeats),
+                      key=lambda r: r[2], reverse=True)
+
+    def summary(self):
+        parts = ['%d Neo4j requests' % self.count]
+        if self.name:
+            parts[0] += ' for %s' % self.name
+        if self.max_requests is not None:
+            parts.append('budget %d' % self.max_requests)
+        repeated = self.repeated()
+        if repeated:
+            parts.append('repeated: ' + ', '.join(
+                '%s x%d' % (label or fp, count)
+                for fp, label, count in repeated))
+        return '; '.join(parts)
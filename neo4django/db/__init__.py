@@ -3,10 +3,10 @@ __all__ = ['connection', 'connections', 'DEFAULT_DB_ALIAS']
 from django.conf import settings as _settings
 from django.core import exceptions
 from neo4jrestclient import client as _client
-from time import time as _time
 
 from ..utils import ConnectionHandler, StubbornDict
 from ..constants import VERSION
+from .. import metrics as _metrics
 
 
 # patch the client request for a different User-Agent header
@@ -29,6 +29,9 @@ class Neo4djangoRequest(_client.Request):
         Register a callback to be called after each request is executed. The
         callback should take a neo4jrestclient.Request as its first argument,
         followed by the request method, url, a data dict, and a headers dict.
+
+        The request's `response`, `content` and `request_size` attributes will
+        be set, or `error` if the request raised an exception.
         """
         cls._post_request_callbacks.append(callback)
 
@@ -57,38 +60,32 @@ class Neo4djangoRequest(_client.Request):
         for callback in self._pre_request_callbacks:
             callback(self, method, url, data, headers)
         #create the actual request
-        request = super(Neo4djangoRequest, self)._request(method, url, data,
-                                                          headers)
-        #call all post-request callbacks
+        self.response = self.content = self.error = None
+        try:
+            request = super(Neo4djangoRequest, self)._request(method, url,
+                                                              data, headers)
+        except Exception, e:
+            self.error = e
+            self._call_post_request_callbacks(method, url, data, headers)
+            raise
+        self.response, self.content = request
+        self._call_post_request_callbacks(method, url, data, headers)
+        return request
+
+    def _call_post_request_callbacks(self, method, url, data, headers):
         for callback in self._post_request_callbacks:
             callback(self, method, url, data, headers)
-        return request
+
+    def _json_encode(self, data, ensure_ascii=False):
+        # keep the size of the encoded body around for metrics
+        body = super(Neo4djangoRequest, self)._json_encode(
+            data, ensure_ascii=ensure_ascii)
+        self.request_size = len(body)
+        return body
 
 _client.Request = Neo4djangoRequest
 
-if getattr(_settings, 'NEO4DJANGO_PROFILE_REQUESTS', False):
-    #add profiling callbacks
-    profiling_data = {'last_print_time': _time()}
-
-    def start_timer(req, method, url, data, *args):
-        from sys import stdout
-        new_time = _time()
-        time_diff_between_calls = new_time - profiling_data['last_print_time']
-        print "after %0.3f seconds..." % time_diff_between_calls
-        profiling_data['last_print_time'] = new_time
-        print "{0} {1}".format(method.upper(), url)
-        if isinstance(data, (dict, basestring, int)):
-            print data
-        else:
-            print [d.items() for d in data]
-        stdout.flush()
-
-    def stop_timer(*args):
-        time_diff = _time() - profiling_data['last_print_time']
-        print "took %0.3f seconds..." % time_diff
-
-    _client.Request.register_pre_request_callback(start_timer)
-    _client.Request.register_post_request_callback(stop_timer)
+_metrics.install_from_settings(Neo4djangoRequest)
 
 DEFAULT_DB_ALIAS = 'default'
 
@@ -1,6 +1,5 @@
 from django.db import models as dj_models
 from django.db.models import signals
-from django.conf import settings
 
 import neo4jrestclient.client as neo_client
 import neo4jrestclient.constants as neo_constants
@@ -10,10 +9,11 @@ from neo4django.exceptions import NoSuchDatabaseError
 from neo4django.decorators import (not_implemented,
                                    alters_data,
                                    transactional,
-                                   not_supported,
-                                   memoized)
+                                   not_supported)
+from neo4django.metrics import instrumented, model_label
 
 from .manager import NodeModelManager
+from .session import current_unit_of_work
 
 import inspect
 import itertools
@@ -186,6 +186,8 @@ class NodeModel(NeoModel):
             else:
                 val = all_properties[key].get_default()
             setattr(instance, key, val)
+        #nothing has changed since loading
+        instance._clear_changed_properties(instance)
 
         return instance
 
@@ -247,11 +249,12 @@ class NodeModel(NeoModel):
         return new_model
 
     @classmethod
-    def index(cls, using=DEFAULT_DB_ALIAS):
-        if cls in cls._indexes and using in cls._indexes[cls]:
-            return cls._indexes[cls][using]
+    def index(cls, using=DEFAULT_DB_ALIAS, index_type='fulltext'):
+        key = using if index_type == 'fulltext' else (using, index_type)
+        if cls in cls._indexes and key in cls._indexes[cls]:
+            return cls._indexes[cls][key]
 
-        index_name = cls.index_name(using)
+        index_name = cls.index_name(using, index_type)
         conn = connections[using]
 
         def get_index(name):
@@ -262,15 +265,15 @@ class NodeModel(NeoModel):
             try:
                 index = conn.nodes.indexes.get(index_name)
             except:
-                index = conn.nodes.indexes.create(index_name, type='fulltext')
+                index = conn.nodes.indexes.create(index_name, type=index_type)
             index.__hash__ = _hash_.__get__(index, neo_client.Index)
             return index
-        cls._indexes[cls][using] = index = get_index(index_name)
+        cls._indexes[cls][key] = index = get_index(index_name)
 
         return index
 
     @classmethod
-    def index_name(cls, using=DEFAULT_DB_ALIAS):
+    def index_name(cls, using=DEFAULT_DB_ALIAS, index_type='fulltext'):
         if cls in cls._indexes:
             if using in cls._indexes:
                 return cls._indexes[cls][using]
@@ -284,27 +287,48 @@ class NodeModel(NeoModel):
             raise NotImplementedError('Indexing a base NodeModel is not '
                                       'implemented.')
         elif len(model_parents) > 1:
-            return model_parents[-1].index_name(using=using)
+            return model_parents[-1].index_name(using=using,
+                                                index_type=index_type)
 
-        return"{0}-{1}".format(cls._meta.app_label, cls.__name__,)
+        name = "{0}-{1}".format(cls._meta.app_label, cls.__name__,)
+        #the server tells exact indexes apart by name
+        if index_type != 'fulltext':
+            name = '{0}-{1}'.format(name, index_type)
+        return name
 
     @property
     def connection(self):
         return connections[self.using]
 
     @alters_data
+    @instrumented(lambda self: model_label(type(self), 'delete'))
     @transactional
     def delete(self):
         if self.__node is None:
             raise ValueError("Unsaved nodes can't be deleted.")
-        for rel in self.__node.relationships.all():
-            rel.delete()
         cls = self.__class__
         signals.pre_delete.send(sender=cls, instance=self, using=self.using)
-        self.__node.delete()
+        #remove the node, its relationships and index entries in one request
+        self.connection.gremlin(
+            'results = Neo4Django.deleteNodes(ids, indexName, batchSize)',
+            ids=[self.id], indexName=cls.index_name(self.using), batchSize=1)
         signals.post_delete.send(sender=cls, instance=self, using=self.using)
+        from .relationships import forget_deleted
+        forget_deleted(cls, self)
         self.__node = None
 
+    def _forget_node(self):
+        """
+        Detach this instance from its node after it's been deleted elsewhere.
+        """
+        self.__node = None
+
+    def _set_node(self, node):
+        """
+        Attach this instance to a node created elsewhere.
+        """
+        self.__node = node
+
     @alters_data
     @not_implemented
     @transactional
@@ -325,6 +349,7 @@ class NodeModel(NeoModel):
         return super(NodeModel, self).save(using=using, **kwargs)
 
     @alters_data
+    @instrumented(lambda self, *args, **kwargs: model_label(type(self), 'save'))
     #@transactional
     def save_base(self, raw=False, cls=None, origin=None,
                   force_insert=False, force_update=False,
@@ -335,6 +360,13 @@ class NodeModel(NeoModel):
 
         if cls is None:
             cls = self.__class__
+
+        work = current_unit_of_work()
+        if work is not None:
+            # saved when the unit of work ends
+            work.add(self, cls=cls, raw=raw)
+            return
+
         signals.pre_save.send(sender=cls, instance=self, raw=raw, using=using)
 
         is_new = self.id is None
@@ -350,25 +382,55 @@ class NodeModel(NeoModel):
     def _save_neo4j_node(self, using):
         #if the node hasn't been created, do that
         if self.id is None:
-            #TODO #244, batch optimization
-            #get all the type props, in case a new type node needs to be created
-            type_hier_props = [{'app_label': t._meta.app_label,
-                                'model_name': t.__name__} for t in self._concrete_type_chain()]
-            type_hier_props = list(reversed(type_hier_props))
-            #get all the names of all types, including abstract, for indexing
-            type_names_to_index = [t._type_name() for t in type(self).mro()
-                                   if (issubclass(t, NodeModel) and t is not NodeModel)]
+            #resolve the type node once, so creates only need to send its id
+            self._type_node(using)
+            type_node, index_name, type_names = self._node_creation_params(using)
             script = '''
-            node = Neo4Django.createNodeWithTypes(types)
+            node = Neo4Django.createNodeOfType(typeNode)
             Neo4Django.indexNodeAsTypes(node, indexName, typesToIndex)
             results = node
             '''
             conn = connections[using]
-            self.__node = conn.gremlin_tx(script, types=type_hier_props,
-                                          indexName=self.index_name(),
-                                          typesToIndex=type_names_to_index)
+            self.__node = conn.gremlin_tx(script, typeNode=type_node,
+                                          indexName=index_name,
+                                          typesToIndex=type_names)
         return self.__node
 
+    def _node_creation_params(self, using):
+        """
+        Returns the type node reference, index name and type names to index
+        needed to create a node for this instance.
+        """
+        return [self._type_node_ref(using), self.index_name(using),
+                self._type_names_to_index()]
+
+    @classmethod
+    def _type_names_to_index(cls):
+        """
+        Returns the names of all types, including abstract, that nodes of this
+        model are indexed as.
+        """
+        return [t._type_name() for t in cls.mro()
+                if (issubclass(t, NodeModel) and t is not NodeModel)]
+
+    def _index_entries(self, index_type='fulltext'):
+        """
+        Returns (key, values) pairs for each property of this instance indexed
+        in the given type of index. Keys derived from indexed properties are
+        all in the exact index.
+        """
+        from .properties import BoundProperty
+        properties = BoundProperty._all_properties_for(self)
+        entries = []
+        for key, prop in sorted(properties.items()):
+            if prop.indexed:
+                value = getattr(self, prop.attname)
+                if prop.index_type == index_type:
+                    entries.append((key, prop.index_values(value)))
+                if index_type == 'exact':
+                    entries.extend(prop.derived_index_entries(value))
+        return entries
+
     @classmethod
     def _concrete_type_chain(cls):
         """
@@ -388,37 +450,56 @@ class NodeModel(NeoModel):
                     yield cur_cls
         return itertools.chain([cls], model_parents(cls))
 
-    #XXX: conditionally memoized classmethod
-    def __type_node(cls, using):
+    @classmethod
+    def _type_hierarchy(cls):
+        """
+        Returns the app label and model name of each of this model's concrete
+        ancestors, oldest first, identifying its type node.
+        """
+        return [{'app_label': t._meta.app_label, 'model_name': t.__name__}
+                for t in reversed(list(cls._concrete_type_chain()))]
+
+    @classmethod
+    def _type_node_key(cls):
+        return tuple((t['app_label'], t['model_name'])
+                     for t in cls._type_hierarchy())
+
+    @classmethod
+    def _type_node(cls, using):
+        """
+        Returns this model's type node, creating it if needed. Type nodes are
+        cached per connection until the database is cleaned.
+        """
         conn = connections[using]
-        name = cls.__name__
+        type_nodes = conn.caches.setdefault('type_nodes', {})
+        key = cls._type_node_key()
+        if key in type_nodes:
+            return type_nodes[key]
 
-        type_hier_props = [{'app_label': t._meta.app_label, 'model_name': t.__name__}
-                           for t in cls._concrete_type_chain()]
-        type_hier_props = list(reversed(type_hier_props))
         script = "results = Neo4Django.getTypeNode(types)"
-        error_message = 'The type node for class %s could not be created in the database.' % name
+        error_message = ('The type node for class %s could not be created in '
+                         'the database.' % cls.__name__)
         try:
-            script_rv = conn.gremlin_tx(script, types=type_hier_props)
+            script_rv = conn.gremlin_tx(script, types=cls._type_hierarchy())
         except Exception, e:
             raise RuntimeError(error_message, e)
         if not hasattr(script_rv, 'properties'):
             raise RuntimeError(error_message + '\n\n%s' % script_rv)
+        type_nodes[key] = script_rv
         return script_rv
 
-    __type_node_memoized = classmethod(memoized(__type_node))
-    __type_node_classmethod = classmethod(__type_node)
-
     @classmethod
-    def _type_node(cls, using):
+    def _type_node_ref(cls, using):
         """
-        Switch between memoized and classmethod when attribute is accessed
+        Returns a reference to this model's type node for Gremlin scripts-
+        its id if it's been cached, otherwise the type hierarchy, so scripts
+        creating nodes don't need a separate request to find the type node.
         """
-        if not (settings.DEBUG or
-                getattr(settings, 'RUNNING_NEO4J_TESTS', None)):
-            return cls.__type_node_memoized(using)
-        else:
-            return cls.__type_node_classmethod(using)
+        type_nodes = connections[using].caches.get('type_nodes', {})
+        type_node = type_nodes.get(cls._type_node_key())
+        if type_node is not None:
+            return type_node.id
+        return cls._type_hierarchy()
 
     @classmethod
     def _type_name(cls):
@@ -428,7 +509,7 @@ class NodeModel(NeoModel):
     def _root_type_node(cls, using):
         #TODO consider moving to inferring this from the python inheritance
         #tree, not from the graph structure
-        type_node = cls._type_node(cls, using)
+        type_node = cls._type_node(using)
         traversal = type_node.traverse(
             types=[neo_client.Incoming.get('<<TYPE>>')],
             uniqueness=neo_constants.NODE_GLOBAL,
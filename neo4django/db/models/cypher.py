@@ -201,6 +201,22 @@ class ColumnExpression(Cypher):
         return not_none([self.column])
 
 
+class IdExpression(Cypher):
+    """
+    The id of a node or relationship column, as in `ID(n)`.
+    """
+
+    def __init__(self, column):
+        self.column = column
+
+    def as_cypher(self):
+        return u'ID(%s)' % cypher_escape_identifier(self.column)
+
+    @property
+    def required_identifiers(self):
+        return [self.column]
+
+
 class OrderByTerm(Cypher):
     """ An expression used in an ORDER BY clause."""
 
@@ -299,12 +315,14 @@ class Match(Clause):
     
 
 class With(Clause):
-    cypher_template = 'WITH %(fields)s %(order_by)s %(limit)s %(match)s %(where)s'
+    cypher_template = 'WITH %(fields)s %(order_by)s %(skip)s %(limit)s %(match)s %(where)s'
 
-    def __init__(self, field_dict, order_by=None, limit=None, where=None, match=None):
+    def __init__(self, field_dict, order_by=None, limit=None, where=None,
+                 match=None, skip=None):
         self.field_dict = field_dict
         self.order_by = order_by
         self.limit = limit
+        self.skip = skip
         self.where = where
         self.match = match
 
@@ -313,6 +331,7 @@ class With(Clause):
             'fields': ','.join('%s AS %s' % (alias, field)
                                for alias, field in self.field_dict.iteritems()),
             'order_by':unicode(self.order_by) if self.order_by else '',
+            'skip': 'SKIP %d' % self.skip if self.skip else '',
             'limit': 'LIMIT %s' % str(self.limit)
                      if self.limit is not None else '',
             'match': ((self.match.as_cypher() if hasattr(self.match, 'as_cypher')
@@ -44,3 +44,18 @@ class NodeModelManager(models.Manager):
 
     def filter(self, *args, **kwargs):
         return self.get_query_set().filter(*args, **kwargs)
+
+    def after(self, *args, **kwargs):
+        return self.get_query_set().after(*args, **kwargs)
+
+    def cursor(self, *args, **kwargs):
+        return self.get_query_set().cursor(*args, **kwargs)
+
+    def traverse(self, *args, **kwargs):
+        return self.get_query_set().traverse(*args, **kwargs)
+
+    def shortest_path(self, *args, **kwargs):
+        return self.get_query_set().shortest_path(*args, **kwargs)
+
+    def all_shortest_paths(self, *args, **kwargs):
+        return self.get_query_set().all_shortest_paths(*args, **kwargs)
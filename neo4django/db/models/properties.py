@@ -23,6 +23,7 @@ from neo4django.validators import (validate_array,
 from neo4django.utils import AttrRouter, write_through
 from neo4django.decorators import borrows_methods
 from neo4django.constants import ERROR_ATTR
+from .sequences import next_auto_value
 
 MIN_INT = -9223372036854775808
 MAX_INT = 9223372036854775807
@@ -39,6 +40,20 @@ class Property(object):
     __metaclass__ = ABCMeta
 
     default_validators = []  # Default set of validators
+
+    # whether each value is indexed as a single term ordered like the values
+    # themselves, so index hits can be sorted by Lucene
+    indexed_sortable = False
+    # whether to_neo_index terms can't be range queried (eg, they're
+    # tokenized), so to_neo_range_index terms are kept under '<name>.range'
+    # in the exact index
+    separate_range_key = False
+    # Lucene range queries (prior to 4.0) can't be open-ended, so gt/lt
+    # queries are bounded by these, which sort outside every range term
+    INDEX_MIN = u'!'
+    INDEX_MAX = u'~'
+    indexed_lowercase = False
+    indexed_reversed = False
     default_error_messages = {
         'invalid_choice': _(u'Value %r is not a valid choice.'),
         'null': _(u'This property cannot be null.'),
@@ -48,12 +63,15 @@ class Property(object):
     def __init__(self, verbose_name=None, name=None, help_text=None,
                  indexed=False, indexed_fulltext=False, indexed_range=False,
                  indexed_by_member=False, has_own_index=False, unique=False,
+                 index_type='fulltext',
                  editable=True, null=True, blank=True, validators=[],
                  choices=None, error_messages=None, required=False,
                  serialize=True, auto=False, metadata={},
                  auto_default=NOT_PROVIDED, default=NOT_PROVIDED, **kwargs):
         if unique and not indexed:
             raise ValueError('A unique property must be indexed.')
+        if index_type not in ('fulltext', 'exact'):
+            raise ValueError("index_type should be 'fulltext' or 'exact'.")
         if auto and auto_default == NOT_PROVIDED:
             raise ValueError('Properties with auto=True should also set an '
                              'auto_default.')
@@ -62,6 +80,7 @@ class Property(object):
         self.indexed_range = indexed_range
         self.indexed_by_member = indexed_by_member
         self.has_own_index = has_own_index
+        self.index_type = index_type
         self.unique = unique
         # we don't support this uniqueness granularity
         self.unique_for_date = False
@@ -148,6 +167,27 @@ class Property(object):
         """
         return self.to_neo(value)
 
+    def to_neo_range_index(self, value):
+        """
+        Convert a Python value to the term used for range queries, which
+        should be ASCII, without whitespace, and ordered like the values. By
+        default this is the to_neo_index() term.
+        """
+        return self.to_neo_index(value)
+
+    def derived_index_keys(self):
+        """
+        Return a dict of key suffix to a function converting a Python value to
+        its term, for each index key derived from this property. Nodes are
+        indexed under '<name>.<suffix>' for each, besides the property's own
+        key, in the model's exact index- the fulltext tokenizer would split
+        long terms.
+        """
+        keys = {}
+        if self.indexed_range and self.separate_range_key:
+            keys['range'] = self.to_neo_range_index
+        return keys
+
     def get_internal_type(self):
         """
         Returns the "internal" type of an object which instructs API handlers
@@ -260,8 +300,14 @@ class BoundProperty(AttrRouter):
                      'indexed',
                      'db_index',
                      'indexed_fulltext',
+                     'index_type',
                      'indexed_range',
                      'indexed_by_member',
+                     'indexed_sortable',
+                     'separate_range_key',
+                     'indexed_lowercase',
+                     'indexed_reversed',
+                     'derived_index_keys',
                      'get_internal_type',
                      'unique',
                      'help_text',
@@ -269,6 +315,7 @@ class BoundProperty(AttrRouter):
                      'to_neo',
                      'to_neo_index',
                      'to_neo_index_gremlin',
+                     'to_neo_range_index',
                      'member_to_neo_index',
                      'from_python',
                      'from_neo',
@@ -288,6 +335,8 @@ class BoundProperty(AttrRouter):
                      'meta',
                      'MAX',
                      'MIN',
+                     'INDEX_MAX',
+                     'INDEX_MIN',
                      'get_internal_type',
                      'help_text',
                      'null',
@@ -333,6 +382,15 @@ class BoundProperty(AttrRouter):
                 instance._prop_values = values
         return values
 
+    @staticmethod
+    def _changed_of(instance):
+        #names of properties set since the instance was loaded or saved
+        try:
+            changed = instance._changed_props
+        except:
+            changed = instance._changed_props = set()
+        return changed
+
     @staticmethod
     def _properties_for(obj_or_cls):
         meta = obj_or_cls._meta
@@ -359,13 +417,60 @@ class BoundProperty(AttrRouter):
         if not (self.indexed or self.auto):
             raise TypeError("'%s' is not indexed" % (self.__propname,))
         else:
-            return self.__class.index(using)
+            return self.__class.index(using, self.index_type)
 
     def index_name(self, using):
         if not (self.indexed or self.auto):
             raise TypeError("'%s' is not indexed" % (self.__propname,))
         else:
-            return self.__class.index_name(using)
+            return self.__class.index_name(using, self.index_type)
+
+    def index_values(self, value):
+        """
+        Return the values a node should be indexed under for a python value of
+        this property, including each member for properties indexed by member.
+        """
+        if value is None:
+            return []
+        indexed = [self.to_neo_index(value)]
+        if self.indexed_by_member:
+            indexed.extend(self.member_to_neo_index(m)
+                           for m in self.to_neo(value))
+        return [v for v in indexed if v is not None]
+
+    def derived_index_name(self, using):
+        if not (self.indexed or self.auto):
+            raise TypeError("'%s' is not indexed" % (self.__propname,))
+        else:
+            return self.__class.index_name(using, 'exact')
+
+    def derived_index_key(self, suffix):
+        return '%s.%s' % (self.attname, suffix)
+
+    def range_index_key(self):
+        """
+        Return the index key range queries on this property should use.
+        """
+        if self.separate_range_key:
+            return self.derived_index_key('range')
+        return self.attname
+
+    def range_index_name(self, using):
+        """
+        Return the name of the index holding the range_index_key() terms.
+        """
+        if self.separate_range_key:
+            return self.derived_index_name(using)
+        return self.index_name(using)
+
+    def derived_index_entries(self, value):
+        """
+        Return (key, values) pairs for index keys derived from this property,
+        besides its own, for a python value.
+        """
+        return [(self.derived_index_key(suffix),
+                 [] if value is None else [to_term(value)])
+                for suffix, to_term in sorted(self.derived_index_keys().items())]
 
     #update the state of the model instance based on a rest client element property dictionary
     def _update_values_from_dict(instance, new_val_dict, clear=False):
@@ -388,23 +493,36 @@ class BoundProperty(AttrRouter):
     NodeModel._update_values_from_dict = staticmethod(_update_values_from_dict)
     del _update_values_from_dict
 
-    def _save_(instance, node, node_is_new):
+    def _clear_changed_properties(instance):
+        BoundProperty._changed_of(instance).clear()
+
+    NodeModel._clear_changed_properties = staticmethod(_clear_changed_properties)
+    del _clear_changed_properties
+
+    def _property_map(instance, node, node_is_new):
+        #builds the property map sent to Neo4Django.updateNodeProperties
         values = BoundProperty._values_of(instance)
         properties = BoundProperty._all_properties_for(instance)
+        changed = BoundProperty._changed_of(instance)
 
         gremlin_props = {}
         for key, prop in properties.items():
+            #only send properties that have changed, or might have- those
+            #that get values on save, or mutable values changed in place
+            if not (node_is_new or key in changed or
+                    (prop.auto and values.get(key, None) is None) or
+                    getattr(prop._property, 'auto_now', False) or
+                    isinstance(values.get(key, None), (list, dict))):
+                continue
             prop_class = prop.__class
             prop_dict = gremlin_props[key] = {}
             if prop.auto and values.get(key, None) is None:
-                prop_dict['auto_increment'] = True
-                prop_dict['increment_func'] = prop.next_value_gremlin
-                prop_dict['auto_default'] = prop.auto_default
-                prop_dict['auto_abstract'] = prop_class._meta.abstract
-                prop_dict['auto_app_label'] = prop_class._meta.app_label
-                prop_dict['auto_model'] = prop_class.__name__
+                values[key] = next_auto_value(prop, prop_class, instance)
+                changed.add(key)
             if prop.indexed:
                 prop_dict['index_name'] = prop.index_name(instance.using)
+                prop_dict['derived_index_name'] = \
+                        prop.derived_index_name(instance.using)
                 if hasattr(prop, 'to_neo_index_gremlin'):
                     prop_dict['to_index_func'] = prop.to_neo_index_gremlin
             if key in values:
@@ -424,15 +542,16 @@ class BoundProperty(AttrRouter):
                         if prop.indexed_by_member:
                             for m in value:
                                 indexed_values.append(prop.member_to_neo_index(m))
+                    prop_dict['derived_index_entries'] = \
+                            prop.derived_index_entries(values[key])
                 values[key] = value
-        script = '''
-        node=g.v(nodeId);
-        results = Neo4Django.updateNodeProperties(node, propMap);
-        '''
-        conn = connections[instance.using]
-        script_rv = conn.gremlin_tx(script, nodeId=instance.id,
-                                    propMap=gremlin_props, raw=True)
+        return gremlin_props
 
+    NodeModel._property_map = staticmethod(_property_map)
+    del _property_map
+
+    def _apply_saved_properties(instance, script_rv):
+        #updates the instance from the result of updateNodeProperties
         if (isinstance(script_rv, dict) and ERROR_ATTR in script_rv and 'property' in script_rv):
             raise ValueError("Duplicate index entries for <%s>.%s" %
                              (instance.__class__.__name__, script_rv['property']))
@@ -440,10 +559,27 @@ class BoundProperty(AttrRouter):
             #returned a node (TODO #128 error passing generalization)
             NodeModel._update_values_from_dict(instance, script_rv['data'],
                                                clear=True)
+            NodeModel._clear_changed_properties(instance)
         else:
             raise ValueError('Unexpected response from server: %s' %
                              str(script_rv))
 
+    NodeModel._apply_saved_properties = staticmethod(_apply_saved_properties)
+    del _apply_saved_properties
+
+    def _save_(instance, node, node_is_new):
+        gremlin_props = NodeModel._property_map(instance, node, node_is_new)
+        if not (gremlin_props or node_is_new):
+            return
+        script = '''
+        node=g.v(nodeId);
+        results = Neo4Django.updateNodeProperties(node, propMap);
+        '''
+        conn = connections[instance.using]
+        script_rv = conn.gremlin_tx(script, nodeId=instance.id,
+                                    propMap=gremlin_props, raw=True)
+        NodeModel._apply_saved_properties(instance, script_rv)
+
     #TODO this needs to be revised. I hope there's a better way.
     NodeModel._save_properties = staticmethod(_save_)
     del _save_
@@ -462,6 +598,13 @@ class BoundProperty(AttrRouter):
             self.___set_value(instance, value)
         else:
             values = self._values_of(instance)
+            try:
+                unchanged = (self.__propname in values and
+                             values[self.__propname] == value)
+            except TypeError:  # eg, naive and aware datetimes
+                unchanged = False
+            if not unchanged:
+                self._changed_of(instance).add(self.__propname)
             values[self.__propname] = value
 
     @transactional
@@ -512,20 +655,26 @@ class BoundProperty(AttrRouter):
 
 
 class StringProperty(Property):
-    #since strings don't have a natural max, this is an arbitrarily high utf-8
-    #string. this is necessary for gt string queries, since Lucene range
-    #queries (prior 4.0) don't support open-ended ranges
     _internal_type_ = 'StringProperty'
-    MAX = u'\U0010FFFF' * 20
-    MIN = u''
+
+    #fulltext index terms are tokenized and lowercased, so strings are range
+    #indexed under their own key
+    separate_range_key = True
+    indexed_sortable = True
 
     formfield = formfields.CharField
 
-    def __init__(self, max_length=None, min_length=None, **kwargs):
+    def __init__(self, max_length=None, min_length=None,
+                 indexed_lowercase=False, indexed_reversed=False, **kwargs):
         if kwargs.get('indexed', False):
             kwargs.setdefault('indexed_fulltext', True)
             kwargs.setdefault('indexed_range', True)
+        elif indexed_lowercase or indexed_reversed:
+            raise ValueError('Only indexed properties can be indexed in '
+                             'lowercase or reversed.')
         super(StringProperty, self).__init__(**kwargs)
+        self.indexed_lowercase = indexed_lowercase
+        self.indexed_reversed = indexed_reversed
         self.max_length = max_length
         self.min_length = min_length
         if max_length is not None:
@@ -536,6 +685,28 @@ class StringProperty(Property):
     def to_neo(cls, value):
         return unicode(value)
 
+    @staticmethod
+    def _hex_term(value):
+        #hex-encoded UTF-16 code units, which sort like Java (and Cypher) does
+        #strings, survive lowercasing, aren't tokenized and don't need escaping
+        return value.encode('utf-16-be').encode('hex')
+
+    def to_neo_range_index(self, value):
+        return self._hex_term(self.to_neo(value))
+
+    def derived_index_keys(self):
+        #whole-value copies for case-insensitive lookups, and reversed for
+        #suffix lookups, which become prefix queries
+        keys = super(StringProperty, self).derived_index_keys()
+        if self.indexed_lowercase:
+            keys['lower'] = lambda v: self._hex_term(self.to_neo(v).lower())
+        if self.indexed_reversed:
+            keys['reversed'] = lambda v: self._hex_term(self.to_neo(v)[::-1])
+        if self.indexed_lowercase and self.indexed_reversed:
+            keys['lower.reversed'] = \
+                    lambda v: self._hex_term(self.to_neo(v).lower()[::-1])
+        return keys
+
     def formfield(self, **kwargs):
         defaults = dict(kwargs)
         if self.max_length is not None:
@@ -577,6 +748,8 @@ class IntegerProperty(Property):
     MAX = MAX_INT
     MIN = MIN_INT
 
+    indexed_sortable = True
+
     formfield = formfields.IntegerField
 
     def __init__(self, **kwargs):
@@ -592,12 +765,12 @@ class IntegerProperty(Property):
         return int(value)
 
     def to_neo_index(self, value):
-        #for now, we'll just use a fixed-width binary decimal encoding with a
-        #'-' for negative and '0' for positive or 0.
-        s = str(abs(value))
-        if len(s) > 20:
+        #a fixed-width decimal encoding of the value's offset from MIN_INT, so
+        #terms (negative values included) sort like the values
+        value = int(value)
+        if not MIN_INT <= value <= MAX_INT:
             raise ValueError('Values should be between {0} and {1}.'.format(MIN_INT, MAX_INT))
-        return ('-' if value < 0 else '0') + s.zfill(19)
+        return '%020d' % (value - MIN_INT)
 
     @property
     def to_neo_index_gremlin(self):
@@ -606,7 +779,8 @@ class IntegerProperty(Property):
         to_neo_index(value) server-side. The closure should take a single value
         as an argument (that value actually set on the node).
         """
-        return """{ i -> (i < 0?'-':'0') + String.format('%019d',i)} """
+        return ("""{ i -> i == null ? null : String.format('%020d', """
+                """(i as BigInteger) + 9223372036854775808G) }""")
 
     def formfield(self, **kwargs):
         defaults = {'form_class': formfields.IntegerField}
@@ -655,6 +829,8 @@ class DateProperty(Property):
     MAX = datetime.date.max
     MIN = datetime.date.min
 
+    indexed_sortable = True
+
     def __init__(self, auto_now=False, auto_now_add=False, **kwargs):
         self.auto_now, self.auto_now_add = auto_now, auto_now_add
         #HACKs : auto_now_add/auto_now should be done as a default or a pre_save.
@@ -699,18 +875,31 @@ class DateTimeProperty(DateProperty):
         elif isinstance(value, datetime.date):
             if not isinstance(value, datetime.datetime):
                 value = datetime_safe.new_datetime(value)
-            if settings.USE_TZ and timezone.is_naive(value):
-                default_timezone = timezone.get_default_timezone()
-                value = timezone.make_aware(value, default_timezone)
+            if settings.USE_TZ:
+                if timezone.is_naive(value):
+                    default_timezone = timezone.get_default_timezone()
+                    value = timezone.make_aware(value, default_timezone)
+                #stored in UTC, like Django does, so values compare correctly
+                value = value.astimezone(timezone.utc)
             return value.isoformat()
         else:
             # TODO raise error
             pass
 
     def to_neo_index(self, value):
-        cleaned = self.to_neo(value)
-        if cleaned is not None:
-            return cleaned.replace(' ', '-')
+        #indexed in UTC at a fixed width, so terms sort like the values even
+        #if they were saved with different offsets, and without letters, so
+        #lowercasing analyzers leave them alone
+        value = self.to_python(value)
+        if value is None:
+            return None
+        if timezone.is_naive(value) and settings.USE_TZ:
+            value = timezone.make_aware(value, timezone.get_default_timezone())
+        if timezone.is_aware(value):
+            value = value.astimezone(timezone.utc)
+        return u'%04d-%02d-%02d-%02d:%02d:%02d.%06d' % (
+            value.year, value.month, value.day, value.hour, value.minute,
+            value.second, value.microsecond)
 
     def pre_save(self, model_instance, add, attname):
         if self.auto_now or (self.auto_now_add and add):
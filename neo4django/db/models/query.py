@@ -1,4 +1,5 @@
-from django.db.models import Q
+from django.conf import settings
+from django.db.models import Q, signals
 from django.db.models.query import QuerySet
 from django.db.models.sql import subqueries
 from django.core import exceptions
@@ -9,26 +10,30 @@ from lucenequerybuilder import Q as LQ
 
 from collections import namedtuple, defaultdict
 from operator import and_, or_
+import base64
 import itertools
+import json
 import re
 
 import neo4jrestclient.constants as neo_constants
 
 from .. import DEFAULT_DB_ALIAS, connections
-from ...utils import Enum, uniqify, not_none
-from ...constants import ORDER_ATTR
+from ...constants import ERROR_ATTR
+from ...utils import Enum, uniqify, not_none, chunked
 from ...decorators import (transactional,
                            not_supported,
                            alters_data,
                            not_implemented,
                            borrows_methods)
 
+from ...metrics import operation, model_label, fingerprint
 from .cypher import (Clauses, Start, NodeComponent, RelationshipComponent, Path,
-                     Match, With, Set, Return, ColumnExpression, OrderByTerm,
-                     OrderBy, DeleteNode, cypher_primitive)
+                     Match, With, Set, Return, ColumnExpression, IdExpression,
+                     OrderByTerm, OrderBy, cypher_primitive)
 
 from . import script_utils
-from .script_utils import id_from_url, LazyNode, _add_auth as add_auth
+from .script_utils import (id_from_url, LazyNode, LazyRelationship,
+                           _add_auth as add_auth)
 from . import aggregates
 
 #python needs a bijective map... grumble... but a reg enum is fine I guess
@@ -38,6 +43,9 @@ OPERATORS = Enum('EXACT', 'IEXACT', 'LT', 'LTE', 'GT', 'GTE', 'IN', 'RANGE', 'ME
                  'ENDSWITH', 'IENDSWITH', 'REGEX', 'IREGEX', 'MEMBER_IN',
                  'YEAR', 'MONTH', 'DAY', 'ISNULL')
 
+OPERATOR_NAMES = dict((v, k.lower()) for k, v in vars(OPERATORS).iteritems()
+                      if k.isupper())
+
 ConditionTuple = namedtuple('ConditionTuple', ['field', 'value', 'operator', 'path'])
 
 
@@ -54,8 +62,17 @@ class Condition(ConditionTuple):
         super(Condition, self).__init__(*args, **kwargs)
 
 
+QueryPlan = namedtuple('QueryPlan', ['strategy', 'index_queries', 'cypher',
+                                     'params', 'plan'])
+
 QUERY_CHUNK_SIZE = 100
 
+DEFAULT_DELETE_BATCH_SIZE = 1000
+
+DEFAULT_IN_BULK_BATCH_SIZE = 1000
+
+DEFAULT_SHORTEST_PATH_DEPTH = 15
+
 #TODO these should be moved to constants
 TYPE_REL = '<<TYPE>>'
 INSTANCE_REL = '<<INSTANCE>>'
@@ -132,10 +149,44 @@ def condition_from_kw(nodetype, keyval):
     if op in (OPERATORS.RANGE, OPERATORS.IN, OPERATORS.MEMBER_IN):
         return Condition(field, tuple([field.to_neo(v) for v in keyval[1]]),
                          op, path)
+    elif op is OPERATORS.ISNULL:
+        # a flag, not a property value
+        return Condition(field, bool(keyval[1]), op, path)
     else:
         return Condition(field, field.to_neo(keyval[1]), op, path)
 
 
+# lookups served by keys derived from a property, if it has them, as
+# operator: (key suffix, Lucene query pattern)
+DERIVED_KEY_LOOKUPS = {
+    OPERATORS.IEXACT: ('lower', '%s'),
+    OPERATORS.STARTSWITH: ('lower', '%s*'),
+    OPERATORS.ISTARTSWITH: ('lower', '%s*'),
+    OPERATORS.CONTAINS: ('lower', '*%s*'),
+    OPERATORS.ICONTAINS: ('lower', '*%s*'),
+    OPERATORS.ENDSWITH: ('reversed', '%s*'),
+    OPERATORS.IENDSWITH: ('lower.reversed', '%s*'),
+}
+
+
+def derived_key_suffix(condition):
+    """
+    Return the suffix of the derived index key a condition is looked up by,
+    or None if it's looked up by its property's own key.
+    """
+    field = condition.field
+    if condition.operator in DERIVED_KEY_LOOKUPS:
+        suffix = DERIVED_KEY_LOOKUPS[condition.operator][0]
+        if suffix in getattr(field, 'derived_index_keys', dict)():
+            return suffix
+    if (condition.operator in (OPERATORS.GT, OPERATORS.GTE, OPERATORS.LT,
+                               OPERATORS.LTE, OPERATORS.RANGE) and
+            getattr(field, 'indexed_range', False) and
+            field.separate_range_key):
+        return 'range'
+    return None
+
+
 def lucene_query_from_condition(condition):
     """
     Build a Lucene query from a kw pair like those making up Q objects, eg
@@ -147,6 +198,17 @@ def lucene_query_from_condition(condition):
 
     def escape_wilds(s):
         return str(s).replace('*', '\*').replace('?', '\?')
+
+    # case-sensitive lookups can use lowercase keys too, since they're
+    # checked again by Cypher
+    suffix = derived_key_suffix(condition)
+    if condition.operator in DERIVED_KEY_LOOKUPS and suffix is not None:
+        pattern = DERIVED_KEY_LOOKUPS[condition.operator][1]
+        to_term = field.derived_index_keys()[suffix]
+        return LQ(field.derived_index_key(suffix),
+                  pattern % to_term(condition.value),
+                  wildcard=(pattern != '%s'))
+
     if condition.operator is OPERATORS.EXACT:
         lq = LQ(attname, field.to_neo_index(condition.value))
     elif condition.operator is OPERATORS.STARTSWITH:
@@ -161,42 +223,30 @@ def lucene_query_from_condition(condition):
     elif condition.operator is OPERATORS.MEMBER_IN:
         lq = reduce(or_, (LQ(attname, field.member_to_neo_index(v))
                           for v in condition.value))
-    #FIXME OBOE with field.MAX + exrange, not sure it's easy to fix though...
     elif condition.operator in (OPERATORS.GT, OPERATORS.GTE, OPERATORS.LT,
                                 OPERATORS.LTE, OPERATORS.RANGE):
         if not field.indexed_range:
             raise exceptions.FieldError(
                 'The {0} property is not configured for range '
                 'indexing.'.format(field.attname))
-        fieldtype = field._property_type()
-        if condition.operator in (OPERATORS.GT, OPERATORS.GTE):
-            if not hasattr(field, 'MAX'):
-                raise exceptions.FieldError(
-                    'The {0} property is not configured for gt/gte '
-                    'queries.'.format(field.attname))
-            if condition.operator is OPERATORS.GT:
-                lq = LQ(attname, exrange=(field.to_neo_index(condition.value),
-                                          field.to_neo_index(fieldtype.MAX)))
-            else:
-                lq = LQ(attname, inrange=(field.to_neo_index(condition.value),
-                                          field.to_neo_index(fieldtype.MAX)))
-        elif condition.operator in (OPERATORS.LT, OPERATORS.LTE):
-            if not hasattr(fieldtype, 'MIN'):
-                raise exceptions.FieldError(
-                    'The {0} property is not configured for lt/lte '
-                    'queries.'.format(field.attname))
-            if condition.operator is OPERATORS.LT:
-                lq = LQ(attname, exrange=(field.to_neo_index(fieldtype.MIN),
-                                          field.to_neo_index(condition.value)))
-            else:
-                lq = LQ(attname, inrange=(field.to_neo_index(fieldtype.MIN),
-                                          field.to_neo_index(condition.value)))
-        elif condition.operator is OPERATORS.RANGE:
+        key = field.range_index_key()
+        if condition.operator is OPERATORS.RANGE:
             if len(condition.value) != 2:
                 raise exceptions.ValidationError('Range queries need upper and lower bounds.')
-            lq = LQ(condition.field.attname,
-                    inrange=[condition.field.to_neo_index(v)
-                             for v in condition.value])
+            lq = LQ(key, inrange=[field.to_neo_range_index(v)
+                                  for v in condition.value])
+        else:
+            # Lucene range queries can't be open-ended, so the other end is
+            # a term sorting outside every value
+            term = field.to_neo_range_index(condition.value)
+            if condition.operator is OPERATORS.GT:
+                lq = LQ(key, exrange=(term, field.INDEX_MAX))
+            elif condition.operator is OPERATORS.GTE:
+                lq = LQ(key, inrange=(term, field.INDEX_MAX))
+            elif condition.operator is OPERATORS.LT:
+                lq = LQ(key, exrange=(field.INDEX_MIN, term))
+            else:
+                lq = LQ(key, inrange=(field.INDEX_MIN, term))
     else:
         return None
     return lq
@@ -231,60 +281,103 @@ def condition_tree_leaves(q):
                 yield leaf
 
 
-def lucene_query_from_condition_tree(cond_q):
+def condition_tree_shape(cond_q):
     """
-    Unpack a Q tree with Condition children, building a Lucene query tree as
-    we go.
+    Render a Q tree with Condition children as a str, leaving out values- eg
+    `(AND: age__gte, (OR: name__exact, name__startswith))`.
     """
     if not isinstance(cond_q, Q):
-        return lucene_query_from_condition(cond_q)
-    if len(cond_q.children) > 0:
-        children = [lucene_query_from_condition_tree(c)
-                    for c in cond_q.children]
-        children = filter(lambda x: bool(x), children)
-        if len(children) > 0:
-            op = and_ if cond_q.connector == 'AND' else or_
-            lucene_query = reduce(op, children)
-            if cond_q.negated:
-                lucene_query = ~lucene_query
-            return lucene_query
-
-
-def lucene_query_and_index_from_q(using, nodetype, q):
+        return '__'.join(list(cond_q.path) +
+                         [cond_q.field.attname, OPERATOR_NAMES[cond_q.operator]])
+    children = sorted(condition_tree_shape(c) for c in cond_q.children)
+    shape = '(%s: %s)' % (cond_q.connector, ', '.join(children))
+    return 'NOT ' + shape if cond_q.negated else shape
+
+
+def index_plan_from_q(using, nodetype, q):
     """
-    Return an index name / Lucene query pair based on a given database, node
-    type, and Q filter tree- which can have a mix of kwargs or Condition leaves.
+    Return a plan for finding the nodes matching a Q filter tree- which can
+    have a mix of kwargs or Condition leaves- with node indexes, or None if an
+    index can't narrow them down.
+
+    Plans are ('query', index name, Lucene query string) leaves, or
+    ('and', plans) and ('or', plans) nodes, combined with set algebra server-side. They can
+    match more nodes than the filter (fulltext index queries match any
+    token), so the filter should still be applied in Cypher- for the same
+    reason, negated filters are never planned.
     """
-    # crawl the Q tree and prune all non-indexed fields. collect all indexed
-    # non-rel-spanning fields, but drop any that have been OR'd against
-
-    # XXX hack to get around lack of real closure support
-    prop_indexes = set([])
-
-    def predicate(cond):
-        if isinstance(cond, Q):
-            # exclude OR'd fields that aren't *all* indexed, as they can't
-            # use an index to help. we use the "children_filtered" bool set by
-            # condition_tree_from_q
-            return not(cond.connector == 'OR' and
-                       getattr(cond, 'children_filtered', False))
-        # make sure the field is indexed, isn't a rel-spanning field,
-        # and isn't an id field
-        if len(cond.path) < 1 and cond.field.indexed \
-           and not getattr(cond.field, 'id', False):
-            index = cond.field.index(using)
-            prop_indexes.add(index)
-            if len(prop_indexes) > 1:
-                raise exceptions.ValidationError("Complex filters cannot refer "
-                                                 "to two indexed properties "
-                                                 "that don't share an index.")
-            return True
-
-    cond_q = condition_tree_from_q(nodetype, q, predicate=predicate)
-    if len(prop_indexes) == 0 or not predicate(cond_q):
+    if isinstance(q, Q):
+        if q.negated:
+            return None
+        return combine_index_plans(
+            q.connector,
+            [index_plan_from_q(using, nodetype, child) for child in q.children])
+
+    cond = q if isinstance(q, Condition) else condition_from_kw(nodetype, q)
+    # make sure the field is indexed, isn't a rel-spanning field, and isn't
+    # an id field
+    if (len(cond.path) > 0 or not cond.field.indexed or
+            getattr(cond.field, 'id', False)):
         return None
-    index = next(iter(prop_indexes))
-    return (index.name, lucene_query_from_condition_tree(cond_q))
+    lucene_query = lucene_query_from_condition(cond)
+    if not lucene_query:
+        return None
+    # derived keys are kept whole in the exact index
+    index_name = (cond.field.index_name(using)
+                  if derived_key_suffix(cond) is None
+                  else cond.field.derived_index_name(using))
+    return ('query', index_name, unicode(lucene_query))
+
+
+def combine_index_plans(connector, plans):
+    """
+    Combine index plans with an 'AND' or 'OR' connector, merging queries on
+    the same index into one Lucene query. Unplanned (None) plans are left out
+    of an 'AND', but make an 'OR' unplannable.
+    """
+    if connector == 'AND':
+        plans = [p for p in plans if p is not None]
+    elif None in plans:
+        return None
+    node_type = connector.lower()
+
+    queries, others = {}, []
+    for plan in plans:
+        for child in (plan[1] if plan[0] == node_type else [plan]):
+            if child[0] == 'query':
+                if child[1] in queries:
+                    queries[child[1]] = u'(%s) %s (%s)' % (
+                        queries[child[1]], connector, child[2])
+                else:
+                    queries[child[1]] = child[2]
+            else:
+                others.append(child)
+    combined = [('query', name, lucene_query)
+                for name, lucene_query in sorted(queries.items())] + others
+    if len(combined) == 0:
+        return None
+    elif len(combined) == 1:
+        return combined[0]
+    return (node_type, combined)
+
+
+def index_plan_as_params(plan):
+    """
+    Return an index plan as a nested list, to pass to Neo4Django.queryIndexPlan.
+    """
+    if plan[0] == 'query':
+        return list(plan)
+    return [plan[0], [index_plan_as_params(p) for p in plan[1]]]
+
+
+def index_plan_queries(plan):
+    """
+    Return the (index name, query string) pairs in an index plan.
+    """
+    if plan[0] == 'query':
+        return [(plan[1], plan[2])]
+    return list(itertools.chain.from_iterable(index_plan_queries(p)
+                                              for p in plan[1]))
 
 
 def cypher_predicate_from_condition(element_name, condition):
@@ -414,6 +507,10 @@ def cypher_predicate_from_condition(element_name, condition):
     return cypher
 
 
+def _parenthesize(expr):
+    return '(%s)' % expr if expr else expr
+
+
 def cypher_predicates_from_q(q):
     if not isinstance(q, Q):
         identifier = '__'.join(['n'] + q.path)
@@ -432,7 +529,9 @@ def cypher_predicates_from_q(q):
             )
         else:
             return '(%s)' % cypher_predicate_from_condition(value_exp, q)
-    children = list(not_none(cypher_predicates_from_q(c) for c in q.children))
+    children = list(not_none(
+        cypher_predicates_from_q(c) if not isinstance(c, Q) or len(c) == 1
+        else _parenthesize(cypher_predicates_from_q(c)) for c in q.children))
     if len(children) > 0:
         expr = (" %s " % q.connector).join(children)
         return "NOT (%s)" % expr if q.negated else expr
@@ -556,10 +655,72 @@ def cypher_match_from_q(nodetype, q):
     return Match(Path(p) for p in paths)
 
 
+def cypher_traversal_path(nodetype, path, min_depth=1, max_depth=1):
+    """
+    Return a Cypher path, named 'p', following a '__' separated chain of
+    relationship fields from a column 's' to a column 'n', and the model it
+    ends at. A single relationship can be followed between `min_depth` and
+    `max_depth` times, or any number of times from `min_depth` if `max_depth`
+    is None.
+    """
+    steps = path.split('__')
+    if (min_depth, max_depth) != (1, 1) and len(steps) > 1:
+        raise ValueError('Only a single relationship can be followed a '
+                         'variable number of times.')
+    if min_depth < 0 or (max_depth is not None and max_depth < min_depth):
+        raise ValueError('Traversal depths should be 0 <= min_depth <= '
+                         'max_depth.')
+    components = [NodeComponent('s')]
+    cur_m = nodetype
+    for level, step in enumerate(steps):
+        rel = getattr(cur_m._meta, '_relationships', {}).get(step)
+        if rel is None:
+            raise exceptions.ValidationError("Cannot find relationship `%s` "
+                                             "from model %s." %
+                                             (step, cur_m.__name__))
+        direction = ('>' if rel.direction == neo_constants.RELATIONSHIPS_OUT
+                     else '<')
+        length = (min_depth if min_depth == max_depth
+                  else (min_depth, max_depth))
+        components.append(RelationshipComponent(types=[rel.rel_type],
+                                                direction=direction,
+                                                length_or_range=length))
+        components.append(NodeComponent('n' if level == len(steps) - 1
+                                        else None))
+        cur_m = rel.target_model
+    return Path(components, path_variable='p'), cur_m
+
+
 ###################
 # QUERY EXECUTION #
 ###################
 
+def models_from_paths(raw_paths, using):
+    """
+    Build paths described by `Neo4Django.describePaths` into tuples
+    alternating models and relationships. Nodes of types Django hasn't loaded
+    are left as nodes.
+    """
+    conn = connections[using]
+    paths = []
+    for node_dicts, rel_dicts, type_names in raw_paths:
+        nodes = [add_auth(LazyNode.from_dict(d), conn) for d in node_dicts]
+        nodes_by_id = dict((n.id, n) for n in nodes)
+        rels = [add_auth(LazyRelationship.from_dict(d), conn)
+                for d in rel_dicts]
+        for r in rels:
+            r.set_custom_node_lookup(nodes_by_id)
+        elements = []
+        for node, type_name in zip(nodes, type_names):
+            model = get_model(*type_name.split(':')) if type_name else None
+            elements.append(model._neo4j_instance(node) if model is not None
+                            else node)
+        path = elements[:1]
+        for rel, element in zip(rels, elements[1:]):
+            path.extend([rel, element])
+        paths.append(tuple(path))
+    return paths
+
 def score_model_rel(field_name, bound_rel):
     """
     Scores a model's bound relationship on how likely it is to be the referrent
@@ -737,14 +898,23 @@ def execute_select_related(models=None, query=None, index_name=None,
             rel_on_model = getattr(cur_m, field_name, None)
             if rel_on_model and hasattr(rel_on_model, '_cache'):
                 rel_on_model._add_to_cache((rel, new_model))
-                if field.ordered:
-                    rel_on_model._cache.sort(
-                        key=lambda r: r[0].properties.get(ORDER_ATTR, None))
             else:
                 #otherwise single side
                 field._set_cached_relationship(cur_m, new_model)
             cur_m = new_model
 
+
+def _node_id(obj):
+    """
+    Return the node id of a model, or an id.
+    """
+    if isinstance(obj, (int, long)):
+        return obj
+    if obj.id is None:
+        raise ValueError("%r hasn't been saved." % obj)
+    return obj.id
+
+
 # we want some methods of sql.Query but don't want the burder of inheriting
 # everything. these methods are pulled off django.db.models.sql.query.Query
 QUERY_PASSTHROUGH_METHODS = ('set_limits', 'clear_limits', 'can_filter',
@@ -781,12 +951,23 @@ class Query(object):
 
         self.limit_before_return = None
 
+        # an OrderBy used when no ordering is given, applied with any slicing
+        # just before the RETURN
+        self.default_ordering = None
+
+        # labels requests made by this query for metrics and budgets
+        self.operation_label = None
+
         self.distinct = False
         self.distinct_fields = None
 
         self.standard_ordering = True
         self.query_terms = None
 
+        # the values of the row a keyset paginated query continues after- its
+        # ordered properties then its id, or () for the first page
+        self.keyset = None
+
         # XXX to handle overreaching django code like in the admin - not used
         # otherwise
         self.where = False
@@ -846,12 +1027,115 @@ class Query(object):
         # (requires a refactor from as_groovy())
         return self.start_clause, self.start_clause_param_func()
 
+    def set_traversal(self, start_ids, start_model, path, min_depth=1,
+                      max_depth=1, unique=True):
+        """
+        Start the query from nodes reached by following a path of
+        relationship fields from the given node ids, in one variable-length
+        MATCH. Other filters are checked against the nodes reached.
+        """
+        if self.start_clause is not None:
+            raise ValueError("This query already has a starting point.")
+        traversal, end_model = cypher_traversal_path(start_model, path,
+                                                     min_depth, max_depth)
+        if not issubclass(end_model, self.model) and \
+           not issubclass(self.model, end_model):
+            raise ValueError("`%s` leads to %s, not %s." %
+                             (path, end_model.__name__, self.model.__name__))
+        self.set_start_clause(Clauses([
+            Start({'s': 'node({traversalStart})'}, ['traversalStart']),
+            Match([traversal]),
+            With({'n': 'n', 'p': 'p', 'typeNode': 'typeNode'})
+        ]), {'traversalStart': list(start_ids)})
+        self.distinct = unique
+        self.operation_label = model_label(start_model, '%s.traverse' % path)
+
     def set_limit_before_return(self, i):
         self.limit_before_return = i
 
+    def set_default_ordering(self, order_by):
+        self.default_ordering = order_by
+
     def model_from_node(self, node):
         return self.model._neo4j_instance(node)
 
+    def _keyset_fields(self):
+        """
+        Return (property, descending) pairs for the ordered properties of a
+        keyset paginated query.
+        """
+        from .properties import BoundProperty
+        props = BoundProperty._all_properties_for(self.model)
+        fields = []
+        for field in self.order_by:
+            name = field.lstrip('-')
+            if name not in props:
+                raise ValueError("Keyset pagination can only order by "
+                                 "properties of %s, not '%s'." %
+                                 (self.model.__name__, name))
+            fields.append((props[name],
+                           field.startswith('-') == self.standard_ordering))
+        return fields
+
+    def keyset_cursor(self, obj):
+        """
+        Return an opaque cursor for continuing this query's ordering after a
+        model- its ordered property values and id.
+        """
+        values = []
+        for prop, descending in self._keyset_fields():
+            value = getattr(obj, prop.name)
+            if value is None:
+                raise ValueError("Can't make a cursor for a model without a "
+                                 "value for '%s'." % prop.name)
+            values.append(prop.to_neo(value))
+        values.append(obj.id)
+        return base64.urlsafe_b64encode(json.dumps(values))
+
+    def set_keyset(self, cursor):
+        """
+        Paginate the query by keyset, continuing after the row a cursor from
+        `keyset_cursor` was made for, or from the first row if it's None.
+        """
+        if cursor is None:
+            self.keyset = ()
+            return
+        try:
+            values = json.loads(base64.urlsafe_b64decode(str(cursor)))
+        except (TypeError, ValueError):
+            raise ValueError("'%s' isn't a valid cursor." % cursor)
+        if not isinstance(values, list) or not values:
+            raise ValueError("'%s' isn't a valid cursor." % cursor)
+        self.keyset = tuple(values)
+
+    def _keyset_filters(self):
+        """
+        Return condition trees restricting a keyset paginated query to rows
+        with every ordered property, after its cursor's row.
+        """
+        if self.keyset is None:
+            return []
+        fields = self._keyset_fields()
+        qs = [Q(**{'%s__isnull' % prop.name: False}) for prop, d in fields]
+        if self.keyset:
+            if len(self.keyset) != len(fields) + 1:
+                raise ValueError("The cursor doesn't match the query's "
+                                 "ordering.")
+            values = [prop.to_python(v) for (prop, d), v in
+                      zip(fields, self.keyset)] + [self.keyset[-1]]
+            names = [prop.name for prop, d in fields] + ['id']
+            descending = [d for p, d in fields] + [not self.standard_ordering]
+            # rows sorting after the cursor's row have equal values for the
+            # first n ordered properties, and a later value for the next
+            after = []
+            for i, name in enumerate(names):
+                lookups = dict(zip(names[:i], values[:i]))
+                lookups['%s__%s' % (name, 'lt' if descending[i] else 'gt')] = \
+                        values[i]
+                after.append(Q(**lookups))
+            qs.append(reduce(or_, after))
+        return [condition_tree_from_q(self.model, q) for q in qs]
+
     def clone(self):
         clone = type(self)(self.model, self.filters, self.max_depth,
                            self.select_related_fields)
@@ -859,11 +1143,60 @@ class Query(object):
                        'distinct_fields', 'high_mark', 'low_mark',
                        'start_clause', 'start_clause_param_func',
                        'with_clauses', 'end_clause', 'standard_ordering',
-                       'limit_before_return', 'values', 'related_updates')
+                       'limit_before_return', 'values', 'related_updates',
+                       'operation_label', 'default_ordering', 'keyset')
         for a in clone_attrs:
             setattr(clone, a, getattr(self, a))
         return clone
 
+    def shape(self):
+        """
+        Describe the query without any of its values- the model, lookups,
+        ordering, slicing and anything else affecting the generated script.
+        """
+        parts = [model_label(self.model, 'query')]
+        filters = sorted(condition_tree_shape(q) for q in uniqify(self.filters))
+        if filters:
+            parts.append('filter %s' % ' '.join(filters))
+        if self.order_by:
+            parts.append('order_by %s' % ','.join(self.order_by))
+        if not self.standard_ordering:
+            parts.append('reversed')
+        if self.keyset is not None:
+            parts.append('after' if self.keyset else 'keyset')
+        if self.low_mark:
+            parts.append('offset')
+        if self.high_mark is not None:
+            parts.append('limit')
+        if self.distinct:
+            parts.append('distinct')
+        if self.select_related:
+            parts.append('select_related %s depth=%s' %
+                         (','.join(self.select_related_fields), self.max_depth))
+        if self.aggregates:
+            parts.append('aggregate %s' % ','.join(sorted(
+                '%s(%s)' % (type(a).__name__, a.prop_name)
+                for a in self.aggregates.itervalues())))
+        if self.values:
+            parts.append('update %s' % ','.join(sorted(
+                v[0].name for v in self.values)))
+        # clauses take their values as parameters, so their Cypher describes
+        # just their shape- like relationship types, directions and depths
+        for clause in [self.start_clause] + list(self.with_clauses) + \
+                      [self.end_clause]:
+            if clause is not None:
+                parts.append(clause.as_cypher()
+                             if hasattr(clause, 'as_cypher')
+                             else unicode(clause))
+        return u' '.join(parts)
+
+    def fingerprint(self):
+        """
+        Return a short hash of the query's `shape()`, so queries differing only
+        by value can be grouped together.
+        """
+        return fingerprint(self.shape())
+
     def get_aggregation(self, using):
         query = self.clone()
 
@@ -882,12 +1215,21 @@ class Query(object):
             (alias, make_aggregate_of_n(agg).as_cypher())
             for alias, agg in query.aggregates.iteritems())
         groovy, params = query.as_groovy(using)
-        result_set = connections[using].gremlin_tx(groovy, raw=True, **params)
+        with operation(model_label(self.model, 'aggregate'),
+                       fingerprint=query.fingerprint()):
+            result_set = connections[using].gremlin_tx(groovy, raw=True,
+                                                       **params)
         # TODO HACK this only works for one aggregate
         return {query.return_fields.keys()[0]: result_set[0]}
 
-    def as_groovy(self, using):
-        filters = uniqify(self.filters)
+    def as_groovy(self, using, profile=False):
+        """
+        Return a Groovy script and params dict to execute the query, or
+        (None, None) if the query can't match anything. If `profile` is True,
+        the script instead runs a profiled query and returns its execution
+        plan.
+        """
+        filters = uniqify(self.filters + self._keyset_filters())
 
         id_conditions = []
 
@@ -908,25 +1250,20 @@ class Query(object):
 
         in_id_lookups = list(id_lookups.get(OPERATORS.IN, []))
 
-        # build index queries from filters
+        # plan index queries from filters, combining queries headed for the
+        # same index. conjunctions of index queries are run together,
+        # anything else as a plan. queries with their own starting point (like
+        # traversals) only check filters against the nodes they reach
+        index_plan = combine_index_plans(
+            'AND', [index_plan_from_q(using, self.model, q) for q in filters]) \
+                if self.start_clause is None else None
+        index_qs = []
+        if index_plan is not None and (index_plan[0] == 'query' or (
+                index_plan[0] == 'and' and
+                all(p[0] == 'query' for p in index_plan[1]))):
+            index_qs = index_plan_queries(index_plan)
+            index_plan = None
 
-        index_qs = not_none(lucene_query_and_index_from_q(using, self.model, q)
-                            for q in filters)
-        
-        # combine any queries headed for the same index and replace lucene
-        # queries with strings
-
-        index_qs_dict = {}
-        for key, val in index_qs:
-            if key in index_qs_dict:
-                if index_qs_dict[key]:
-                    index_qs_dict[key] &= val
-            else:
-                index_qs_dict[key] = val
-
-        index_qs = [(key, unicode(val)) for key, val in index_qs_dict.iteritems()
-                    if val is not None]
-        
         # use index lookups, ids, OR a type tree traversal as a cypher START,
         # then unindexed conditions as a WHERE
 
@@ -963,24 +1300,39 @@ class Query(object):
         where_clause = cypher_where_from_q(self.model,
                                            Q(*non_spanning_filters))
 
-        with_clauses = self.with_clauses or []
+        with_clauses = list(self.with_clauses)
 
         limit = self.high_mark - self.low_mark if self.high_mark is not None else None
 
+        # default ordering (like the order of an ordered relationship) is
+        # applied last, with the slice, unless the query is ordered explicitly
+        use_default_ordering = (self.default_ordering is not None and
+                                not self.order_by and self.end_clause is None
+                                and len(self.values) == 0 and
+                                self.keyset is None)
+        slice_before_return = use_default_ordering and not self.distinct
+
         if self.end_clause is None and len(self.values) > 0:
             # for updating queries
             return_clause = Clauses([Set(dict((tup[0].name, tup[2])
                                               for tup in self.values)),
                                      Return(self.return_fields)])
+        elif self.end_clause is None and slice_before_return:
+            return_clause = Return(self.return_fields)
         elif self.end_clause is None:
             return_clause = Return(self.return_fields, skip=self.low_mark,
                     limit=limit, distinct_fields=['n'] if self.distinct else [])
         else:
             return_clause = self.end_clause
 
-        order_by = OrderBy([OrderByTerm(ColumnExpression('n', field.lstrip('-')),
-                                        negate=(field.startswith('-') == self.standard_ordering))
-                            for field in self.order_by]) if self.order_by else None
+        order_terms = [OrderByTerm(ColumnExpression('n', field.lstrip('-')),
+                                   negate=(field.startswith('-') == self.standard_ordering))
+                       for field in self.order_by]
+        if self.keyset is not None:
+            # keyset pagination needs a total ordering, so ties are broken by id
+            order_terms.append(OrderByTerm(IdExpression('n'),
+                                           negate=not self.standard_ordering))
+        order_by = OrderBy(order_terms) if order_terms else None
 
         if order_by is not None:
             # decide where to inject the ORDER BY expression - if the fields
@@ -1004,6 +1356,8 @@ class Query(object):
             #TODO HACK need a generalization
             'returnColumn': self.return_fields.keys()[0]
         }
+        cypher_func = ('Neo4Django.profileCypher' if profile
+                       else 'Neo4Django.cypher')
 
         # TODO none of these queries but the last properly take type into
         # account.
@@ -1056,29 +1410,71 @@ class Query(object):
                     results = []
                     startParams = startParams.findResults{
                         if (it.value) {
-                            [it.key, Neo4Django.getVerticesByIds(it.value).collect{v -> v.id}]
+                            [it.key, Neo4Django.existingNodeIds(it.value)]
                         }
                     }.collectEntries()
                     cypherParams += startParams
-                    table = Neo4Django.cypher(cypherQuery,cypherParams)
+                    table = %s(cypherQuery,cypherParams)
                     results = table.columnAs(returnColumn)
-                    """
+                    """ % cypher_func
                 params['startParams'] = start_param_dict
             else:
                 # XXX None is returned, meaning an empty result set
                 return (None, None)
         elif len(index_qs) > 0:
+            top_hits = None
+            if start_clause is None and not spanning_filters:
+                top_hits = self._top_index_hits(using, filters, index_qs,
+                                                limit, use_default_ordering)
+            start_clause = start_clause or Start({'n': 'node({startParam})'},
+                                                 ['startParam'])
+            if top_hits is None:
+                groovy_script = """
+                    results = []
+                    startIds = Neo4Django.queryNodeIndices(startQueries)\
+                                .collect{it.id}
+                    cypherParams['startParam'] = startIds
+                    table = %s(cypherQuery, cypherParams)
+                    results = table.columnAs(returnColumn)
+                    """ % cypher_func
+            else:
+                # only ask the index for as many hits as the slice needs. if
+                # Cypher filters some out and comes up short, use every hit
+                groovy_script = """
+                    results = []
+                    startIds = Neo4Django.queryNodeIndices(startQueries,
+                                    maxHits, sortKey, sortReverse)\
+                                .collect{it.id}
+                    cypherParams['startParam'] = startIds
+                    table = %(cypher_func)s(cypherQuery, cypherParams)
+                    results = table.columnAs(returnColumn).toList()
+                    // hits were only cut short if a single query hit maxHits
+                    truncated = (startQueries.size() == 1 &&
+                                 startIds.size() >= maxHits)
+                    if (truncated && results.size() < resultLimit) {
+                        startIds = Neo4Django.queryNodeIndices(startQueries)\
+                                    .collect{it.id}
+                        cypherParams['startParam'] = startIds
+                        table = %(cypher_func)s(cypherQuery, cypherParams)
+                        results = table.columnAs(returnColumn).toList()
+                    }
+                    results = results.iterator()
+                    """ % {'cypher_func': cypher_func}
+                params['maxHits'], params['sortKey'], params['sortReverse'] = \
+                        top_hits
+                params['resultLimit'] = limit
+            params['startQueries'] = index_qs
+        elif index_plan is not None:
             start_clause = start_clause or Start({'n': 'node({startParam})'},
                                                  ['startParam'])
             groovy_script = """
                 results = []
-                startIds = Neo4Django.queryNodeIndices(startQueries)\
-                            .collect{it.id}
+                startIds = Neo4Django.queryIndexPlan(indexPlan).collect{it.id}
                 cypherParams['startParam'] = startIds
-                table = Neo4Django.cypher(cypherQuery, cypherParams)
+                table = %s(cypherQuery, cypherParams)
                 results = table.columnAs(returnColumn)
-                """
-            params['startQueries'] = index_qs
+                """ % cypher_func
+            params['indexPlan'] = index_plan_as_params(index_plan)
         else:
             #TODO move this to being index-based - it won't work for abstract model queries
             if start_clause is None:
@@ -1090,9 +1486,9 @@ class Query(object):
                 type_restriction_pattern = None
             groovy_script = """
                 results = []
-                table = Neo4Django.cypher(cypherQuery, cypherParams)
+                table = %s(cypherQuery, cypherParams)
                 results = table.columnAs(returnColumn)
-                """
+                """ % cypher_func
 
         # make sure the start clause includes the typeNode
         if isinstance(start_clause, Clauses):
@@ -1104,20 +1500,29 @@ class Query(object):
             start_clause.cypher_params += ['typeNodeId']
         start_clause = Clauses([start_clause] + extra_start_clauses)
 
-        # add groovy to re-index after an update
+        # add groovy to re-index after an update, replacing the old entries
         if len(self.values) > 0:
-            reindex_values = [((model or self.model).index_name(),
-                               field.name,
-                               field.to_neo_index(value))
-                              for field, model, value in self.values if field.indexed]
+            reindex_values = []
+            for field, model, value in self.values:
+                if field.indexed:
+                    index_model = model or self.model
+                    reindex_values.append(
+                        (index_model.index_name(using, field.index_type),
+                         field.name, field.index_values(value)))
+                    # derived keys are kept whole in the exact index
+                    reindex_values.extend(
+                        (index_model.index_name(using, 'exact'), key, values)
+                        for key, values in field.derived_index_entries(value))
             if len(reindex_values) > 0:
                 groovy_script += """
-                def nodeToIndex, rawIndex, index
+                def nodeToIndex, rawIndices = valuesToIndexPerNode.collect{
+                    Neo4Django.getOrCreateIndex(it[0])[1]
+                }
                 while( results.hasNext() ) {
                     nodeToIndex = results.next()
-                    valuesToIndexPerNode.each{ indexName, field, value ->
-                        (index, rawIndex) = Neo4Django.getOrCreateIndex(indexName)
-                        rawIndex.add(nodeToIndex, field, value)
+                    valuesToIndexPerNode.eachWithIndex{ entry, i ->
+                        rawIndices[i].remove(nodeToIndex, entry[1])
+                        entry[2].each{ rawIndices[i].add(nodeToIndex, entry[1], it) }
                     }
                 }
                 """
@@ -1156,6 +1561,15 @@ class Query(object):
             with_clauses.append(With(dict((i, i) for i in passing_ids),
                                     limit=self.limit_before_return))
 
+        if use_default_ordering:
+            prior_clause = ([start_clause] + with_clauses)[-1]
+            passing_ids = getattr(
+                prior_clause, 'passing_identifiers', ['n'])
+            slice_kwargs = (dict(skip=self.low_mark, limit=limit)
+                            if slice_before_return else {})
+            with_clauses.append(With(dict((i, i) for i in passing_ids),
+                                     order_by=self.default_ordering,
+                                     **slice_kwargs))
 
 
         str_clauses = [start_clause.as_cypher(), where_clause] + \
@@ -1165,14 +1579,144 @@ class Query(object):
         params['cypherQuery'] = ' '.join(str_clauses) + ';'
         params['cypherParams'] = cypher_params
 
+        if profile:
+            groovy_script += """
+                results = Neo4Django.describePlan(table, results)
+                """
+
         return groovy_script, params
 
+    def _top_index_hits(self, using, filters, index_queries, limit,
+                        use_default_ordering):
+        """
+        Return the (max hits, sort key, reverse) to ask an index for if only
+        the top index hits are needed to find a sliced query's results, or
+        None if every hit is needed. Only a single index query can be cut
+        short- an intersection of several needs every hit.
+        """
+        if (limit is None or len(index_queries) != 1 or
+                self.end_clause is not None or self.values or
+                self.with_clauses or self.limit_before_return or
+                use_default_ordering or self.select_related or
+                self.aggregates or self.return_fields != {'n': 'n'}):
+            return None
+        max_hits = self.low_mark + limit
+        if not self.order_by and self.keyset is None:
+            return (max_hits, None, False)
+        if len(self.order_by) != 1:
+            return None
+
+        # hits can be sorted by the index if every one has a single, sortable
+        # value for the ordered property- it has to be filtered on
+        from .properties import BoundProperty
+        field = self.order_by[0]
+        name = field.lstrip('-')
+        prop = BoundProperty._all_properties_for(self.model).get(name)
+        if (prop is None or not prop.indexed or not prop.indexed_sortable or
+                prop.indexed_by_member or
+                (prop.separate_range_key and not prop.indexed_range) or
+                index_queries[0][0] != prop.range_index_name(using)):
+            return None
+        filtered = any(isinstance(c, Condition) and
+                       getattr(c.field, 'name', None) == name and
+                       not c.path and c.operator != OPERATORS.ISNULL
+                       for q in filters
+                       if q.connector == 'AND' and not q.negated
+                       for c in q.children)
+        if self.keyset is not None:
+            # the index can't break ties by id, so only unique properties
+            # can be sorted there. keyset filters require the property
+            if not prop.unique:
+                return None
+            filtered = True
+        if not filtered:
+            return None
+        reverse = field.startswith('-') == self.standard_ordering
+        return (max_hits, prop.range_index_key(), reverse)
+
+    def query_string(self, using):
+        """
+        Return the Cypher query and params this query will run. Ids for index
+        lookups are found server-side, and so aren't included in the params.
+        """
+        return self._query_string_from_params(self.as_groovy(using)[1])
+
+    def _query_string_from_params(self, params):
+        if params is None:
+            return None, None
+        cypher_params = dict(params['cypherParams'])
+        cypher_params.update(params.get('startParams', {}))
+        return params['cypherQuery'], cypher_params
+
+    def start_strategy(self, params):
+        """
+        Name the way a query with the given `as_groovy` params finds its
+        starting nodes- by 'id', 'index', 'type_tree', or a 'custom' start.
+        """
+        if params is None:
+            return 'empty'
+        elif 'startParams' in params:
+            return 'id'
+        elif 'startQueries' in params or 'indexPlan' in params:
+            return 'index'
+        elif self.start_clause is not None:
+            return 'custom'
+        return 'type_tree'
+
+    def _index_queries(self, params):
+        params = params or {}
+        if 'indexPlan' in params:
+            return [tuple(q) for q in
+                    index_plan_queries(params['indexPlan'])]
+        return params.get('startQueries', [])
+
+    def explain(self, using):
+        """
+        Describe how the query will be executed without running it. Neo4j
+        can't plan a Cypher query without executing it, so `plan` is None- see
+        `profile()`.
+        """
+        groovy, params = self.as_groovy(using)
+        cypher, cypher_params = self._query_string_from_params(params)
+        return QueryPlan(strategy=self.start_strategy(params),
+                         index_queries=self._index_queries(params),
+                         cypher=cypher, params=cypher_params, plan=None)
+
+    def profile(self, using):
+        """
+        Run the query with Cypher profiling and return a `QueryPlan` including
+        the server's execution plan. Each step of the plan is a dict with
+        'name', 'args', 'rows', 'dbHits' and 'children' keys.
+        """
+        plan = self.explain(using)
+        groovy, params = self.as_groovy(using, profile=True)
+        if groovy is None:
+            return plan
+        groovy = """
+            if (!Neo4Django.canProfileCypher()) {
+                results = Neo4Django.getNeo4djangoErrorMap(
+                    Neo4Django.PROFILING_UNSUPPORTED_MESSAGE, [:])
+            }
+            else {
+            %s
+            }
+            """ % groovy
+        with operation(model_label(self.model, 'profile'),
+                       fingerprint=self.fingerprint()):
+            server_plan = connections[using].gremlin_tx(groovy, **params)
+        if isinstance(server_plan, dict) and ERROR_ATTR in server_plan:
+            raise NotImplementedError(server_plan['message'])
+        return plan._replace(plan=server_plan)
+
     def execute(self, using):
         conn = connections[using]
 
         groovy, params = self.as_groovy(using)
 
-        raw_result_set = conn.gremlin_tx(groovy, **params) if groovy is not None else []
+        with operation(self.operation_label or model_label(self.model, 'query'),
+                       fingerprint=self.fingerprint()):
+            raw_result_set = conn.gremlin_tx(groovy, **params) \
+                    if groovy is not None else []
 
         #make the result_set not insane (properly lazy)
         result_set = [add_auth(LazyNode.from_dict(d), conn)
@@ -1191,11 +1735,122 @@ class Query(object):
         for r in model_results:
             yield r
 
+    def execute_paths(self, using):
+        """
+        Return the paths a traversal followed to each result, as tuples
+        alternating models and relationships, in one request.
+        """
+        if 'p' not in getattr(self.start_clause, 'passing_identifiers', []):
+            raise ValueError("Only traversals have paths.")
+        query = self.clone()
+        query.return_fields = {'p': 'p'}
+        query.distinct = False
+        groovy, params = query.as_groovy(using)
+        if groovy is None:
+            return []
+        groovy += """
+            results = Neo4Django.describePaths(results)
+            """
+        with operation(self.operation_label or model_label(self.model, 'paths'),
+                       fingerprint=query.fingerprint()):
+            raw_paths = connections[using].gremlin_tx(groovy, raw=True,
+                                                      **params)
+        return models_from_paths(raw_paths, using)
+
+    def shortest_paths(self, using, start_id, end_id, via=None,
+                       max_depth=DEFAULT_SHORTEST_PATH_DEPTH, all_paths=False):
+        """
+        Return the shortest path between two nodes, or every path of that
+        length if `all_paths`, found server-side with Neo4j's graph
+        algorithms. Relationships are followed in either direction, and only
+        those of the relationship fields named in `via` are followed, if
+        given.
+        """
+        rel_types = []
+        for name in via or []:
+            rel = getattr(self.model._meta, '_relationships', {}).get(name)
+            if rel is None:
+                raise exceptions.ValidationError(
+                    "Cannot find relationship `%s` from model %s." %
+                    (name, self.model.__name__))
+            rel_types.append(rel.rel_type)
+        script = """
+        results = Neo4Django.shortestPaths(startId, endId, relTypes,
+                                           excludedTypes, maxDepth, allPaths)
+        """
+        with operation(model_label(self.model, 'shortest_paths')):
+            raw_paths = connections[using].gremlin(
+                script, startId=start_id, endId=end_id,
+                relTypes=uniqify(rel_types),
+                excludedTypes=list(INTERNAL_RELATIONSHIPS),
+                maxDepth=max_depth,
+                allPaths=all_paths, raw=True)
+        return models_from_paths(raw_paths, using)
+
     def delete(self, using):
-        clone = self.clone()
-        clone.end_clause = DeleteNode(['n'])
-        for m in clone.execute(using):
-            pass
+        """
+        Delete all matching nodes, their relationships and index entries
+        server-side, in transactions of at most `NEO4DJANGO_DELETE_BATCH_SIZE`
+        nodes. Returns a dict of 'nodes' and 'relationships' deleted.
+
+        Models are only loaded if pre- or post-delete signal receivers are
+        connected, so the signals can be sent.
+        """
+        batch_size = getattr(settings, 'NEO4DJANGO_DELETE_BATCH_SIZE',
+                             DEFAULT_DELETE_BATCH_SIZE)
+        if self._has_delete_receivers():
+            return self._delete_with_signals(using, batch_size)
+
+        conn = connections[using]
+        groovy, params = self.as_groovy(using)
+        if groovy is None:
+            return {'nodes': 0, 'relationships': 0}
+        groovy += """
+            results = Neo4Django.deleteNodes(results.collect{it.id}, indexName,
+                                             batchSize)
+            """
+        params.update(indexName=self.model.index_name(using),
+                      batchSize=batch_size)
+        with operation(model_label(self.model, 'delete'),
+                       fingerprint=self.fingerprint()):
+            counts = conn.gremlin(groovy, **params)
+        from .relationships import forget_deleted
+        forget_deleted(self.model)
+        return counts
+
+    def _has_delete_receivers(self):
+        models, subclasses = [], [self.model]
+        while subclasses:
+            model = subclasses.pop()
+            models.append(model)
+            subclasses.extend(model.__subclasses__())
+        return any(signals.pre_delete.has_listeners(m) or
+                   signals.post_delete.has_listeners(m) for m in models)
+
+    def _delete_with_signals(self, using, batch_size):
+        from .relationships import forget_deleted
+        conn = connections[using]
+        script = """
+        results = Neo4Django.deleteNodes(ids, indexName, batchSize)
+        """
+        counts = {'nodes': 0, 'relationships': 0}
+        for batch in chunked(self.execute(using), batch_size):
+            for obj in batch:
+                signals.pre_delete.send(sender=type(obj), instance=obj,
+                                        using=using)
+            with operation(model_label(self.model, 'delete')):
+                batch_counts = conn.gremlin(
+                    script, ids=[obj.id for obj in batch],
+                    indexName=self.model.index_name(using),
+                    batchSize=batch_size)
+            for key in counts:
+                counts[key] += batch_counts[key]
+            for obj in batch:
+                obj._forget_node()
+                signals.post_delete.send(sender=type(obj), instance=obj,
+                                         using=using)
+                forget_deleted(type(obj), obj)
+        return counts
 
     def update(self, using, updates):
         if 'id' in updates or 'pk' in updates:
@@ -1321,11 +1976,30 @@ class NodeQuerySet(QuerySet):
 
     @transactional
     def in_bulk(self, id_list):
-        return dict((o.id, o) for o in self.model.objects.filter(id__in=id_list))
+        """
+        Return a dict of the models in this queryset with the given ids, in
+        the order they were given. Ids are fetched in batches of
+        `NEO4DJANGO_IN_BULK_BATCH_SIZE`, one request per batch.
+        """
+        assert self.query.can_filter(), \
+                "Cannot use 'limit' or 'offset' with in_bulk"
+        batch_size = getattr(settings, 'NEO4DJANGO_IN_BULK_BATCH_SIZE',
+                             DEFAULT_IN_BULK_BATCH_SIZE)
+        ids = uniqify(int(i) for i in id_list)
+        found = {}
+        for batch in chunked(ids, batch_size):
+            # each batch is small enough to fetch without paging
+            for obj in self.filter(id__in=batch).query.execute(self.db):
+                found[obj.id] = obj
+        return SortedDict((i, found[i]) for i in ids if i in found)
 
     @alters_data
     def delete(self):
-        self.query.delete(self.db)
+        """
+        Delete all nodes in the queryset, along with their relationships, and
+        return a dict of the number of 'nodes' and 'relationships' deleted.
+        """
+        return self.query.delete(self.db)
 
     @alters_data
     def update(self, **kwargs):
@@ -1402,6 +2076,88 @@ class NodeQuerySet(QuerySet):
                                       "queried against.")
         return super(NodeQuerySet, self).distinct(*field_names)
 
+    def traverse(self, start, path, min_depth=1, max_depth=1, unique=True):
+        """
+        Return the models in this queryset reached by following `path`- a
+        '__' separated chain of relationship fields- from `start`, a model or
+        id or a list of them (ids are taken to be of this queryset's model).
+        A single relationship can be followed between `min_depth` and
+        `max_depth` times, or without a limit if `max_depth` is None. Models
+        are returned once if `unique`, otherwise once for each path to them.
+
+            Person.objects.traverse(pete, 'friends', 2, 2).filter(age__gte=18)
+
+        The traversal and any other filters run as a single Cypher query.
+        """
+        starts = list(start) if isinstance(start, (list, tuple, set)) \
+                else [start]
+        models = [s for s in starts if not isinstance(s, (int, long))]
+        start_model = type(models[0]) if models else self.model
+        clone = self._clone()
+        clone.query.set_traversal([_node_id(s) for s in starts],
+                                  start_model, path, min_depth=min_depth,
+                                  max_depth=max_depth, unique=unique)
+        return clone
+
+    def paths(self):
+        """
+        Return the paths a traversal (see `traverse()`) followed to each
+        model, as tuples alternating models and relationships, starting with
+        the model traversed from.
+        """
+        return self.query.execute_paths(self.db)
+
+    def shortest_path(self, start, end, via=None,
+                      max_depth=DEFAULT_SHORTEST_PATH_DEPTH):
+        """
+        Return the shortest path between two models (or ids), as a tuple
+        alternating models and relationships, or None if they aren't
+        connected within `max_depth` relationships. Relationships are followed
+        in either direction- only those of this model's relationship fields
+        named in `via`, if given, otherwise any between models.
+
+            Person.objects.shortest_path(pete, sandra, via=['friends'])
+
+        The path is found and loaded in one request.
+        """
+        paths = self.query.shortest_paths(self.db, _node_id(start),
+                                          _node_id(end), via=via,
+                                          max_depth=max_depth)
+        return paths[0] if paths else None
+
+    def all_shortest_paths(self, start, end, via=None,
+                           max_depth=DEFAULT_SHORTEST_PATH_DEPTH):
+        """
+        Return every shortest path between two models (or ids), like
+        `shortest_path()`, as a list.
+        """
+        return self.query.shortest_paths(self.db, _node_id(start),
+                                         _node_id(end), via=via,
+                                         max_depth=max_depth, all_paths=True)
+
+    def after(self, cursor):
+        """
+        Paginate by keyset- return the rows following the one `cursor` was
+        made for (by `cursor()`) in this queryset's ordering, or from the
+        first row if `cursor` is None. Ties are broken by id, and rows without
+        a value for an ordered property are left out.
+
+            page = Person.objects.order_by('name').after(cursor)[:20]
+            cursor = page.cursor(page[19])
+        """
+        assert self.query.can_filter(), \
+                "Cannot paginate a query once a slice has been taken."
+        clone = self._clone()
+        clone.query.set_keyset(cursor)
+        return clone
+
+    def cursor(self, obj):
+        """
+        Return an opaque cursor for continuing this queryset's ordering after
+        `obj`, for use with `after()`.
+        """
+        return self.query.keyset_cursor(obj)
+
     @not_supported
     def extra(self, *args, **kwargs):
         pass
@@ -1414,6 +2170,27 @@ class NodeQuerySet(QuerySet):
     def only(self, *fields):
         pass
 
+    def query_string(self):
+        """
+        Return a (Cypher query, params dict) pair for this queryset.
+        """
+        return self.query.query_string(self.db)
+
+    def explain(self):
+        """
+        Return a `QueryPlan` describing how this queryset finds its starting
+        nodes (by 'id', 'index', or 'type_tree'), any Lucene index queries, and
+        the Cypher that will be run.
+        """
+        return self.query.explain(self.db)
+
+    def profile(self):
+        """
+        Run this queryset with profiling and return a `QueryPlan` including the
+        server's execution plan, with rows and db hits per operator.
+        """
+        return self.query.profile(self.db)
+
     ###################################
     # PUBLIC INTROSPECTION ATTRIBUTES #
     ###################################
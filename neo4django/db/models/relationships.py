@@ -2,25 +2,28 @@ from django.db import models
 from django.db.models.fields.related import add_lazy_relation
 from django.db.models.query_utils import DeferredAttribute
 from django.db.models.query import EmptyQuerySet
-from django.db.models.signals import post_delete
 from django.forms import ModelChoiceField, ModelMultipleChoiceField
 from django.utils.text import capfirst
-from django.dispatch import receiver
 
 from neo4django import Incoming, Outgoing
-from neo4django.db import DEFAULT_DB_ALIAS
+from neo4django.db import DEFAULT_DB_ALIAS, connections
 from neo4django.decorators import not_implemented, transactional
-from neo4django.utils import AssignableList, AttrRouter
+from neo4django.utils import AssignableList, AttrRouter, chunked
 from neo4django.constants import INTERNAL_ATTR, ORDER_ATTR
+from neo4django.metrics import instrumented, model_label
 from .base import NodeModel
 from .query import (NodeQuerySet, Query, cypher_rel_str)
+from .script_utils import LazyRelationship, _add_auth as add_auth
+from .session import UnitOfWork
 from .cypher import  (Clauses, Start, With, Match, Path, NodeComponent,
         RelationshipComponent, OrderBy, OrderByTerm, ColumnExpression)
 
 from neo4jrestclient.constants import RELATIONSHIPS_IN, RELATIONSHIPS_OUT
 
+from bisect import bisect_right
 from collections import defaultdict
 from functools import partial
+import weakref
 
 
 class RelationshipModel(object):
@@ -326,20 +329,29 @@ class BoundRelationship(AttrRouter, DeferredAttribute):
 
         return new_rel_dict
 
-    def _save_(instance, node):
+    def _relationship_batch(instance, node):
+        #collects the instance's relationship changes into a batch
         state = BoundRelationship._state_for(instance, create=False)
+        batch = RelationshipBatch(node, instance.using)
         if state:
             rels = BoundRelationship._all_relationships_for(instance)
             for key in state.keys():
-                rels[key]._save_relationship(instance, node, state[key])
+                rels[key]._save_relationship(instance, node, state[key], batch)
                 if isinstance(state[key], tuple):  # HACK, rearchitect
                     state[key] = (False, state[key][1])
+        return batch
+
+    NodeModel._relationship_batch = staticmethod(_relationship_batch)
+    del _relationship_batch
+
+    def _save_(instance, node):
+        NodeModel._relationship_batch(instance, node).execute()
 
     #TODO this... well, consider revising
     NodeModel._save_neo4j_relationships = staticmethod(_save_)
 
     @not_implemented
-    def _save_relationship(self, instance, node, state):
+    def _save_relationship(self, instance, node, state, batch):
         pass
 
     def _load_relationships(self, node):
@@ -372,17 +384,39 @@ class BoundRelationship(AttrRouter, DeferredAttribute):
         raise TypeError("Cannot delete <%s>.%s" %
                         (obj.__class__.__name__, self.name))
 
-    def _create_neo_relationship(self, node, obj, **kwargs):
-        neo_rel_attrs = kwargs.get('attrs', {})
-        neo_rel_attrs[INTERNAL_ATTR] = True
-        if obj.pk is None:
-            obj.save(using=obj.using)
-        other = obj.node
-        # TODO: verify that it's ok in the reverse direction?
-        if self.direction != 'out':
-            node, other = other, node
+    def bulk_connect(self, edges, batch_size=1000, using=DEFAULT_DB_ALIAS):
+        """
+        Relate existing nodes by id, without loading any models. For example,
+
+            Document.tags.bulk_connect([(doc_id, tag_id), ...])
 
-        node.relationships.create(self._type, other, **neo_rel_attrs)
+        Each edge should be a (source id, target id) pair or a (source id,
+        target id, property dict) triple, where sources are instances of the
+        model the relationship is defined on. Relationships are created
+        server-side, `batch_size` at a time, each batch in its own transaction.
+        Related objects already loaded won't see the new relationships.
+
+        Returns the number of relationships created.
+        """
+        script = """
+        results = Neo4Django.connectNodes(relType, direction, ordered, edges)
+        """
+        conn = connections[using]
+        created = 0
+        for chunk in chunked(edges, batch_size):
+            batch = []
+            for edge in chunk:
+                if len(edge) not in (2, 3):
+                    raise ValueError('Edges should be (source id, target id) '
+                                     'pairs or (source id, target id, '
+                                     'properties) triples.')
+                props = dict(edge[2]) if len(edge) == 3 else {}
+                batch.append([int(edge[0]), int(edge[1]), props])
+            created += int(conn.gremlin_tx(script, relType=self._type,
+                                           direction=self.direction,
+                                           ordered=bool(self.ordered),
+                                           edges=batch, raw=True))
+        return created
 
     @classmethod
     def to_python(cls, value):
@@ -432,6 +466,90 @@ class BoundRelationship(AttrRouter, DeferredAttribute):
         self._del_relationship(obj, self._state_for(obj))
 
 
+class RelationshipBatch(object):
+    """
+    Collects relationship changes for a single node so they can be sent to the
+    server in one request.
+    """
+    def __init__(self, node, using=DEFAULT_DB_ALIAS):
+        self.node = node
+        self.using = using
+        self.removed_ids = []
+        self.cleared_types = []
+        self.additions = []
+        self._callbacks = []
+
+    def __len__(self):
+        return len(self.removed_ids) + len(self.cleared_types) + \
+                sum(len(a[3]) for a in self.additions)
+
+    def remove(self, relationship):
+        """
+        Delete an existing relationship.
+        """
+        self.removed_ids.append(relationship.id)
+
+    def clear(self, rel_type, direction):
+        """
+        Delete all neo4django relationships of a type in a direction.
+        """
+        self.cleared_types.append([rel_type, direction])
+
+    def add(self, rel_type, direction, objs, ordered=False, callback=None):
+        """
+        Relate the node to each model in `objs`, saving any that are unsaved.
+        If the relationship is ordered, new relationships are placed after any
+        existing ones in the order provided. If a callback is provided, it will
+        be called with (relationship, model) pairs once they're created.
+        """
+        for obj in objs:
+            if obj.pk is None:
+                obj.save(using=obj.using)
+        self.additions.append([rel_type, direction, ordered, list(objs)])
+        self._callbacks.append((objs, callback))
+
+    def as_params(self, node_ref=lambda obj: obj.pk):
+        """
+        Return the removed relationship ids, cleared types and additions to
+        pass to Neo4Django.updateRelationships, with the related models in
+        each addition given by `node_ref(model)`.
+        """
+        additions = [[rel_type, direction, ordered,
+                      [node_ref(obj) for obj in objs]]
+                     for rel_type, direction, ordered, objs in self.additions]
+        return [self.removed_ids, self.cleared_types, additions]
+
+    def finish(self, created):
+        """
+        Call back with the relationships created for this batch, taken in order
+        from the `created` iterable of relationship dicts, and reset it.
+        """
+        conn = connections[self.using]
+        created = iter(created or [])
+        for objs, callback in self._callbacks:
+            pairs = [(add_auth(LazyRelationship.from_dict(created.next()), conn),
+                      obj) for obj in objs]
+            if callback is not None:
+                callback(*pairs)
+        self.removed_ids, self.cleared_types, self.additions = [], [], []
+        self._callbacks = []
+
+    def execute(self):
+        if len(self) == 0:
+            return
+        conn = connections[self.using]
+        script = """
+        results = Neo4Django.updateRelationships(nodeId, removedIds,
+                                                 clearedTypes, additions)
+        """
+        removed_ids, cleared_types, additions = self.as_params()
+        created = conn.gremlin_tx(script, nodeId=self.node.id,
+                                  removedIds=removed_ids,
+                                  clearedTypes=cleared_types,
+                                  additions=additions, raw=True)
+        self.finish(created)
+
+
 class SingleNode(BoundRelationship):
     #BoundRelationship subclass for a single node relationship without an
     #associated relationship model.
@@ -452,6 +570,8 @@ class SingleNode(BoundRelationship):
     def value_from_object(self, obj):
         return self.__get__(obj)
 
+    @instrumented(lambda self, node: model_label(self.source_model,
+                                                 '%s.load' % self.name))
     @transactional
     def _load_related(self, node):
         relationships = self._load_relationships(node)
@@ -482,23 +602,14 @@ class SingleNode(BoundRelationship):
     def _set_relationship(self, obj, state, other):
         state[self.name] = True, other
 
-    def _save_relationship(self, instance, node, state):
+    def _save_relationship(self, instance, node, state, batch):
         changed, other = state
         if not changed:
             return
-        rels = self._load_relationships(node)
-
-        #delete old relationship
-        #create new relationship
-
-        if other is None:
-            #delete old relationship if it exists
-            if hasattr(rels, 'single') and rels.single:
-                rels.single.delete()  # TODO this deletion should be transactional w creation
-            rels.single = None
-        else:
-            rels.single = self._create_neo_relationship(node, other)
-            #other._save_neo4j_node(DEFAULT_DB_ALIAS)
+        #replace the old relationship, if there is one
+        batch.clear(self._type, self.direction)
+        if other is not None:
+            batch.add(self._type, self.direction, [other])
 
     def save_form_data(self, instance, data):
         # TODO we need a function like _get_relationship that only takes a
@@ -592,8 +703,8 @@ class MultipleNodes(BoundRelationship):
     def accept(self, obj):
         pass  # TODO: implement verification
 
-    def _save_relationship(self, instance, node, state):
-        state.__save__(node)
+    def _save_relationship(self, instance, node, state, batch):
+        state.__save__(node, batch)
 
     def _load_relationships(self, node, ordered=False, **kwargs):
         sup = super(MultipleNodes, self)._load_relationships(node, **kwargs)
@@ -601,16 +712,6 @@ class MultipleNodes(BoundRelationship):
             return sorted(sup, key=lambda rel: rel[ORDER_ATTR])
         return sup
 
-    def _create_neo_relationship(self, node, *args, **kwargs):
-        if self.ordered:
-            rels = self._load_relationships(node, ordered=True, **kwargs)
-            new_index = rels[-1][ORDER_ATTR] + 1 if len(rels) > 0 else 0
-            if 'attrs' in kwargs:
-                kwargs['attrs'][ORDER_ATTR] = new_index
-            else:
-                kwargs['attrs'] = {ORDER_ATTR: new_index}
-        return super(MultipleNodes, self)._create_neo_relationship(node, *args, **kwargs)
-
 
 class MultipleRelationships(BoundRelationshipModel):  # WAIT!
 
@@ -623,6 +724,25 @@ class MultipleRelationships(BoundRelationshipModel):  # WAIT!
         pass
 
 
+# live relationship instances by target model. This is used instead of
+# post_delete receivers, so deletes can tell whether any user code needs models
+# loaded to receive signals.
+_instances_by_target = defaultdict(weakref.WeakSet)
+
+
+def forget_deleted(model, obj=None):
+    """
+    Remove a deleted object of type `model` from related object caches. If no
+    object is passed (after a bulk delete), caches that could hold any objects
+    of that type are dropped instead.
+    """
+    for target, instances in _instances_by_target.items():
+        if issubclass(model, target) or (obj is None and
+                                         issubclass(target, model)):
+            for instance in list(instances):
+                instance._forget_deleted(obj)
+
+
 # TODO this needs to be supplanted by using somthing like django.db.models
 # .fields.related.ForeignRelatedObjectsDescriptor
 class RelationshipInstance(models.Manager):
@@ -638,37 +758,54 @@ class RelationshipInstance(models.Manager):
         #holds cached domain objects (that have been added or loaded by query)
         self._cache = None
         self._cache_unique = set([])
+        #order values parallel to the cache, for ordered relationships
+        self._cache_order = []
 
-        # sender should be the associated model (not any associated LazyModel)
-        sender = (self._rel.target_model._model
+        # register by the associated model (not any associated LazyModel), so
+        # deletes of that model can be forgotten by the cache
+        target = (self._rel.target_model._model
                   if hasattr(self._rel.target_model, '_model')
                   else self._rel.target_model)
-
-        @receiver(post_delete, sender=sender, weak=False)
-        def delete_handler(sender, **kwargs):
-            deleted_obj = kwargs.pop('instance', None)
-            if deleted_obj:
-                self._remove_from_cache(deleted_obj)
-                if deleted_obj in self._added:
-                    self._added.remove(deleted_obj)
+        _instances_by_target[target].add(self)
 
     ordered = property(lambda self: self._rel.ordered)
 
     def _add_to_cache(self, *relationship_neo4j_pairs):
+        #ordered caches are kept sorted as pairs are added, so loading related
+        #objects in any order doesn't require re-sorting
+        cache = self._get_or_create_cache()
         for pair in relationship_neo4j_pairs:
             if pair not in self._cache_unique:
-                self._get_or_create_cache().append(pair)
+                if self.ordered:
+                    order = pair[0].properties.get(ORDER_ATTR, None)
+                    index = bisect_right(self._cache_order, order)
+                    self._cache_order.insert(index, order)
+                    cache.insert(index, pair)
+                else:
+                    cache.append(pair)
                 self._cache_unique.add(pair)
 
     def _remove_from_cache(self, obj):
         if self._cache is not None:
-            for r, cached_obj in self._cache[:]:
+            for index, (r, cached_obj) in enumerate(self._cache):
                 if cached_obj == obj:
-                    pair = (r, cached_obj)
-                    self._cache.remove(pair)
+                    pair = self._cache.pop(index)
                     self._cache_unique.remove(pair)
+                    if self.ordered:
+                        del self._cache_order[index]
                     break
 
+    def _forget_deleted(self, obj=None):
+        if obj is None:
+            #we can't tell which objects were deleted, so reload next time
+            self._cache = None
+            self._cache_unique = set([])
+            self._cache_order = []
+        else:
+            self._remove_from_cache(obj)
+            if obj in self._added:
+                self._added.remove(obj)
+
     def _has_cache(self):
         return self._cache is not None
 
@@ -677,18 +814,24 @@ class RelationshipInstance(models.Manager):
             self._cache = []
         return self._cache
 
-    def __save__(self, node):
+    def __save__(self, node, batch=None):
         #Deletes all relationships removed since last save and adds any new
-        #relatonships to the database.
-
-        #TODO this should be batched
+        #relatonships to the database. If a batch is provided, the changes are
+        #added to it instead of being executed immediately.
+        if batch is None:
+            own_batch = batch = RelationshipBatch(node, self._obj.using)
+        else:
+            own_batch = None
         for relationship in self._removed:
-            relationship.delete()
-        for obj in self._added:
-            new_rel = self._rel._create_neo_relationship(node, obj)
-            self._add_to_cache((new_rel, obj))
+            batch.remove(relationship)
+        if self._added:
+            batch.add(self._rel.rel_type, self._rel.direction,
+                      list(self._added), ordered=self.ordered,
+                      callback=self._add_to_cache)
         self._removed[:] = []
         self._added[:] = []
+        if own_batch is not None:
+            own_batch.execute()
 
     def _neo4j_relationships_and_models(self, node):
         """
@@ -772,10 +915,12 @@ class RelationshipInstance(models.Manager):
     def create(self, **kwargs):
         kwargs[self._rel.relationship._related_name] = self._obj
         new_model = self._rel.relationship.target_model(**kwargs)
-        # TODO: saving twice, should only need
-        # to save self._obj after #89 fix
-        new_model.save()
-        self._obj.save()
+        # TODO: should only need to save self._obj after #89 fix- for now,
+        # save both in one request
+        with UnitOfWork():
+            new_model.save()
+            self._obj.save()
+        return new_model
 
     @not_implemented
     def get_or_create(self, *args, **kwargs):
@@ -804,6 +949,13 @@ class RelationshipQuerySet(NodeQuerySet):
         self.query.set_start_clause(self._get_start_clause(), lambda: {
             'startParam': self._model_instance.id
         })
+        self.query.operation_label = model_label(type(model_instance),
+                                                 '%s.load' % rel.name)
+        if rel_instance.ordered:
+            # order (and slice) by position in the relationship, unless
+            # another ordering is given
+            self.query.set_default_ordering(
+                OrderBy([OrderByTerm(ColumnExpression('r', ORDER_ATTR))]))
 
     def _get_start_clause(self):
         """
@@ -814,10 +966,6 @@ class RelationshipQuerySet(NodeQuerySet):
         should define a column "n" containing nodes to later be filtered
         against.
         """
-        order_clause = """
-            ORDER BY r.`%s`
-        """ % ORDER_ATTR if self._rel_instance.ordered else ''
-
         start = Start({'m': 'node({startParam})'}, ['startParam'])
 
         direction = '>' if self._rel.direction == RELATIONSHIPS_OUT else '<'
@@ -829,13 +977,10 @@ class RelationshipQuerySet(NodeQuerySet):
                                         direction=direction),
                   NodeComponent('n')])])
 
-        order_by = OrderBy([OrderByTerm(ColumnExpression('r', ORDER_ATTR))]) \
-                if self._rel_instance.ordered else None
-
         return Clauses([
             start,
             match,
-            With({'n': 'n', 'r': 'r', 'typeNode': 'typeNode'}, order_by=order_by)
+            With({'n': 'n', 'r': 'r', 'typeNode': 'typeNode'})
         ])
 
     def iterator(self):
@@ -99,20 +99,20 @@ class SkeletonNode(SkeletonBase, LazyNode):
 
 def batch_base(ids, cls, using):
     """
-    A function to replace the REST client's non-lazy batching.
+    A function to replace the REST client's non-lazy batching, fetching every
+    element with a single Cypher START clause.
     """
     #HACK to get around REST client limitations
-    gremlin_func = 'e' if issubclass(cls, neo4j.Relationship) else 'v'
+    if not ids:
+        return []
+    start = 'relationship' if issubclass(cls, neo4j.Relationship) else 'node'
     script = """
-    t = new Table()
-    for (def id : ids) {
-        g.%s(id).as('elements').table(t,['elements']).iterate()
-    }
-    results = t
+    results = Neo4Django.cypher('START e=%s({ids}) RETURN e', [ids: ids])\
+                .columnAs('e').toList()
     """
-    script %= gremlin_func
-    result_table = connections[using].gremlin(script, ids=ids)
-    return [_add_auth(cls.from_dict(v[0]), connections[using]) for v in result_table['data']]
+    script %= start
+    elements = connections[using].gremlin(script, ids=ids, raw=True)
+    return [_add_auth(cls.from_dict(e), connections[using]) for e in elements]
 
 
 def batch_rels(ids, using):
@@ -0,0 +1,52 @@
+"""
+Block allocation of AutoProperty values.
+
+Rather than locking a model's type node for every new node, each process
+reserves a block of values at a time (NEO4DJANGO_AUTO_PROPERTY_BLOCK_SIZE,
+1000 by default) and hands them out locally. Values stay unique, and increase
+within a process, but values reserved by a process that exits unused are
+skipped, so sequences can have gaps.
+"""
+from collections import deque
+import threading
+
+from django.conf import settings
+
+from neo4django.db import connections
+
+DEFAULT_BLOCK_SIZE = 1000
+
+_lock = threading.Lock()
+
+
+def block_size():
+    return getattr(settings, 'NEO4DJANGO_AUTO_PROPERTY_BLOCK_SIZE',
+                   DEFAULT_BLOCK_SIZE)
+
+
+def next_auto_value(prop, prop_class, instance):
+    """
+    Return the next value of an auto property, declared on `prop_class`, for a
+    model instance. A new block of values is reserved from the database if
+    this process has run out.
+    """
+    conn = connections[instance.using]
+    #values of properties declared on abstract models are shared by all
+    #their subclasses, otherwise each concrete model has its own sequence
+    model = prop_class if prop_class._meta.abstract else type(instance)
+    key = (model._type_node_key(), prop.name)
+    with _lock:
+        #blocks are kept on the connection, so they're forgotten with cleandb
+        blocks = conn.caches.setdefault('auto_values', {})
+        block = blocks.setdefault(key, deque())
+        if not block:
+            script = """
+            results = Neo4Django.reserveAutoValues(typeNode, prop, count,
+                                                   autoDefault, incrementFunc)
+            """
+            type_node = model._type_node_ref(instance.using)
+            block.extend(conn.gremlin(script, typeNode=type_node,
+                                      prop=prop.name, count=block_size(),
+                                      autoDefault=prop.auto_default,
+                                      incrementFunc=prop.next_value_gremlin))
+        return block.popleft()
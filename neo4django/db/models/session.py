@@ -0,0 +1,151 @@
+"""
+Units of work- defer saving models until the end of a block, then save all of
+them, with their properties and relationships, in a single request and
+transaction per database.
+
+    from neo4django import unit_of_work
+
+    with unit_of_work():
+        pete = Person(name='Pete')
+        pete.save()
+        pete.friends.add(Person(name='Sandra'))
+        pete.save()
+
+Models saved in a unit of work don't have ids until it ends. Nested units of
+work are saved with the outermost one, and nothing is saved if the block
+raises an exception.
+"""
+import threading
+
+from django.db.models import signals
+
+from neo4django.db import connections
+from .script_utils import LazyNode, _add_auth as add_auth
+
+_local = threading.local()
+
+
+def _unit_of_work_stack():
+    try:
+        return _local.units_of_work
+    except AttributeError:
+        _local.units_of_work = stack = []
+        return stack
+
+
+def current_unit_of_work():
+    """
+    Return the outermost unit of work active in this thread, or None.
+    """
+    stack = _unit_of_work_stack()
+    return stack[0] if stack else None
+
+
+class UnitOfWork(object):
+    """
+    A context manager collecting the models saved in its block, and saving
+    them when the block ends.
+    """
+    def __init__(self):
+        self._pending = []
+        self._pending_ids = set()
+
+    def __enter__(self):
+        _unit_of_work_stack().append(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        stack = _unit_of_work_stack()
+        stack.remove(self)
+        if exc_type is None and not stack:
+            self.flush()
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, instance, cls=None, raw=False):
+        """
+        Save a model when the unit of work ends. Models are only saved once,
+        however many times they're added.
+        """
+        if id(instance) not in self._pending_ids:
+            self._pending_ids.add(id(instance))
+            self._pending.append((instance, cls or type(instance), raw))
+
+    def flush(self):
+        """
+        Save all pending models. New nodes are created first, then properties
+        and relationships are saved, so related models can refer to nodes
+        created in the same request.
+        """
+        # collecting changes can save related models, which should join this
+        # unit of work
+        _unit_of_work_stack().append(self)
+        try:
+            saves = self._collect()
+        finally:
+            _unit_of_work_stack().remove(self)
+        self._pending, self._pending_ids = [], set()
+
+        by_database = {}
+        for save in saves:
+            by_database.setdefault(save[0].using, []).append(save)
+        for using, database_saves in by_database.items():
+            self._save(using, database_saves)
+
+    def _collect(self):
+        saves = []
+        # _pending can grow as we go
+        for instance, cls, raw in self._pending:
+            signals.pre_save.send(sender=cls, instance=instance, raw=raw,
+                                  using=instance.using)
+            is_new = instance.id is None
+            node = None if is_new else instance.node
+            prop_map = instance._property_map(
+                instance, instance if is_new else node, is_new)
+            batch = instance._relationship_batch(instance, node)
+            saves.append((instance, cls, raw, is_new, prop_map, batch))
+        return saves
+
+    def _save(self, using, saves):
+        conn = connections[using]
+        refs, new_nodes = {}, []
+        for instance, cls, raw, is_new, prop_map, batch in saves:
+            if is_new:
+                new_nodes.append(instance._node_creation_params(using))
+                refs[id(instance)] = -len(new_nodes)
+            else:
+                refs[id(instance)] = instance.id
+
+        node_ref = lambda obj: refs.get(id(obj), obj.pk)
+        property_updates = [[refs[id(s[0])], s[4]] for s in saves]
+        relationship_updates = [[refs[id(s[0])]] + s[5].as_params(node_ref)
+                                for s in saves if len(s[5]) > 0]
+
+        script = """
+        results = Neo4Django.saveModels(newNodes, propertyUpdates,
+                                        relationshipUpdates)
+        """
+        results = conn.gremlin(script, newNodes=new_nodes,
+                               propertyUpdates=property_updates,
+                               relationshipUpdates=relationship_updates,
+                               raw=True)
+        if isinstance(results, dict) and 'update' in results:
+            # a property couldn't be saved, so nothing was- raise the error
+            instance = saves[results['update']][0]
+            instance._apply_saved_properties(instance, results)
+
+        results = iter(results)
+        for instance, cls, raw, is_new, prop_map, batch in saves:
+            node_dict = results.next()
+            if is_new:
+                instance._set_node(add_auth(LazyNode.from_dict(node_dict),
+                                            conn))
+            instance._apply_saved_properties(instance, node_dict)
+        for instance, cls, raw, is_new, prop_map, batch in saves:
+            if len(batch) > 0:
+                batch.finish(results)
+        for instance, cls, raw, is_new, prop_map, batch in saves:
+            signals.post_save.send(sender=cls, instance=instance,
+                                   created=(not is_new), raw=raw,
+                                   using=using)
@@ -26,3 +26,11 @@ class NoSuchDatabaseError(Error):
 
     def __str__(self):
         return 'No such database exists: %s'.format(str(self.url or self.name))
+
+
+class RequestBudgetExceeded(Error):
+    """
+    Error for when a `neo4django.budget.RequestBudget` set to raise sees more
+    requests, or more repeats of a single query, than it allows.
+    """
+    pass
@@ -1,19 +1,36 @@
 import org.neo4j.helpers.collection.MapUtil
 import org.neo4j.graphdb.index.IndexManager
+import org.neo4j.graphdb.Direction
+import org.neo4j.graphdb.DynamicRelationshipType
+import org.neo4j.graphdb.NotFoundException
+import org.neo4j.graphalgo.GraphAlgoFactory
+import org.neo4j.helpers.Predicate
+import org.neo4j.kernel.Traversal
 import com.tinkerpop.blueprints.pgm.impls.neo4j.Neo4jIndex
 
 import org.neo4j.cypher.javacompat.ExecutionEngine
+import org.neo4j.index.lucene.QueryContext
+import org.apache.lucene.search.Sort
+import org.apache.lucene.search.SortField
 
 class Neo4Django {
     static public binding
     static transactions = []
     static bufferSizes = []
     static parsedCypher = [:]
+    // compiled closures by source, least recently used first
+    static compiledClosures = new LinkedHashMap(16, 0.75f, true)
+    static closureCacheCounts = [hits:0, misses:0, evictions:0]
     static final AUTO_PROP_INDEX_KEY = 'LAST_AUTO_VALUE'
     static final UNIQUENESS_ERROR_MESSAGE = 'neo4django: uniqueness error'
+    static final PROFILING_UNSUPPORTED_MESSAGE = 'Profiling Cypher queries requires Neo4j 1.9 or later.'
     static final INTERNAL_ATTR='_neo4django'
     static final TYPE_ATTR=INTERNAL_ATTR + '_type'
     static final ERROR_ATTR=INTERNAL_ATTR + '_error'
+    static final ORDER_ATTR=INTERNAL_ATTR + '_order'
+    static final CLOSURE_CACHE_SIZE = 256
+    // exact indexes are named after their model's fulltext index
+    static final EXACT_INDEX_SUFFIX = '-exact'
 
     static cypher(queryString, params) {
         def query, engine = new ExecutionEngine(binding.g.getRawGraph())
@@ -34,11 +51,60 @@ class Neo4Django {
         return engine.execute(query, params)
     }
 
+    static canProfileCypher() {
+        // ExecutionEngine.profile was added in Neo4j 1.9
+        return ExecutionEngine.methods.any{ it.name == 'profile' }
+    }
+
+    static profileCypher(queryString, params) {
+        def engine = new ExecutionEngine(binding.g.getRawGraph())
+        return engine.profile(queryString, params)
+    }
+
+    static describePlan(table, results) {
+        /**
+        * Exhaust a profiled Cypher result and return its execution plan.
+        *
+        * @param table the result of profileCypher.
+        * @param results an iterator over one of the table's columns.
+        */
+        while (results.hasNext()) {
+            results.next()
+        }
+        return describePlanStep(table.executionPlanDescription())
+    }
+
+    static describePlanStep(step) {
+        def stats = step.hasProfilerStatistics() ? step.getProfilerStatistics() : null
+        return [name: step.getName(),
+                args: step.getArguments().collectEntries{k, v -> [k, v.toString()]},
+                rows: stats?.getRows(),
+                dbHits: stats?.getDbHits(),
+                children: step.getChildren().collect{describePlanStep(it)}]
+    }
+
     static getModelTypes(nodes){
-        /* Return a table with a node and its neo4django type name.*/
-        //TODO
-        //results = cypher('')
-        //rv = Table()
+        /**
+        * Return the neo4django type name of each node, or null for nodes that
+        * aren't model instances.
+        */
+        def instanceType = DynamicRelationshipType.withName('<<INSTANCE>>')
+        return nodes.collect{
+            def instanceRel = it.getSingleRelationship(instanceType,
+                                                       Direction.INCOMING)
+            instanceRel?.getStartNode()?.getProperty('name', null)
+        }
+    }
+
+    static describePaths(paths) {
+        /**
+        * Return each path as its nodes, relationships and the type names of
+        * its nodes, so models can be built without another request.
+        */
+        return paths.collect{
+            def nodes = it.nodes().collect{it}
+            [nodes, it.relationships().collect{it}, getModelTypes(nodes)]
+        }
     }
 
     static getNeo4djangoErrorMap(message, map) {
@@ -48,40 +114,121 @@ class Neo4Django {
         return errorMap
     }
 
-    static queryNodeIndices(queries) {
+    static queryNodeIndices(queries, maxHits=null, sortKey=null, sortReverse=false) {
         /**
         * Returns the intersection of multiple node index queries.
         *
-        * @param queries a list of (query name, query string) pairs.
+        * Queries are run in order of their estimated hit counts, so only the
+        * nodes of the most selective query are collected- the hits of the
+        * rest are streamed and checked against them, stopping as soon as
+        * every remaining node has been seen or none are left.
+        *
+        * @param queries a list of (index name, query string) pairs.
+        * @param maxHits if not null, the most nodes to return- the first
+        *                hits, in index order or sorted by sortKey.
+        * @param sortKey an index key to sort the hits of a single query by.
+        * @param sortReverse whether to sort in descending order.
         */
-        def neo4j = binding.g.getRawGraph()
+        if (sortKey != null && queries.size() > 1) {
+            // the intersection can't be sorted, so every node is needed
+            maxHits = null
+        }
+        def hitsByQuery = [], index, rawIndex, hits, query
+        try {
+            for (def q : queries) {
+                (index, rawIndex) = getOrCreateIndex(q[0])
+                query = q[1]
+                if (queries.size() == 1 && (maxHits != null || sortKey != null)) {
+                    query = new QueryContext(q[1])
+                    if (sortKey != null) {
+                        query.sort(new Sort(new SortField(sortKey, SortField.STRING,
+                                                          sortReverse)))
+                    }
+                    if (maxHits != null) {
+                        query.top(maxHits)
+                    }
+                }
+                hits = rawIndex?.query(query)
+                if (hits != null) {
+                    hitsByQuery << hits
+                    if (hits.size() == 0) {
+                        return []
+                    }
+                }
+            }
+            if (hitsByQuery.size() == 0) {
+                return []
+            }
+            hitsByQuery.sort{it.size()}
 
-        //pull all nodes from indexes
-        //TODO run the javascript expression on each node, and only return if true
-        //TODO check all the types and make sure they match, or don't return
-        def nodes = [] as Set, index, rawIndex
-        for (def q : queries) {
-            (index, rawIndex) = getOrCreateIndex(q[0])
-            if (rawIndex != null) {
-                def newNodes = rawIndex.query(q[1])
-                if (newNodes != null) {
-                    if (nodes.size() == 0) {
-                        for (def n: newNodes) {
-                            nodes.add(n)
+            def nodes = new LinkedHashSet()
+            for (def n : hitsByQuery[0]) {
+                nodes.add(n)
+                if (hitsByQuery.size() == 1 && nodes.size() == maxHits) {
+                    break
+                }
+            }
+            for (def other : hitsByQuery.tail()) {
+                def found = new HashSet()
+                for (def n : other) {
+                    if (nodes.contains(n)) {
+                        found.add(n)
+                        if (found.size() == nodes.size()) {
+                            break
                         }
                     }
-                    else {
-                        nodes = nodes.intersect(newNodes)
-                    }
                 }
-                if(nodes.size() == 0) {
+                nodes.retainAll(found)
+                if (nodes.size() == 0) {
                     break
                 }
             }
+            if (maxHits != null && nodes.size() > maxHits) {
+                return nodes.toList()[0..<maxHits]
+            }
+            return nodes
+        }
+        finally {
+            hitsByQuery*.close()
         }
-        nodes
     }
     
+    static queryIndexPlan(plan) {
+        /**
+        * Returns the nodes matching a tree of node index queries, combined
+        * with set algebra.
+        *
+        * @param plan an ['query', index name, query string] leaf, or an
+        *             ['and', plans] or ['or', plans] node.
+        */
+        if (plan[0] == 'query') {
+            return queryNodeIndices([plan[1..2]])
+        }
+        def nodes
+        if (plan[0] == 'or') {
+            nodes = new LinkedHashSet()
+            for (def child : plan[1]) {
+                nodes.addAll(queryIndexPlan(child))
+            }
+            return nodes
+        }
+        // intersect the index queries first, most selective first, then
+        // any nested plans
+        def queries = plan[1].findAll{it[0] == 'query'}.collect{it[1..2]}
+        if (queries.size() > 0) {
+            nodes = new LinkedHashSet(queryNodeIndices(queries))
+        }
+        for (def child : plan[1].findAll{it[0] != 'query'}) {
+            if (nodes == null) {
+                nodes = new LinkedHashSet(queryIndexPlan(child))
+            }
+            else if (nodes.size() > 0) {
+                nodes.retainAll(new HashSet(queryIndexPlan(child)))
+            }
+        }
+        return nodes
+    }
+
     static getLockManager() {
         binding.g.getRawGraph().getConfig().getLockManager()
     }
@@ -114,7 +261,28 @@ class Neo4Django {
         finishTx(false)
     }
 
+    static findTypeNode(types) {
+        /**
+        * Return the type node for a type hierarchy, or null if it doesn't
+        * exist yet. Unlike getTypeNode, this takes no locks.
+        */
+        def curVertex = binding.g.v(0)
+        for (def typeProps : types) {
+            curVertex = curVertex.outE('<<TYPE>>').inV.find{
+                it.map().subMap(typeProps.keySet()) == typeProps
+            }
+            if (curVertex == null) {
+                return null
+            }
+        }
+        return curVertex
+    }
+
     static getTypeNode(types) {
+        def existing = findTypeNode(types)
+        if (existing != null) {
+            return existing
+        }
         def g = binding.g
         def originalBufferSize = g.getMaxBufferSize()
         startTx()
@@ -150,21 +318,41 @@ class Neo4Django {
         node.in('<<INSTANCE>>').next()
     }
 
-    static createNodeWithTypes(types) {
+    static resolveTypeNode(typeNodeRef) {
+        /**
+        * Return a type node given its id, or its type hierarchy if the
+        * client doesn't know the id yet.
+        */
+        if (typeNodeRef instanceof Number) {
+            def typeNode = binding.g.v(typeNodeRef)
+            if (typeNode == null) {
+                throw new IllegalArgumentException(
+                        "Type node ${typeNodeRef} doesn't exist.")
+            }
+            return typeNode
+        }
+        return getTypeNode(typeNodeRef)
+    }
+
+    static createNodeOfType(typeNodeRef) {
         def g = binding.g
-        def typeNode = getTypeNode(types)
+        def typeNode = resolveTypeNode(typeNodeRef)
         def newVertex = g.addVertex()
         g.addEdge(typeNode, newVertex, '<<INSTANCE>>', [:])
         newVertex
     }
 
+    static indexConfig(indexName) {
+        def type = indexName.endsWith(EXACT_INDEX_SUFFIX) ? "exact" : "fulltext"
+        return MapUtil.stringMap(IndexManager.PROVIDER, "lucene", "type", type)
+    }
+
     //returns 
     static getOrCreateIndex(indexName) {
         def g = binding.g
         def index = g.idx(indexName), rawIndex = null
         if (!index){
-            def opts = MapUtil.stringMap(IndexManager.PROVIDER, "lucene", "type", "fulltext")
-            rawIndex = g.getRawGraph().index().forNodes(indexName, opts)
+            rawIndex = g.getRawGraph().index().forNodes(indexName, indexConfig(indexName))
             //XXX can't use g.idx because gremlin doesn't get indices dynamically
             index = new Neo4jIndex(indexName, Vertex.class, g)
         }
@@ -184,37 +372,10 @@ class Neo4Django {
     }
 
     static updateNodeProperties(node, propMap) {
-        def originalVal, closureString, value, lastAutoProp, autoDefault, index
-        def oldNodeIds, valuesToIndex, rawIndex, indexName, error = null, typeNode
-        def types, g = binding.g
+        def value, index, oldNodeIds, valuesToIndex, rawIndex, indexName
+        def error = null
         propMap.each{prop, dict ->
-            if (dict.get('auto_increment')){
-                if (dict.get('auto_abstract')) {
-                    types = [['app_label':dict['auto_app_label'],
-                              'model_name':dict['auto_model']]]
-                    typeNode = getTypeNode(types)
-                }
-                else {
-                    typeNode = getTypeNodeFromNode(node)
-                }
-                //get a ghetto write lock on the type node
-                getGhettoWriteLock(typeNode)
-
-                lastAutoProp = prop + '.' + AUTO_PROP_INDEX_KEY
-                closureString = dict.get('increment_func') ?: '{i -> i+1}'
-                
-                if (typeNode.map().containsKey(lastAutoProp)){
-                    value = singleArgEval(closureString, typeNode[lastAutoProp])
-                }
-                else {
-                    autoDefault = dict.get('auto_default')
-                    value = (autoDefault != null) ? autoDefault : 1
-                }
-                typeNode[lastAutoProp] = value
-            }
-            else {
-                value = dict.get('value')
-            }
+            value = dict.get('value')
             if (dict.containsKey('index_name')) {
                 indexName = dict['index_name']
                 (index, rawIndex) = getOrCreateIndex(indexName)
@@ -239,6 +400,18 @@ class Neo4Django {
                         rawIndex.add(node.getRawVertex(), prop, v)
                     }
                 }
+                //as well as keys derived from the property, like range keys,
+                //which are kept whole in the exact index
+                def derivedEntries = dict.get('derived_index_entries') ?: []
+                if (derivedEntries.size() > 0) {
+                    def derivedIndex = getOrCreateIndex(dict['derived_index_name'])[1]
+                    for(entry in derivedEntries) {
+                        derivedIndex.remove(node.getRawVertex(), entry[0])
+                        for(v in entry[1]) {
+                            derivedIndex.add(node.getRawVertex(), entry[0], v)
+                        }
+                    }
+                }
             }
 
             //set the value
@@ -263,22 +436,403 @@ class Neo4Django {
         return node
     }
 
+    static updateRelationships(nodeId, removedIds, clearedTypes, additions) {
+        /**
+        * Change a node's relationships in one go, returning any new
+        * relationships in the order they were requested.
+        *
+        * @param nodeId the id of the node whose relationships are changing.
+        * @param removedIds ids of relationships to delete.
+        * @param clearedTypes (type, direction) pairs for which all neo4django
+        *                     relationships on the node should be deleted.
+        * @param additions (type, direction, ordered, other node ids) lists.
+        */
+        def g = binding.g, neo4j = g.getRawGraph()
+        def node = neo4j.getNodeById(nodeId)
+        def relType, direction, nextOrder, other, rel, created = []
+        removedIds.each{
+            neo4j.getRelationshipById(it).delete()
+        }
+        clearedTypes.each{ type, dir ->
+            direction = (dir == 'out') ? Direction.OUTGOING : Direction.INCOMING
+            node.getRelationships(DynamicRelationshipType.withName(type), direction).each{
+                if (it.getProperty(INTERNAL_ATTR, false)) {
+                    it.delete()
+                }
+            }
+        }
+        additions.each{ type, dir, ordered, otherIds ->
+            relType = DynamicRelationshipType.withName(type)
+            direction = (dir == 'out') ? Direction.OUTGOING : Direction.INCOMING
+            if (ordered) {
+                nextOrder = nextRelationshipOrder(node, relType, direction)
+            }
+            for (def otherId : otherIds) {
+                other = neo4j.getNodeById(otherId)
+                rel = (dir == 'out') ? node.createRelationshipTo(other, relType) :
+                                       other.createRelationshipTo(node, relType)
+                rel.setProperty(INTERNAL_ATTR, true)
+                if (ordered) {
+                    rel.setProperty(ORDER_ATTR, nextOrder++)
+                }
+                created << g.e(rel.getId())
+            }
+            if (ordered) {
+                setNextRelationshipOrder(node, relType, direction, nextOrder)
+            }
+        }
+        return created
+    }
+
+    static saveModels(newNodes, propertyUpdates, relationshipUpdates) {
+        /**
+        * Create nodes and save properties and relationships in one
+        * transaction. Nodes are referred to by id, or by -(i + 1) for the ith
+        * new node. Returns the updated node for each property update followed
+        * by the relationships created, or an error map for the first failed
+        * property update, in which case nothing is saved.
+        *
+        * @param newNodes (type node id or types, index name, type names to
+        *                 index) lists.
+        * @param propertyUpdates (node ref, property map) lists.
+        * @param relationshipUpdates (node ref, removed ids, cleared types,
+        *                            additions) lists, as for updateRelationships
+        *                            but with node refs in the additions.
+        */
+        def g = binding.g, newIds = [], results = [], node
+        def idOf = { ref -> (ref < 0) ? newIds[-ref - 1] : ref }
+        startTx()
+        try {
+            for (def spec : newNodes) {
+                node = createNodeOfType(spec[0])
+                indexNodeAsTypes(node, spec[1], spec[2])
+                newIds << node.id
+            }
+            for (def i = 0; i < propertyUpdates.size(); i++) {
+                node = updateNodeProperties(g.v(idOf(propertyUpdates[i][0])),
+                                            propertyUpdates[i][1])
+                if (node instanceof Map) {
+                    node['update'] = i
+                    failTx()
+                    return node
+                }
+                results << node
+            }
+            for (def update : relationshipUpdates) {
+                results.addAll(updateRelationships(idOf(update[0]), update[1], update[2],
+                    update[3].collect{ type, dir, ordered, refs ->
+                        [type, dir, ordered, refs.collect(idOf)]
+                    }))
+            }
+            passTx()
+        }
+        catch (Exception e) {
+            failTx()
+            throw e
+        }
+        return results
+    }
+
+    static orderCounterKey(relType, direction) {
+        return ORDER_ATTR + '_' + relType.name() + '_' +
+               ((direction == Direction.OUTGOING) ? 'out' : 'in')
+    }
+
+    static nextRelationshipOrder(node, relType, direction) {
+        /**
+        * Return the order value for the next ordered relationship of a type
+        * on a node, and lock the node so it can't be claimed concurrently.
+        *
+        * The value is read from a counter kept on the node. Nodes without a
+        * counter have their relationships scanned once instead.
+        */
+        getGhettoWriteLock(node)
+        def counterKey = orderCounterKey(relType, direction)
+        if (node.hasProperty(counterKey)) {
+            return node.getProperty(counterKey)
+        }
+        def nextOrder = 0
+        node.getRelationships(relType, direction).each{
+            nextOrder = Math.max(nextOrder, it.getProperty(ORDER_ATTR, -1) + 1)
+        }
+        return nextOrder
+    }
+
+    static setNextRelationshipOrder(node, relType, direction, nextOrder) {
+        node.setProperty(orderCounterKey(relType, direction), nextOrder)
+    }
+
+    static connectNodes(relTypeName, dir, ordered, edges) {
+        /**
+        * Create neo4django relationships between existing nodes, returning
+        * the number created.
+        *
+        * @param relTypeName the relationship type.
+        * @param dir 'out' to relate from sources to targets, otherwise 'in'.
+        * @param ordered whether to append to the source's ordered relationships.
+        * @param edges (source id, target id, property map) lists.
+        */
+        def neo4j = binding.g.getRawGraph()
+        def relType = DynamicRelationshipType.withName(relTypeName)
+        def direction = (dir == 'out') ? Direction.OUTGOING : Direction.INCOMING
+        def nextOrders = [:], source, target, rel, order
+        for (def edge : edges) {
+            source = neo4j.getNodeById(edge[0])
+            target = neo4j.getNodeById(edge[1])
+            if (ordered) {
+                order = nextOrders[edge[0]]
+                if (order == null) {
+                    order = nextRelationshipOrder(source, relType, direction)
+                }
+                nextOrders[edge[0]] = order + 1
+            }
+            rel = (dir == 'out') ? source.createRelationshipTo(target, relType) :
+                                   target.createRelationshipTo(source, relType)
+            edge[2].each{ key, value ->
+                rel.setProperty(key, value)
+            }
+            rel.setProperty(INTERNAL_ATTR, true)
+            if (ordered) {
+                rel.setProperty(ORDER_ATTR, order)
+            }
+        }
+        nextOrders.each{ sourceId, nextOrder ->
+            setNextRelationshipOrder(neo4j.getNodeById(sourceId), relType,
+                                     direction, nextOrder)
+        }
+        return edges.size()
+    }
+
+    static deleteNodes(ids, indexName, batchSize) {
+        /**
+        * Delete nodes, their relationships and their index entries, in
+        * transactions of at most batchSize nodes. Returns the number of nodes
+        * and relationships deleted.
+        *
+        * @param ids the ids of the nodes to delete.
+        * @param indexName the name of the model index the nodes might be in-
+        *                  they're removed from its exact index too.
+        * @param batchSize the most nodes to delete in a single transaction.
+        */
+        def neo4j = binding.g.getRawGraph()
+        def indexManager = neo4j.index()
+        def indexes = [indexName, indexName + EXACT_INDEX_SUFFIX].findAll{
+            indexManager.existsForNodes(it)
+        }.collect{ indexManager.forNodes(it) }
+        def nodeCount = 0, relCount = 0, node
+        for (def start = 0; start < ids.size(); start += batchSize) {
+            startTx()
+            try {
+                for (def id : ids.subList(start, Math.min(start + batchSize, ids.size()))) {
+                    node = neo4j.getNodeById(id)
+                    for (def rel : node.getRelationships()) {
+                        rel.delete()
+                        relCount++
+                    }
+                    for (def index : indexes) {
+                        index.remove(node)
+                    }
+                    node.delete()
+                    nodeCount++
+                }
+                passTx()
+            }
+            catch (Exception e) {
+                failTx()
+                throw e
+            }
+        }
+        return [nodes: nodeCount, relationships: relCount]
+    }
+
+    static reindexNodes(indexName, entries) {
+        /**
+        * Replace all index entries for some nodes in one transaction.
+        *
+        * @param indexName the name of the model index.
+        * @param entries (node id, type names, (key, values) pairs) lists.
+        */
+        def neo4j = binding.g.getRawGraph()
+        def rawIndex, node
+        startTx()
+        try {
+            rawIndex = neo4j.index().forNodes(indexName, indexConfig(indexName))
+            for (def entry : entries) {
+                node = neo4j.getNodeById(entry[0])
+                rawIndex.remove(node)
+                for (def typeName : entry[1]) {
+                    rawIndex.add(node, TYPE_ATTR, typeName)
+                }
+                for (def keyValues : entry[2]) {
+                    for (def value : keyValues[1]) {
+                        rawIndex.add(node, keyValues[0], value)
+                    }
+                }
+            }
+            passTx()
+        }
+        catch (Exception e) {
+            failTx()
+            throw e
+        }
+        return entries.size()
+    }
+
+    static dropIndex(indexName) {
+        /**
+        * Delete a node index and all of its entries, if it exists.
+        */
+        def indexManager = binding.g.getRawGraph().index()
+        if (!indexManager.existsForNodes(indexName)) {
+            return false
+        }
+        startTx()
+        try {
+            indexManager.forNodes(indexName).delete()
+            passTx()
+        }
+        catch (Exception e) {
+            failTx()
+            throw e
+        }
+        return true
+    }
+
+    static compileClosure(closureString) {
+        /**
+        * Return a closure compiled from its source. Compiled closures are
+        * kept in a bounded LRU cache, since compiling a script is slow and
+        * each one loads a new class.
+        */
+        def closure
+        synchronized (compiledClosures) {
+            closure = compiledClosures.get(closureString)
+            if (closure != null) {
+                closureCacheCounts.hits++
+                return closure
+            }
+            closureCacheCounts.misses++
+        }
+        closure = Eval.me(closureString)
+        synchronized (compiledClosures) {
+            compiledClosures.put(closureString, closure)
+            while (compiledClosures.size() > CLOSURE_CACHE_SIZE) {
+                compiledClosures.remove(compiledClosures.keySet().iterator().next())
+                closureCacheCounts.evictions++
+            }
+        }
+        return closure
+    }
+
+    static closureCacheStats() {
+        synchronized (compiledClosures) {
+            def stats = [size:compiledClosures.size(),
+                         capacity:CLOSURE_CACHE_SIZE]
+            stats.putAll(closureCacheCounts)
+            return stats
+        }
+    }
+
     static singleArgEval(closureString, original) {
-        Eval.x(original, closureString + "(x)")
+        compileClosure(closureString).call(original)
+    }
+
+    static reserveAutoValues(typeNodeRef, prop, count, autoDefault, closureString) {
+        /**
+        * Reserve the next values of an auto property for a type, returning
+        * them in order. The type node is only locked while the block is
+        * claimed, so clients can hand the values out without contention.
+        *
+        * @param typeNodeRef the id or type hierarchy of the type node
+        *                    keeping the count.
+        * @param prop the auto property name.
+        * @param count the number of values to reserve.
+        * @param autoDefault the first value, if none have been reserved.
+        * @param closureString a closure computing a value from the last.
+        */
+        def typeNode = resolveTypeNode(typeNodeRef)
+        def increment = compileClosure(closureString)
+        def lastAutoProp = prop + '.' + AUTO_PROP_INDEX_KEY
+        def values = [], value = null
+        startTx()
+        try {
+            getGhettoWriteLock(typeNode)
+            if (typeNode.map().containsKey(lastAutoProp)) {
+                value = typeNode[lastAutoProp]
+            }
+            for (i in 0..<count) {
+                if (value == null) {
+                    value = (autoDefault != null) ? autoDefault : 1
+                }
+                else {
+                    value = increment(value)
+                }
+                values << value
+            }
+            typeNode[lastAutoProp] = value
+            passTx()
+        }
+        catch (Exception e) {
+            failTx()
+            throw e
+        }
+        return values
     }
 
-    static getVerticesByIds(ids) {
-        // GREMLIN HACK ALERT: This is a workaround because g.v() can't
-        //                     take more than 250 elements by itself.
-        //                     According to gremlin devs, this is equiv
-        def res = [], v
-        ids.each{
-            if(it != null){
-                v = binding.g.v(it)
-                if (v != null){ res << v }
+    static existingNodeIds(ids) {
+        /**
+        * Return the ids of nodes that exist, in order and without duplicates,
+        * so they can be passed to a Cypher START clause (which fails on
+        * missing nodes). Nodes are looked up in the raw graph, without
+        * wrapping each in a vertex.
+        */
+        def neo4j = binding.g.getRawGraph(), existing = new LinkedHashSet()
+        for (def id : ids) {
+            if (id == null || existing.contains(id)) {
+                continue
             }
+            try {
+                neo4j.getNodeById(id)
+                existing.add(id)
+            }
+            catch (NotFoundException e) {}
+        }
+        return existing.toList()
+    }
+
+    static shortestPaths(startId, endId, relTypes, excludedTypes, maxDepth,
+                         allPaths) {
+        /**
+        * Find the shortest path between two nodes, or all paths of that
+        * length if allPaths is true, and describe them with describePaths.
+        *
+        * @param relTypes the relationship types to follow, in either
+        *        direction, or an empty list for any type but excludedTypes.
+        */
+        def neo4j = binding.g.getRawGraph()
+        // there's no path to or from a missing node
+        def existing = existingNodeIds([startId, endId])
+        if (!(startId in existing && endId in existing)) {
+            return []
+        }
+        def expander
+        if (relTypes) {
+            expander = Traversal.emptyExpander()
+            relTypes.each{
+                expander = expander.add(DynamicRelationshipType.withName(it),
+                                        Direction.BOTH)
+            }
+        }
+        else {
+            def followed = { !(it.getType().name() in excludedTypes) }
+            expander = Traversal.expanderForAllTypes(Direction.BOTH)
+            expander = expander.addRelationshipFilter(followed as Predicate)
         }
-        return res
+        def finder = GraphAlgoFactory.shortestPath(expander, maxDepth)
+        def start = neo4j.getNodeById(startId), end = neo4j.getNodeById(endId)
+        def paths = allPaths ? finder.findAllPaths(start, end).collect{it} :
+                               [finder.findSinglePath(start, end)].findAll{it}
+        return describePaths(paths)
     }
 }
 Neo4Django.binding = binding;
@@ -0,0 +1,121 @@
+"""
+Rebuild the Lucene indexes of node models.
+
+    python manage.py reindex myapp.Person [myapp.Pet ...] [--vacuum]
+
+Each node's index entries are removed and re-added from its current property
+values, in batched transactions. With `--vacuum`, the model's indexes
+(fulltext and exact) are dropped first and rebuilt for every model that
+shares them, which also clears entries left behind by nodes that no longer
+exist.
+"""
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import get_model
+
+from neo4django.db import connections, DEFAULT_DB_ALIAS
+from neo4django.db.models import NodeModel
+from neo4django.db.models.properties import BoundProperty
+from neo4django.utils import chunked
+
+DEFAULT_BATCH_SIZE = 500
+INDEX_TYPES = ('fulltext', 'exact')
+
+
+def models_sharing_index(model):
+    """
+    Return the concrete models whose nodes are in `model`'s index, without
+    any that are covered by a query on a concrete ancestor.
+    """
+    root = [t for t in model.mro()
+            if issubclass(t, NodeModel) and t is not NodeModel][-1]
+    models, subclasses = [], [root]
+    while subclasses:
+        cls = subclasses.pop(0)
+        if not cls._meta.abstract:
+            models.append(cls)
+        else:
+            subclasses.extend(cls.__subclasses__())
+    return models
+
+
+def reindex(model, batch_size=DEFAULT_BATCH_SIZE, vacuum=False,
+            using=DEFAULT_DB_ALIAS):
+    """
+    Rebuild the index entries of every node of a model, `batch_size` nodes per
+    transaction, and return the number of nodes reindexed. If `vacuum` is
+    True, the indexes are dropped and rebuilt for all models sharing them.
+    """
+    conn = connections[using]
+    if vacuum:
+        for index_type in INDEX_TYPES:
+            conn.gremlin('results = Neo4Django.dropIndex(indexName)',
+                         indexName=model.index_name(using, index_type))
+        models = models_sharing_index(model)
+    else:
+        models = [model]
+
+    count = 0
+    for m in models:
+        groovy, params = m.objects.all().query.as_groovy(using)
+        if groovy is None:
+            continue
+        groovy += "\nresults = results.collect{it.id}"
+        ids = conn.gremlin(groovy, **params)
+        exact = any(p.indexed and (p.index_type == 'exact' or
+                                   p.derived_index_keys())
+                    for p in BoundProperty._all_properties_for(m).values())
+        for batch in chunked(ids, batch_size):
+            objs = list(m.objects.using(using).filter(id__in=batch))
+            entries = [[obj.id, obj._type_names_to_index(), obj._index_entries()]
+                       for obj in objs]
+            count += conn.gremlin(
+                'results = Neo4Django.reindexNodes(indexName, entries)',
+                indexName=m.index_name(using), entries=entries)
+            #type names are only kept in the fulltext index
+            if exact:
+                conn.gremlin(
+                    'results = Neo4Django.reindexNodes(indexName, entries)',
+                    indexName=m.index_name(using, 'exact'),
+                    entries=[[obj.id, [], obj._index_entries('exact')]
+                             for obj in objs])
+    return count
+
+
+class Command(BaseCommand):
+    args = '<app_label.ModelName app_label.ModelName ...>'
+    help = 'Rebuilds the Lucene indexes of the given node models.'
+    option_list = BaseCommand.option_list + (
+        make_option('--batch-size', type='int', dest='batch_size',
+                    default=DEFAULT_BATCH_SIZE,
+                    help='The most nodes to reindex in one transaction.'),
+        make_option('--vacuum', action='store_true', dest='vacuum',
+                    default=False,
+                    help='Drop each index first, removing stale entries.'),
+        make_option('--database', dest='database', default=DEFAULT_DB_ALIAS,
+                    help='The neo4django database to reindex.'),
+    )
+
+    def handle(self, *labels, **options):
+        if not labels:
+            raise CommandError('Enter at least one app_label.ModelName.')
+        models = []
+        for label in labels:
+            try:
+                app_label, model_name = label.split('.')
+            except ValueError:
+                raise CommandError("Models should be given as "
+                                   "app_label.ModelName, not '%s'." % label)
+            model = get_model(app_label, model_name)
+            if model is None or not issubclass(model, NodeModel):
+                raise CommandError("'%s' isn't a node model." % label)
+            models.append(model)
+
+        for model in models:
+            count = reindex(model, batch_size=options['batch_size'],
+                            vacuum=options['vacuum'],
+                            using=options['database'])
+            self.stdout.write('Reindexed %d %s nodes in %s.\n' %
+                              (count, model.__name__,
+                               model.index_name(options['database'])))
@@ -0,0 +1,542 @@
+"""
+Structured metrics for requests made against Neo4j.
+
+A `MetricsCollector` hooks into `Neo4djangoRequest`'s pre- and post-request
+callbacks and turns each REST call into a `RequestMetric`, which is then
+handed to any number of sinks. A sink is just an object with a
+`record(metric)` method- a few are included below (logging, statsd and an
+in-memory histogram).
+
+Sinks can be configured with the `NEO4DJANGO_METRICS_SINKS` setting, a list of
+sink instances, dotted paths to sink classes, or (dotted path, kwargs dict)
+pairs. For backwards compatibility, `NEO4DJANGO_PROFILE_REQUESTS = True` adds a
+`LoggingSink`.
+
+Requests slower than `NEO4DJANGO_SLOW_QUERY_THRESHOLD` seconds are logged to
+the 'neo4django.slow_queries' logger and kept for `slowest_queries()`.
+"""
+import json
+import logging
+import os
+import re
+import socket
+import sys
+import threading
+
+from collections import namedtuple, defaultdict
+from contextlib import contextmanager
+from functools import wraps
+from hashlib import md5
+from time import time as _time
+from urlparse import urlparse
+
+from django.conf import settings as _settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.importlib import import_module
+
+RequestMetric = namedtuple('RequestMetric', ['method', 'url', 'status',
+                                             'duration', 'request_size',
+                                             'response_size', 'fingerprint',
+                                             'operation', 'timestamp'])
+
+Operation = namedtuple('Operation', ['label', 'fingerprint'])
+
+_local = threading.local()
+
+
+######################
+# CALLER BOOKKEEPING #
+######################
+
+def _operation_stack():
+    try:
+        return _local.operations
+    except AttributeError:
+        _local.operations = stack = []
+        return stack
+
+
+@contextmanager
+def operation(label, fingerprint=None):
+    """
+    Label all requests made within the block, eg
+
+        with operation('tests.Person.save'):
+            ...
+
+    Operations nest- requests are attributed to the innermost operation. A
+    fingerprint can be provided to override the one otherwise computed from
+    the request itself.
+    """
+    stack = _operation_stack()
+    stack.append(Operation(label, fingerprint))
+    try:
+        yield
+    finally:
+        stack.pop()
+
+
+def instrumented(label_func):
+    """
+    A decorator that runs a method inside an `operation`. `label_func` should
+    accept the same arguments as the decorated function and return a label.
+    """
+    def wrapper(func):
+        @wraps(func)
+        def wrapped(*args, **kwargs):
+            with operation(label_func(*args, **kwargs)):
+                return func(*args, **kwargs)
+        return wrapped
+    return wrapper
+
+
+def current_operation():
+    """
+    Return the innermost `Operation` for this thread, or None.
+    """
+    stack = _operation_stack()
+    return stack[-1] if stack else None
+
+
+def model_label(model, action):
+    """
+    Return a label like 'app_label.ModelName.action' for a model class.
+    """
+    return '%s.%s.%s' % (model._meta.app_label, model.__name__, action)
+
+
+################
+# FINGERPRINTS #
+################
+
+_STRING_LITERAL = re.compile(r'"(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\'')
+_NUMBER_LITERAL = re.compile(r'\b\d+\b')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_script(script):
+    """
+    Strip literal values and redundant whitespace from a Gremlin or Cypher
+    script, so that scripts differing only by value normalize to the same str.
+    """
+    script = _STRING_LITERAL.sub('?', script)
+    script = _NUMBER_LITERAL.sub('?', script)
+    return _WHITESPACE.sub(' ', script).strip()
+
+
+def fingerprint(s):
+    """
+    Return a short, stable hash of a str.
+    """
+    if isinstance(s, unicode):
+        s = s.encode('utf-8')
+    return md5(s).hexdigest()[:12]
+
+
+def request_fingerprint(method, url, data):
+    """
+    Fingerprint a REST request- scripts and queries are normalized and hashed,
+    other requests are identified by method and id-less path.
+    """
+    if isinstance(data, dict):
+        script = data.get('script', None) or data.get('query', None)
+        if isinstance(script, basestring):
+            return fingerprint(normalize_script(script))
+    path = _NUMBER_LITERAL.sub('?', urlparse(url).path)
+    return fingerprint('%s %s' % (method.upper(), path))
+
+
+#########
+# SINKS #
+#########
+
+class LoggingSink(object):
+    """
+    Logs each request metric, with the metric available to formatters and
+    filters as the record's `metric` attribute.
+    """
+    def __init__(self, logger='neo4django.requests', level=logging.DEBUG):
+        self.logger = logging.getLogger(logger)
+        self.level = level
+
+    def record(self, metric):
+        self.logger.log(self.level,
+                        '%s %s %s %.3fs sent=%d received=%d fingerprint=%s '
+                        'operation=%s', metric.method, metric.url,
+                        metric.status, metric.duration, metric.request_size,
+                        metric.response_size, metric.fingerprint,
+                        metric.operation, extra={'metric': metric})
+
+
+class StatsdSink(object):
+    """
+    Sends request counts, timings and payload sizes to a statsd-style daemon
+    over UDP. Metric names are keyed by operation.
+    """
+    def __init__(self, host='localhost', port=8125, prefix='neo4django'):
+        self.address = (host, port)
+        self.prefix = prefix
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def _key(self, metric):
+        op = metric.operation or 'unlabeled'
+        return '%s.%s' % (self.prefix, re.sub(r'[^\w\-]', '_', op))
+
+    def record(self, metric):
+        key = self._key(metric)
+        lines = ['%s.requests:1|c' % key,
+                 '%s.time:%d|ms' % (key, metric.duration * 1000),
+                 '%s.sent:%d|c' % (key, metric.request_size),
+                 '%s.received:%d|c' % (key, metric.response_size)]
+        if metric.status is None or metric.status >= 400:
+            lines.append('%s.errors:1|c' % key)
+        try:
+            self._socket.sendto('\n'.join(lines), self.address)
+        except socket.error:
+            # metrics should never take the application down with them
+            pass
+
+
+class Histogram(object):
+    """
+    A bounded sample of values that can report count, total and percentiles.
+    """
+    def __init__(self, max_samples=1000):
+        self.max_samples = max_samples
+        self.count = 0
+        self.total = 0
+        self._samples = []
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        if len(self._samples) < self.max_samples:
+            self._samples.append(value)
+        else:
+            # keep a rolling window of the most recent values
+            self._samples[self.count % self.max_samples] = value
+
+    def percentile(self, p):
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        index = int(round((len(ordered) - 1) * p / 100.0))
+        return ordered[index]
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'total': self.total,
+            'mean': (float(self.total) / self.count) if self.count else None,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'min': min(self._samples) if self._samples else None,
+            'max': max(self._samples) if self._samples else None,
+        }
+
+
+class InMemorySink(object):
+    """
+    Keeps latency and payload histograms per key in process. By default
+    metrics are grouped by operation, but any RequestMetric field name (eg
+    'fingerprint') or a callable taking a metric can be used as the key.
+    """
+    def __init__(self, key='operation', max_samples=1000):
+        self.key = key
+        self.max_samples = max_samples
+        self._lock = threading.Lock()
+        self.reset()
+
+    def _new_histograms(self):
+        return {
+            'duration': Histogram(self.max_samples),
+            'request_size': Histogram(self.max_samples),
+            'response_size': Histogram(self.max_samples),
+        }
+
+    def reset(self):
+        self.histograms = defaultdict(self._new_histograms)
+
+    def record(self, metric):
+        key = self.key(metric) if callable(self.key) else \
+                getattr(metric, self.key)
+        with self._lock:
+            histograms = self.histograms[key]
+            for name, hist in histograms.iteritems():
+                hist.add(getattr(metric, name))
+
+    def summary(self):
+        """
+        Return a dict of key -> {histogram name -> summary dict}, eg
+        `sink.summary()['tests.Person.query']['duration']['p90']`.
+        """
+        with self._lock:
+            return dict((key, dict((name, h.summary())
+                                   for name, h in hists.iteritems()))
+                        for key, hists in self.histograms.iteritems())
+
+    def top(self, n=10, by='total'):
+        """
+        Return the `n` keys generating the most graph traffic as (key, duration
+        summary) pairs, sorted by a summary field- eg 'total', 'count', 'p99'.
+        """
+        durations = [(k, v['duration']) for k, v in self.summary().iteritems()]
+        return sorted(durations, key=lambda kv: kv[1][by], reverse=True)[:n]
+
+
+################
+# SLOW QUERIES #
+################
+
+SlowQuery = namedtuple('SlowQuery', ['fingerprint', 'operation', 'count',
+                                     'total', 'max', 'script', 'params', 'rows',
+                                     'caller', 'timestamp'])
+
+_LIBRARY_DIR = os.path.dirname(os.path.abspath(__file__))
+_TEST_DIR = os.path.join(_LIBRARY_DIR, 'tests')
+_IGNORED_MODULES = ('neo4jrestclient', 'httplib2', 'contextlib', 'decorator',
+                    'django/db')
+
+
+def _is_library_frame(filename):
+    filename = os.path.abspath(filename)
+    if filename.startswith(_TEST_DIR):
+        return False
+    if filename.startswith(_LIBRARY_DIR) or filename.startswith('<'):
+        return True
+    return any(('%s%s' % (os.sep, m)) in filename for m in _IGNORED_MODULES)
+
+
+def calling_frame():
+    """
+    Return a 'path:line in function' str for the innermost stack frame outside
+    neo4django and the libraries it uses to talk to Neo4j.
+    """
+    frame = sys._getframe(1)
+    while frame is not None:
+        code = frame.f_code
+        if not _is_library_frame(code.co_filename):
+            return '%s:%d in %s' % (code.co_filename, frame.f_lineno,
+                                    code.co_name)
+        frame = frame.f_back
+    return None
+
+
+def summarize_params(data):
+    """
+    Describe the parameters of a script or query request by name and type,
+    without including their values- eg 'startQueries=list[2], typeNodeId=int'.
+    """
+    params = data.get('params', None) if isinstance(data, dict) else None
+    if not params:
+        return ''
+    summary = []
+    for name in sorted(params):
+        value = params[name]
+        desc = type(value).__name__
+        if isinstance(value, (list, tuple, dict)):
+            desc += '[%d]' % len(value)
+        summary.append('%s=%s' % (name, desc))
+    return ', '.join(summary)
+
+
+def count_rows(content):
+    """
+    Count the rows in a REST response body- Cypher results, a list from a
+    Gremlin script, or a single value.
+    """
+    if not content:
+        return 0
+    try:
+        result = json.loads(content)
+    except ValueError:
+        return None
+    if isinstance(result, dict) and 'data' in result:
+        return len(result['data'])
+    elif isinstance(result, list):
+        return len(result)
+    return 1
+
+
+class SlowQueryLog(object):
+    """
+    Logs requests slower than `threshold` seconds, and keeps per-fingerprint
+    statistics for the slowest `max_entries` query shapes.
+    """
+    def __init__(self, threshold, logger='neo4django.slow_queries',
+                 max_entries=100):
+        self.threshold = threshold
+        self.logger = logging.getLogger(logger)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.entries = {}
+
+    def add(self, metric, data, content):
+        if metric.duration < self.threshold:
+            return
+        script = ''
+        if isinstance(data, dict):
+            script = data.get('script', None) or data.get('query', None) or ''
+        params = summarize_params(data)
+        rows = count_rows(content)
+        caller = calling_frame()
+        self.logger.warning('Slow query (%.3fs) fingerprint=%s operation=%s '
+                            'rows=%s params=(%s) caller=%s',
+                            metric.duration, metric.fingerprint,
+                            metric.operation, rows, params, caller,
+                            extra={'metric': metric})
+        with self._lock:
+            existing = self.entries.get(metric.fingerprint, None)
+            count, total, longest = (existing[2:5] if existing is not None
+                                     else (0, 0, 0))
+            self.entries[metric.fingerprint] = SlowQuery(
+                fingerprint=metric.fingerprint, operation=metric.operation,
+                count=count + 1, total=total + metric.duration,
+                max=max(longest, metric.duration), script=script,
+                params=params, rows=rows, caller=caller,
+                timestamp=metric.timestamp)
+            if len(self.entries) > self.max_entries:
+                fastest = min(self.entries.itervalues(), key=lambda e: e.max)
+                del self.entries[fastest.fingerprint]
+
+    def slowest(self, n=10, by='max'):
+        """
+        Return the `n` slowest query shapes as `SlowQuery`s, sorted by 'max',
+        'total' or 'count'.
+        """
+        with self._lock:
+            entries = self.entries.values()
+        return sorted(entries, key=lambda e: getattr(e, by), reverse=True)[:n]
+
+
+#############
+# COLLECTOR #
+#############
+
+def load_sink(sink_or_path):
+    """
+    Return a sink from an instance, a dotted path to a sink class, or a
+    (dotted path, kwargs dict) pair.
+    """
+    kwargs = {}
+    if isinstance(sink_or_path, (tuple, list)):
+        sink_or_path, kwargs = sink_or_path
+    if not isinstance(sink_or_path, basestring):
+        return sink_or_path
+    module_name, class_name = sink_or_path.rsplit('.', 1)
+    try:
+        sink_cls = getattr(import_module(module_name), class_name)
+    except (ImportError, AttributeError):
+        raise ImproperlyConfigured('Could not import metrics sink %s.'
+                                   % sink_or_path)
+    return sink_cls(**kwargs)
+
+
+class MetricsCollector(object):
+    """
+    Builds a `RequestMetric` for every request and hands it to all sinks, and
+    to the slow query log if one is set. Request callbacks are only registered
+    while at least one of those is present.
+    """
+    def __init__(self):
+        self.sinks = []
+        self.slow_query_log = None
+        self._request_cls = None
+        self._registered = False
+
+    def _get_request_cls(self):
+        if self._request_cls is None:
+            from .db import Neo4djangoRequest
+            self._request_cls = Neo4djangoRequest
+        return self._request_cls
+
+    def _update_callbacks(self):
+        needed = bool(self.sinks) or self.slow_query_log is not None
+        if needed == self._registered:
+            return
+        request_cls = self._get_request_cls()
+        if needed:
+            request_cls.register_pre_request_callback(self.start_request)
+            request_cls.register_post_request_callback(self.finish_request)
+        else:
+            request_cls.unregister_pre_request_callback(self.start_request)
+            request_cls.unregister_post_request_callback(self.finish_request)
+        self._registered = needed
+
+    def add_sink(self, sink):
+        self.sinks.append(sink)
+        self._update_callbacks()
+        return sink
+
+    def remove_sink(self, sink):
+        self.sinks.remove(sink)
+        self._update_callbacks()
+
+    def set_slow_query_threshold(self, threshold, **kwargs):
+        """
+        Log requests slower than `threshold` seconds. Pass None to disable the
+        slow query log.
+        """
+        self.slow_query_log = (SlowQueryLog(threshold, **kwargs)
+                               if threshold is not None else None)
+        self._update_callbacks()
+        return self.slow_query_log
+
+    def start_request(self, req, method, url, data, headers):
+        req._metrics_start = _time()
+        req._metrics_operation = current_operation()
+
+    def finish_request(self, req, method, url, data, headers):
+        start = getattr(req, '_metrics_start', None)
+        if start is None:
+            return
+        end = _time()
+        op = req._metrics_operation
+        response = getattr(req, 'response', None)
+        metric = RequestMetric(
+            method=method.upper(),
+            url=url,
+            status=getattr(response, 'status', None),
+            duration=end - start,
+            request_size=getattr(req, 'request_size', 0),
+            response_size=len(getattr(req, 'content', None) or ''),
+            fingerprint=((op.fingerprint if op is not None else None) or
+                         request_fingerprint(method, url, data)),
+            operation=op.label if op is not None else None,
+            timestamp=start)
+        for sink in self.sinks:
+            sink.record(metric)
+        if self.slow_query_log is not None:
+            self.slow_query_log.add(metric, data, getattr(req, 'content', None))
+
+collector = MetricsCollector()
+
+
+def slowest_queries(n=10, by='max'):
+    """
+    Return the `n` slowest query shapes seen by this process, as `SlowQuery`s.
+    Requires `NEO4DJANGO_SLOW_QUERY_THRESHOLD` (or
+    `collector.set_slow_query_threshold()`).
+    """
+    if collector.slow_query_log is None:
+        return []
+    return collector.slow_query_log.slowest(n, by=by)
+
+
+def install_from_settings(request_cls):
+    """
+    Add sinks configured in settings to the module-level collector.
+    """
+    collector._request_cls = request_cls
+    sinks = list(getattr(_settings, 'NEO4DJANGO_METRICS_SINKS', []))
+    if getattr(_settings, 'NEO4DJANGO_PROFILE_REQUESTS', False):
+        sinks.append(LoggingSink())
+    for sink in sinks:
+        collector.add_sink(load_sink(sink))
+    threshold = getattr(_settings, 'NEO4DJANGO_SLOW_QUERY_THRESHOLD', None)
+    if threshold is not None:
+        collector.set_slow_query_threshold(threshold)
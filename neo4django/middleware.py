@@ -0,0 +1,28 @@
+from .budget import RequestBudget
+
+
+class RequestBudgetMiddleware(object):
+    """
+    Counts the Neo4j requests made while handling each HTTP request, logging
+    a summary to the 'neo4django.budget' logger and adding it to responses as
+    `X-Neo4django-Requests` and `X-Neo4django-Repeated` headers. See
+    `neo4django.budget` for the relevant settings.
+    """
+    def process_request(self, request):
+        budget = RequestBudget(name=request.path)
+        request.neo4django_budget = budget.__enter__()
+
+    def process_response(self, request, response):
+        budget = getattr(request, 'neo4django_budget', None)
+        if budget is None:
+            return response
+        budget.__exit__(None, None, None)
+        response['X-Neo4django-Requests'] = str(budget.count)
+        response['X-Neo4django-Repeated'] = str(len(budget.repeated()))
+        return response
+
+    def process_exception(self, request, exception):
+        budget = getattr(request, 'neo4django_budget', None)
+        if budget is not None:
+            budget.__exit__(type(exception), exception, None)
+            request.neo4django_budget = None
@@ -28,6 +28,8 @@ class EnhancedGraphDatabase(GraphDatabase):
     def __init__(self, *args, **kwargs):
         cleandb_uri = kwargs.pop('CLEANDB_URI', None)
         super(EnhancedGraphDatabase, self).__init__(*args, **kwargs)
+        # client-side copies of database state, forgotten by cleandb
+        self.caches = {}
         if cleandb_uri:
             parsed_url = urlparse(self.url)
             cleandb_uri = "%s://%s%s" % (parsed_url.scheme,
@@ -45,6 +47,7 @@ class EnhancedGraphDatabase(GraphDatabase):
         return Request(**auth)
 
     def cleandb(self):
+        self.caches.clear()
         request = self.new_request()
         response, content = request.delete(self._cleandb_uri)
         if response.status != 200:
@@ -178,6 +181,14 @@ class EnhancedGraphDatabase(GraphDatabase):
         """
         return self.gremlin(script, tx=True, **params)
 
+    def closure_cache_stats(self):
+        """
+        Return a dict describing the server's cache of compiled Gremlin
+        closures- its `size` and `capacity`, and its `hits`, `misses` and
+        `evictions` since the server library was loaded.
+        """
+        return self.gremlin('results = Neo4Django.closureCacheStats()')
+
     def cypher(self, query, **params):
         ext = self.extensions.CypherPlugin
         return Neo4jTable(ext.execute_query(query=query, params=params))
@@ -0,0 +1,116 @@
+from nose.tools import eq_, raises
+from pretend import stub
+
+from neo4django import metrics
+from neo4django.budget import RequestBudget, _count_request
+from neo4django.exceptions import RequestBudgetExceeded
+from neo4django.middleware import RequestBudgetMiddleware
+
+
+def fake_request(script='g.v(1)', url='http://localhost:7474/db/data/'):
+    _count_request(stub(), 'POST', url, {'script': script}, {})
+
+
+def test_budget_counts():
+    with RequestBudget(max_requests=5) as budget:
+        for i in xrange(3):
+            fake_request()
+    fake_request()
+    eq_(budget.count, 3)
+    assert not budget.exceeded
+
+
+def test_nested_budgets():
+    with RequestBudget() as outer:
+        fake_request()
+        with RequestBudget() as inner:
+            fake_request()
+    eq_(outer.count, 2)
+    eq_(inner.count, 1)
+
+
+def test_repeated_fingerprints():
+    with RequestBudget(max_repeats=3) as budget:
+        with metrics.operation('tests.Person.friends.load'):
+            for i in xrange(5):
+                fake_request(script='g.v(%d).out' % i)
+        fake_request(script='g.e(1)')
+    repeated = budget.repeated()
+    eq_(len(repeated), 1)
+    eq_(repeated[0][1:], ('tests.Person.friends.load', 5))
+    assert 'tests.Person.friends.load x5' in budget.summary()
+
+
+def test_budget_warns():
+    with RequestBudget(max_requests=1, action='warn') as budget:
+        fake_request()
+        fake_request()
+    assert budget.exceeded
+
+
+@raises(RequestBudgetExceeded)
+def test_budget_raises():
+    with RequestBudget(max_requests=1, action='raise'):
+        fake_request()
+        fake_request()
+
+
+@raises(RequestBudgetExceeded)
+def test_budget_raises_on_repeats():
+    with RequestBudget(max_repeats=2, action='raise'):
+        for i in xrange(3):
+            fake_request()
+
+
+def test_unlimited_budget():
+    with RequestBudget(max_requests=None, max_repeats=None,
+                       action='raise') as budget:
+        for i in xrange(20):
+            fake_request()
+    eq_(budget.count, 20)
+    assert not budget.exceeded
+    eq_(budget.repeated(), [])
+
+
+@raises(ValueError)
+def test_bad_action():
+    RequestBudget(action='explode')
+
+
+def test_middleware():
+    middleware = RequestBudgetMiddleware()
+    request = stub(path='/people/')
+    response = {}
+    middleware.process_request(request)
+    for i in xrange(12):
+        fake_request()
+    eq_(middleware.process_response(request, response), response)
+    eq_(response['X-Neo4django-Requests'], '12')
+    eq_(response['X-Neo4django-Repeated'], '1')
+
+    # budgets shouldn't outlive their requests
+    fake_request()
+    eq_(request.neo4django_budget.count, 12)
+
+
+def test_relationship_loads_counted_separately():
+    from neo4django.db import models
+
+    class BudgetRival(models.NodeModel):
+        friends = models.Relationship('self', rel_type='friends_with',
+                                      related_name='befriended_by')
+        enemies = models.Relationship('self', rel_type='feuds_with',
+                                      related_name='feuded_with_by')
+
+    # loading each field runs its query under its label and fingerprint
+    with RequestBudget(max_repeats=5, action='warn') as budget:
+        for i in xrange(6):
+            rival = BudgetRival()
+            for field in ('friends', 'enemies'):
+                query = getattr(rival, field).all().query
+                with metrics.operation(query.operation_label,
+                                       fingerprint=query.fingerprint()):
+                    fake_request()
+    eq_(sorted(label for fp, label, count in budget.repeated()),
+        ['tests.BudgetRival.enemies.load', 'tests.BudgetRival.friends.load'])
+    eq_([count for fp, label, count in budget.repeated()], [6, 6])
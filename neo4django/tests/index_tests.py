@@ -114,3 +114,113 @@ def test_auto_property_indexing():
         eq_(len(lookup), 1)
         eq_(next(lookup).id, nodes[i].id)
 
+
+def indexed_ids(model, key, value, index_type='fulltext'):
+    from neo4jrestclient.client import NotFoundError
+    try:
+        return sorted(n.id for n in
+                      model.index(index_type=index_type)[key][value])
+    except NotFoundError:
+        return []
+
+@with_setup(None, teardown)
+def test_update_replaces_index_entries():
+    class UpdatedIndexNode(models.NodeModel):
+        name = models.StringProperty(indexed=True)
+
+    node = UpdatedIndexNode.objects.create(name='dave')
+    UpdatedIndexNode.objects.filter(name='dave').update(name='donald')
+
+    eq_(indexed_ids(UpdatedIndexNode, 'name', 'dave'), [])
+    eq_(indexed_ids(UpdatedIndexNode, 'name', 'donald'), [node.id])
+
+@with_setup(None, teardown)
+def test_reindex():
+    from neo4django.constants import TYPE_ATTR
+    from neo4django.management.commands.reindex import reindex
+
+    class ReindexedRoot(models.NodeModel):
+        name = models.StringProperty(indexed=True)
+
+    class ReindexedChild(ReindexedRoot):
+        nicknames = models.StringArrayProperty(indexed=True)
+
+    root = ReindexedRoot.objects.create(name='dave')
+    child = ReindexedChild.objects.create(name='deandra', nicknames=['dee'])
+
+    eq_(reindex(ReindexedRoot, batch_size=1), 2)
+    eq_(reindex(ReindexedChild, vacuum=True), 2)
+
+    eq_(indexed_ids(ReindexedRoot, 'name', 'dave'), [root.id])
+    eq_(indexed_ids(ReindexedRoot, 'nicknames', 'dee'), [child.id])
+    eq_(indexed_ids(ReindexedRoot, TYPE_ATTR, ReindexedRoot._type_name()),
+        sorted([root.id, child.id]))
+    eq_(indexed_ids(ReindexedRoot, TYPE_ATTR, ReindexedChild._type_name()),
+        [child.id])
+
+@with_setup(None, teardown)
+def test_exact_index():
+    """
+    Tests properties indexed in a model's exact index.
+    """
+    from neo4django.management.commands.reindex import reindex
+
+    class ExactNode(models.NodeModel):
+        email = models.StringProperty(indexed=True, unique=True,
+                                      index_type='exact')
+        name = models.StringProperty(indexed=True)
+
+    eq_(ExactNode.email.index_name('default'), 'tests-ExactNode-exact')
+    eq_(ExactNode.name.index_name('default'), 'tests-ExactNode')
+
+    node = ExactNode.objects.create(email='Dave@Example.com', name='dave')
+    eq_(indexed_ids(ExactNode, 'email', 'Dave@Example.com', 'exact'),
+        [node.id])
+    # exact index values aren't lowercased or tokenized
+    eq_(indexed_ids(ExactNode, 'email', 'dave@example.com', 'exact'), [])
+    eq_(indexed_ids(ExactNode, 'email', 'Dave@Example.com'), [])
+    # keys derived from fulltext indexed properties are kept whole there too
+    range_term = ExactNode.name.to_neo_range_index('dave')
+    eq_(indexed_ids(ExactNode, 'name.range', range_term, 'exact'), [node.id])
+    eq_(indexed_ids(ExactNode, 'name.range', range_term), [])
+
+    eq_(ExactNode.objects.get(email='Dave@Example.com', name='dave').id,
+        node.id)
+    eq_(len(ExactNode.objects.filter(email='dave@example.com')), 0)
+    try:
+        ExactNode.objects.create(email='Dave@Example.com', name='other')
+    except ValueError:
+        pass
+    else:
+        raise AssertionError('Exact unique values should be checked.')
+
+    eq_(reindex(ExactNode, vacuum=True), 1)
+    eq_(indexed_ids(ExactNode, 'email', 'Dave@Example.com', 'exact'),
+        [node.id])
+
+    node.delete()
+    eq_(indexed_ids(ExactNode, 'email', 'Dave@Example.com', 'exact'), [])
+
+@with_setup(None, teardown)
+def test_query_node_indices():
+    """
+    Tests intersecting index queries, whatever order they're given in.
+    """
+    setup_script = """
+    def common = Neo4Django.getOrCreateIndex('test-common')[1]
+    def rare = Neo4Django.getOrCreateIndex('test-rare')[1]
+    def nodes = (0..<20).collect{g.addVertex()}
+    nodes.each{common.add(it.getRawVertex(), 'flag', 'yes')}
+    nodes[3..4].each{rare.add(it.getRawVertex(), 'name', 'rare')}
+    rare.add(g.addVertex().getRawVertex(), 'name', 'rare')
+    results = nodes[3..4]*.id
+    """
+    expected_ids = gdb.gremlin_tx(setup_script)
+
+    script = 'results = Neo4Django.queryNodeIndices(queries).collect{it.id}'
+    queries = [['test-common', 'flag:yes'], ['test-rare', 'name:rare']]
+    eq_(sorted(gdb.gremlin(script, queries=queries)), sorted(expected_ids))
+    eq_(sorted(gdb.gremlin(script, queries=queries[::-1])),
+        sorted(expected_ids))
+    eq_(gdb.gremlin(script, queries=queries + [['test-rare', 'name:none']]),
+        [])
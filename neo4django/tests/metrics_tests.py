@@ -0,0 +1,200 @@
+from nose.tools import eq_, raises
+from pretend import stub
+
+from django.core.exceptions import ImproperlyConfigured
+
+from neo4django import metrics
+
+
+class FakeRequestClass(object):
+    def __init__(self):
+        self.pre, self.post = [], []
+
+    def register_pre_request_callback(self, cb):
+        self.pre.append(cb)
+
+    def register_post_request_callback(self, cb):
+        self.post.append(cb)
+
+    def unregister_pre_request_callback(self, cb):
+        self.pre.remove(cb)
+
+    def unregister_post_request_callback(self, cb):
+        self.post.remove(cb)
+
+
+def make_collector():
+    collector = metrics.MetricsCollector()
+    collector._request_cls = FakeRequestClass()
+    return collector
+
+
+def fake_request(collector, method='POST', url='http://localhost:7474/db/data/',
+                 data=None, status=200, content='[]'):
+    req = stub(request_size=len(str(data)))
+    collector.start_request(req, method, url, data, {})
+    req.response = stub(status=status)
+    req.content = content
+    collector.finish_request(req, method, url, data, {})
+
+
+def test_normalize_script():
+    eq_(metrics.normalize_script('g.v(1).name == "Pete"'),
+        metrics.normalize_script("g.v(24).name ==  'Sandra'"))
+
+
+def test_request_fingerprint():
+    a = metrics.request_fingerprint('POST', 'http://localhost/ext/Gremlin',
+                                    {'script': 'g.v(1)'})
+    b = metrics.request_fingerprint('POST', 'http://localhost/ext/Gremlin',
+                                    {'script': 'g.v(2)'})
+    c = metrics.request_fingerprint('POST', 'http://localhost/ext/Gremlin',
+                                    {'script': 'g.e(2)'})
+    eq_(a, b)
+    assert a != c
+
+    eq_(metrics.request_fingerprint('GET', 'http://localhost/node/1', None),
+        metrics.request_fingerprint('GET', 'http://localhost/node/29', None))
+
+
+def test_collector_registers_callbacks():
+    collector = make_collector()
+    request_cls = collector._request_cls
+    sink = collector.add_sink(metrics.InMemorySink())
+    eq_(request_cls.pre, [collector.start_request])
+    eq_(request_cls.post, [collector.finish_request])
+    collector.remove_sink(sink)
+    eq_(request_cls.pre, [])
+    eq_(request_cls.post, [])
+
+
+def test_operation_labels():
+    collector = make_collector()
+    sink = collector.add_sink(metrics.InMemorySink())
+    with metrics.operation('tests.Person.query'):
+        fake_request(collector)
+        with metrics.operation('tests.Person.save'):
+            fake_request(collector)
+            fake_request(collector)
+    fake_request(collector)
+
+    summary = sink.summary()
+    eq_(summary['tests.Person.query']['duration']['count'], 1)
+    eq_(summary['tests.Person.save']['duration']['count'], 2)
+    eq_(summary[None]['duration']['count'], 1)
+    eq_(metrics.current_operation(), None)
+
+
+def test_in_memory_sink_top():
+    collector = make_collector()
+    sink = collector.add_sink(metrics.InMemorySink(key='fingerprint'))
+    for i in xrange(3):
+        fake_request(collector, data={'script': 'g.v(%d)' % i})
+    fake_request(collector, data={'script': 'g.e(1)'})
+    top = sink.top(1, by='count')
+    eq_(len(top), 1)
+    eq_(top[0][1]['count'], 3)
+
+
+def test_metric_sizes_and_status():
+    collector = make_collector()
+    recorded = []
+    collector.add_sink(stub(record=recorded.append))
+    fake_request(collector, data={'query': 'START n=node(1) RETURN n'},
+                 status=500, content='x' * 10)
+    metric = recorded[0]
+    eq_(metric.status, 500)
+    eq_(metric.response_size, 10)
+    eq_(metric.method, 'POST')
+
+
+def test_histogram():
+    hist = metrics.Histogram(max_samples=100)
+    for i in xrange(1, 101):
+        hist.add(i)
+    summary = hist.summary()
+    eq_(summary['count'], 100)
+    eq_(summary['max'], 100)
+    eq_(summary['p50'], 51)
+    eq_(summary['p99'], 99)
+
+
+def test_load_sink():
+    sink = metrics.load_sink(('neo4django.metrics.InMemorySink',
+                              {'key': 'fingerprint'}))
+    eq_(sink.key, 'fingerprint')
+    existing = metrics.InMemorySink()
+    assert metrics.load_sink(existing) is existing
+
+
+@raises(ImproperlyConfigured)
+def test_load_sink_bad_path():
+    metrics.load_sink('neo4django.metrics.NoSuchSink')
+
+
+def test_slow_query_log():
+    collector = make_collector()
+    log = collector.set_slow_query_threshold(0)
+    data = {'script': 'g.v(id)', 'params': {'id': 1, 'ids': [1, 2]}}
+    fake_request(collector, data=data, content='[1, 2, 3]')
+    fake_request(collector, data=data, content='[1, 2, 3]')
+    slowest = log.slowest()
+    eq_(len(slowest), 1)
+    entry = slowest[0]
+    eq_(entry.count, 2)
+    eq_(entry.rows, 3)
+    eq_(entry.params, 'id=int, ids=list[2]')
+    assert entry.caller and __file__.rstrip('c') in entry.caller, entry.caller
+
+    collector.set_slow_query_threshold(None)
+    eq_(collector._request_cls.pre, [])
+
+
+def test_slow_query_threshold():
+    collector = make_collector()
+    log = collector.set_slow_query_threshold(60)
+    fake_request(collector, data={'script': 'g.v(1)'})
+    eq_(log.slowest(), [])
+
+
+def test_count_rows():
+    eq_(metrics.count_rows('{"columns":["n"], "data":[[1], [2]]}'), 2)
+    eq_(metrics.count_rows('[]'), 0)
+    eq_(metrics.count_rows('"true"'), 1)
+    eq_(metrics.count_rows(''), 0)
+
+
+def test_query_fingerprint():
+    from neo4django.db import models
+
+    class FingerprintPerson(models.NodeModel):
+        name = models.StringProperty(indexed=True)
+        age = models.IntegerProperty()
+
+    objects = FingerprintPerson.objects
+    a = objects.filter(name='Pete', age__gte=3).query
+    b = objects.filter(name='Sandra', age__gte=40).query
+    c = objects.filter(name__startswith='Pete', age__gte=3).query
+    d = objects.filter(name='Pete', age__gte=3).order_by('age')[:5].query
+    eq_(a.fingerprint(), b.fingerprint())
+    assert a.fingerprint() != c.fingerprint()
+    assert a.fingerprint() != d.fingerprint()
+    assert 'name__exact' in a.shape()
+    assert 'Pete' not in a.shape()
+
+
+def test_relationship_query_fingerprint():
+    from neo4django.db import models
+
+    class FingerprintRival(models.NodeModel):
+        friends = models.Relationship('self', rel_type='friends_with',
+                                      related_name='befriended_by')
+        enemies = models.Relationship('self', rel_type='feuds_with',
+                                      related_name='feuded_with_by')
+
+    rival, other = FingerprintRival(), FingerprintRival()
+    eq_(rival.friends.all().query.fingerprint(),
+        other.friends.all().query.fingerprint())
+    assert (rival.friends.all().query.fingerprint() !=
+            rival.enemies.all().query.fingerprint())
+    assert 'feuds_with' in rival.enemies.all().query.shape()
@@ -90,6 +90,25 @@ def test_type_nodes():
     assert len(test_type_nodes) != 0, 'SecondTestType type node does not exist.'
     assert len(test_type_nodes) <= 1, 'There are multiple SecondTestType type nodes.'
 
+def test_type_node_cache():
+    """Tests that type nodes are resolved once per connection, until cleandb."""
+    from neo4django.testcases import NumRequestsProfiler
+
+    class CachedType(models.NodeModel):
+        class Meta:
+            app_label = 'type_node_cache_test'
+
+    CachedType.objects.create()
+    with NumRequestsProfiler(gdb, None) as profiler:
+        type_node = CachedType._type_node('default')
+    eq_(profiler.num, 0)
+    eq_(CachedType._type_node_ref('default'), type_node.id)
+
+    gdb.cleandb()
+    eq_(CachedType._type_node_ref('default'), CachedType._type_hierarchy())
+    n = CachedType.objects.create()
+    eq_(CachedType.objects.get(id=n.id).id, n.id)
+
 def test_model_inheritance():
     #TODO docstring
     class TypeOPerson(Person):
@@ -214,3 +233,36 @@ def test_model_pickling():
 
     pickle_eq(garfield, restored_saved_garfield)
     pickle_eq(jerry, list(restored_saved_garfield.chases.all())[0])
+
+def test_unit_of_work():
+    """
+    Confirm models saved in a unit of work are saved together, with their
+    relationships, when it ends.
+    """
+    from neo4django import unit_of_work
+    from neo4django.testcases import NumRequestsProfiler
+    from .models import IndexedMouse, RelatedCat
+
+    with NumRequestsProfiler(gdb, None) as profiler:
+        with unit_of_work():
+            tom = RelatedCat(name='Tom')
+            tom.save()
+            mice = [IndexedMouse(name=name) for name in ('Jerry', 'Tuffy')]
+            tom.chases.add(*mice)
+            tom.save()
+            assert tom.id is None
+    eq_(profiler.num, 1)
+
+    assert tom.id is not None
+    eq_(IndexedMouse.objects.get(name='Tuffy').id, mice[1].id)
+    eq_(set(m.name for m in RelatedCat.objects.get(id=tom.id).chases.all()),
+        set(['Jerry', 'Tuffy']))
+
+    # nothing is saved if the block raises
+    try:
+        with unit_of_work():
+            IndexedMouse(name='Speedy').save()
+            raise ValueError
+    except ValueError:
+        pass
+    eq_(len(IndexedMouse.objects.filter(name='Speedy')), 0)
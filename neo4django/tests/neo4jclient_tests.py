@@ -70,3 +70,17 @@ def test_custom_clients_same_database():
         pass
     else:
         raise AssertionError('Default database should not have access to do_something()')
+
+@with_setup(None, teardown)
+def test_closure_cache_stats():
+    #a closure the server won't have compiled yet
+    increment = random.randint(1000, 1000000)
+    params = {'closure': '{i -> i + %d}' % increment}
+    script = 'results = Neo4Django.singleArgEval(closure, 1)'
+    before = connection.closure_cache_stats()
+    for i in xrange(2):
+        eq_(connection.gremlin(script, **params), increment + 1)
+    after = connection.closure_cache_stats()
+    eq_(after['misses'] - before['misses'], 1)
+    eq_(after['hits'] - before['hits'], 1)
+    assert after['size'] <= after['capacity']
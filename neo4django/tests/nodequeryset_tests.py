@@ -51,6 +51,37 @@ def test_delete():
         raise AssertionError("Jack's pk is still in the graph- he wasn't "
                              "deleted.")
 
+@with_setup(None, teardown)
+def test_delete_counts_and_index():
+    """Confirm bulk deletes remove relationships and index entries."""
+    cat = RelatedCat.objects.create(name='Tom')
+    mice = [IndexedMouse.objects.create(name='Jerry', age=i) for i in xrange(3)]
+    cat.chases = mice
+    cat.save()
+
+    counts = IndexedMouse.objects.filter(name='Jerry', age__lt=2).delete()
+    eq_(counts, {'nodes': 2, 'relationships': 4})
+    eq_([m.age for m in IndexedMouse.objects.filter(name='Jerry')], [2])
+    eq_(len(RelatedCat.objects.get(name='Tom').chases.all()), 1)
+
+@with_setup(None, teardown)
+def test_delete_related_skips_loading():
+    """
+    Confirm bulk deletes of related models don't load them, and that related
+    object caches forget the deleted models.
+    """
+    from neo4django.testcases import NumRequestsProfiler
+
+    cat = RelatedCat.objects.create(name='Tom')
+    cat.chases = [IndexedMouse.objects.create(name='Jerry', age=i)
+                  for i in xrange(3)]
+    cat.save()
+    eq_(len(cat.chases.all()), 3)
+
+    with NumRequestsProfiler(gdb, lambda n: eq_(n, 1)):
+        IndexedMouse.objects.filter(age__lt=2).delete()
+    eq_([m.age for m in cat.chases.all()], [2])
+
 @with_setup(None, teardown)
 def test_iter():
     """Confirm 'all()' is iterable."""
@@ -391,6 +422,124 @@ def test_filter_date_range():
     query = Lifetime.objects.filter(tod__gt=the_singularity)
     eq_(len(query), 2)
 
+@with_setup(None, teardown)
+def test_filter_range_encodings():
+    """
+    Confirm indexed range lookups work for negative integers, datetimes saved
+    with different offsets and strings, including open-ended bounds.
+    """
+    from dateutil.tz import tzutc, tzoffset
+    from neo4django.db.models.properties import MAX_INT
+
+    class Reading(models.NodeModel):
+        value = models.IntegerProperty(indexed=True)
+        taken = models.DateTimeProperty(indexed=True)
+        label = models.StringProperty(indexed=True)
+
+    time = datetime.datetime
+    readings = [(-100, time(2013, 1, 1, 12, tzinfo=tzutc()), u'Banana'),
+                (-5, time(2013, 1, 1, 9, tzinfo=tzoffset(None, -14400)), u'Zed'),
+                (0, time(2013, 1, 1, 14, tzinfo=tzutc()), u'apple'),
+                (7, time(2013, 1, 2, tzinfo=tzutc()), u'apple pie'),
+                (MAX_INT, time(2013, 1, 3, tzinfo=tzutc()), u'b')]
+    for value, taken, label in readings:
+        Reading.objects.create(value=value, taken=taken, label=label)
+
+    def values(qs):
+        return sorted(r.value for r in qs)
+
+    eq_(values(Reading.objects.filter(value__lt=0)), [-100, -5])
+    eq_(values(Reading.objects.filter(value__gt=-6)), [-5, 0, 7, MAX_INT])
+    eq_(values(Reading.objects.filter(value__gte=MAX_INT)), [MAX_INT])
+    eq_(values(Reading.objects.filter(value__range=(-5, 7))), [-5, 0, 7])
+
+    # 9am at -04:00 is 1pm UTC
+    eq_(values(Reading.objects.filter(
+            taken__gt=time(2013, 1, 1, 12, 30, tzinfo=tzutc()),
+            taken__lte=time(2013, 1, 1, 14, tzinfo=tzutc()))), [-5, 0])
+
+    eq_(values(Reading.objects.filter(label__gt=u'apple')), [7, MAX_INT])
+    eq_(values(Reading.objects.filter(label__lt=u'a')), [-100, -5])
+
+    lowest = Reading.objects.filter(value__gte=-100).order_by('value')[:3]
+    eq_(lowest.query.as_groovy(DEFAULT_DB_ALIAS)[1]['sortKey'], 'value')
+    eq_([r.value for r in lowest], [-100, -5, 0])
+    first = Reading.objects.filter(label__gte=u'B').order_by('label')[:2]
+    eq_(first.query.as_groovy(DEFAULT_DB_ALIAS)[1]['sortKey'], 'label.range')
+    eq_([r.label for r in first], [u'Banana', u'Zed'])
+
+@with_setup(None, teardown)
+def test_filter_range_long_strings():
+    """
+    Confirm range lookups and index sorting use the whole value of strings
+    longer than a fulltext index token.
+    """
+    class Quote(models.NodeModel):
+        text = models.StringProperty(indexed=True)
+
+    prefix = u'a' * 70
+    for end in [u'b', u'd', u'c']:
+        Quote.objects.create(text=prefix + end)
+
+    def ends(qs):
+        return [q.text[len(prefix):] for q in qs]
+
+    eq_(sorted(ends(Quote.objects.filter(text__gt=prefix + u'b'))),
+        [u'c', u'd'])
+    eq_(sorted(ends(Quote.objects.filter(
+            text__range=(prefix + u'b', prefix + u'c')))), [u'b', u'c'])
+
+    last = Quote.objects.filter(text__gte=prefix).order_by('-text')[:2]
+    eq_(last.query.as_groovy(DEFAULT_DB_ALIAS)[1]['sortKey'], 'text.range')
+    eq_(ends(last), [u'd', u'c'])
+
+@with_setup(None, teardown)
+def test_filter_derived_keys():
+    """
+    Confirm case-insensitive, prefix and suffix lookups on properties indexed
+    in lowercase and reversed use the index and find the right nodes.
+    """
+    class Place(models.NodeModel):
+        name = models.StringProperty(indexed=True, indexed_lowercase=True,
+                                     indexed_reversed=True)
+
+    for name in [u'New York', u'new haven', u'Newark', u'York', u'Old Haven']:
+        Place.objects.create(name=name)
+
+    def names(qs):
+        eq_(qs.explain().strategy, 'index')
+        return sorted(p.name for p in qs)
+
+    eq_(names(Place.objects.filter(name__iexact=u'NEW YORK')), [u'New York'])
+    eq_(names(Place.objects.filter(name__istartswith=u'new ')),
+        [u'New York', u'new haven'])
+    eq_(names(Place.objects.filter(name__startswith=u'New')),
+        [u'New York', u'Newark'])
+    eq_(names(Place.objects.filter(name__icontains=u'HAVEN')),
+        [u'Old Haven', u'new haven'])
+    eq_(names(Place.objects.filter(name__endswith=u'York')),
+        [u'New York', u'York'])
+    eq_(names(Place.objects.filter(name__iendswith=u'haven')),
+        [u'Old Haven', u'new haven'])
+
+    place = Place.objects.get(name=u'Newark')
+    place.name = u'Newark Bay'
+    place.save()
+    eq_(names(Place.objects.filter(name__iendswith=u'ark')), [])
+    eq_(names(Place.objects.filter(name__iendswith=u'bay')), [u'Newark Bay'])
+
+    # patterns longer than a fulltext index token still match whole values
+    long_name = u'Lake ' + u'Chargoggagogg' * 6 + u' Harbor'
+    Place.objects.create(name=long_name)
+    eq_(names(Place.objects.filter(name__iexact=long_name.upper())),
+        [long_name])
+    eq_(names(Place.objects.filter(name__startswith=long_name[:70])),
+        [long_name])
+    eq_(names(Place.objects.filter(name__endswith=long_name[-70:])),
+        [long_name])
+    eq_(names(Place.objects.filter(name__icontains=long_name[55:75])),
+        [long_name])
+
 @with_setup(None, teardown)
 def test_filter_array_member():
     """
@@ -626,6 +775,63 @@ def test_in_bulk_not_found():
     people = Person.objects.in_bulk([999999])
     eq_(people, {})
 
+@with_setup(None, teardown)
+def test_in_bulk_batches():
+    """
+    Tests QuerySet.in_bulk() keeps the order ids were given in, across
+    batches, and only returns models in the queryset.
+    """
+    from django.conf import settings
+    from neo4django.testcases import NumRequestsProfiler
+
+    people = [Person.objects.create(name=str(i), age=i) for i in xrange(5)]
+    ids = [p.id for p in reversed(people)]
+
+    settings.NEO4DJANGO_IN_BULK_BATCH_SIZE = 2
+    try:
+        with NumRequestsProfiler(gdb, lambda n: eq_(n, 3)):
+            found = Person.objects.in_bulk(ids + [999999, ids[0]])
+        eq_(found.keys(), ids)
+        eq_([p.name for p in found.values()], ['4', '3', '2', '1', '0'])
+
+        eq_(Person.objects.filter(age__gte=3).in_bulk(ids).keys(), ids[:2])
+    finally:
+        del settings.NEO4DJANGO_IN_BULK_BATCH_SIZE
+
+@with_setup(None, teardown)
+def test_keyset_pagination():
+    """
+    Tests paging through a queryset with after() and cursor(), breaking ties
+    by id and leaving out models without a value for the ordering.
+    """
+    people = [Person.objects.create(name=str(i), age=a)
+              for i, a in enumerate([3, 1, 3, 2, 3, 1])]
+    Person.objects.create(name='ageless')
+
+    def pages(ordering, size=2):
+        qs = Person.objects.order_by(ordering)
+        cursor, names = None, []
+        while True:
+            page = list(qs.after(cursor)[:size])
+            names.extend(p.name for p in page)
+            if len(page) < size:
+                return names
+            cursor = qs.cursor(page[-1])
+
+    by_age = sorted(people, key=lambda p: (p.age, p.id))
+    eq_(pages('age'), [p.name for p in by_age])
+    by_age_desc = sorted(people, key=lambda p: (-p.age, p.id))
+    eq_(pages('-age', size=4), [p.name for p in by_age_desc])
+
+    # the cursor has to match the ordering
+    cursor = Person.objects.order_by('age').cursor(people[0])
+    try:
+        list(Person.objects.order_by('age', 'name').after(cursor))
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("A cursor for another ordering was accepted.")
+
 cat_names = ['Tom', 'Mr. Pussy-Wussy', 'Mr. Bigglesworth']
 dog_names = ['Spike','Lassie','Clifford']
 def setup_chase():
@@ -703,6 +909,80 @@ def test_pk_shortcut():
     tom = RelatedCat.objects.get(chases__pk=jerry.id)
     eq_(tom.name, 'Tom')
 
+@with_setup(setup_chase, teardown)
+def test_traverse():
+    """
+    Tests traversing relationship paths, variable-length relationships,
+    filtering the models reached and returning paths.
+    """
+    class Acquaintance(models.NodeModel):
+        name = models.StringProperty()
+        knows = models.Relationship('self', rel_type='knows')
+
+    a, b, c, d = [Acquaintance(name=n) for n in 'abcd']
+    for x, y in [(a, b), (b, c), (c, d), (a, c)]:
+        x.knows.add(y)
+    for x in (a, b, c, d):
+        x.save()
+
+    def names(qs):
+        return sorted(m.name for m in qs)
+
+    spike = RelatedDog.objects.get(name='Spike')
+    eq_(names(IndexedMouse.objects.traverse(spike, 'chases__chases')),
+        ['jerry'])
+    eq_(names(Acquaintance.objects.traverse(a, 'knows', 2, 2)), ['c', 'd'])
+    eq_(names(Acquaintance.objects.traverse(a, 'knows', 1, None)),
+        ['b', 'c', 'd'])
+    eq_(len(Acquaintance.objects.traverse(a.id, 'knows', 1, None,
+                                           unique=False)), 5)
+    eq_(names(Acquaintance.objects.traverse([b, c], 'knows')
+                                  .filter(name__in=['c', 'd'])), ['c', 'd'])
+
+    paths = Acquaintance.objects.traverse(a, 'knows', 3, 3).paths()
+    eq_(len(paths), 1)
+    eq_([m.name for m in paths[0][::2]], ['a', 'b', 'c', 'd'])
+    eq_([r.type for r in paths[0][1::2]], ['knows'] * 3)
+
+    try:
+        Acquaintance.objects.traverse(a, 'knows__knows', 1, 2)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError('A multi-relationship path was given depths.')
+
+@with_setup(setup_chase, teardown)
+def test_shortest_paths():
+    """
+    Tests finding shortest paths between models in one request, in either
+    direction, only along the given relationships.
+    """
+    from neo4django.testcases import NumRequestsProfiler
+
+    spike = RelatedDog.objects.get(name='Spike')
+    jerry = IndexedMouse.objects.get(name='jerry')
+
+    with NumRequestsProfiler(gdb, lambda n: eq_(n, 1)):
+        path = RelatedDog.objects.shortest_path(jerry, spike)
+    eq_([m.name for m in path[::2]], ['jerry', 'Tom', 'Spike'])
+    eq_([r.type for r in path[1::2]], ['chases', 'chases'])
+
+    eq_(RelatedDog.objects.shortest_path(jerry, spike, max_depth=1), None)
+    eq_(len(RelatedDog.objects.all_shortest_paths(spike, jerry.id)), 1)
+
+    eq_(len(RelatedDog.objects.shortest_path(spike, jerry, via=['chases'])),
+        5)
+
+    # dogs are only connected through their type nodes, which aren't followed
+    lassie = RelatedDog.objects.get(name='Lassie')
+    eq_(RelatedDog.objects.shortest_path(spike, lassie), None)
+
+    # there are no paths to deleted or unknown nodes
+    lassie_id = lassie.id
+    lassie.delete()
+    eq_(RelatedDog.objects.shortest_path(spike, lassie_id), None)
+    eq_(RelatedDog.objects.all_shortest_paths(lassie_id, spike), [])
+
 @with_setup(None, teardown)
 def test_large_query():
     ages = range(1, 151)
@@ -912,3 +1192,121 @@ def test_update():
     # and an unindexed field
     Person.objects.filter(age=20).update(name='Twenty')
     eq_(twenties, set(Person.objects.filter(age=20)))
+
+@with_setup(setup_people, teardown)
+def test_query_string():
+    """
+    Confirm `query_string()` returns the Cypher and params for a queryset.
+    """
+    jack = Person.objects.get(name='Jack')
+    cypher, params = Person.objects.filter(id=jack.id).query_string()
+    assert cypher.startswith('START'), cypher
+    assert jack.id in params['n_startParam']
+
+    eq_(Person.objects.filter(id__in=[1, 2]).filter(id__in=[3]).query_string(),
+        (None, None))
+
+@with_setup(setup_mice_and_people, teardown)
+def test_explain():
+    """
+    Confirm `explain()` reports how a queryset finds its starting nodes.
+    """
+    jack = Person.objects.get(name='Jack')
+    eq_(Person.objects.filter(id=jack.id).explain().strategy, 'id')
+
+    plan = IndexedMouse.objects.filter(name='jerry').explain()
+    eq_(plan.strategy, 'index')
+    eq_(len(plan.index_queries), 1)
+    eq_(plan.plan, None)
+
+    eq_(Person.objects.filter(name='Jack').explain().strategy, 'type_tree')
+
+@with_setup(setup_people, teardown)
+def test_profile():
+    """
+    Confirm `profile()` returns the server's execution plan with db hits.
+    """
+    from nose.plugins.skip import SkipTest
+    if gdb.VERSION and gdb.VERSION.startswith('1.8'):
+        try:
+            Person.objects.filter(name='Jack').profile()
+        except NotImplementedError:
+            raise SkipTest('Profiling requires Neo4j 1.9.')
+        raise AssertionError('profile() ran on Neo4j 1.8.')
+
+    plan = Person.objects.filter(name='Jack').profile()
+    eq_(plan.strategy, 'type_tree')
+
+    def steps(step):
+        yield step
+        for child in step['children']:
+            for s in steps(child):
+                yield s
+    all_steps = list(steps(plan.plan))
+    assert all(s['name'] for s in all_steps)
+    assert sum(s['dbHits'] for s in all_steps) > 0
+
+@with_setup(None, teardown)
+def test_index_top_hits():
+    """
+    Confirm sliced index queries only fetching the top index hits return the
+    same results as slicing every hit, even when some hits are filtered out.
+    """
+    class Event(models.NodeModel):
+        kind = models.StringProperty(indexed=True)
+        day = models.DateProperty(indexed=True)
+        public = models.BooleanProperty()
+        room = models.StringProperty(indexed=True, index_type='exact')
+
+    start = datetime.date(2013, 1, 1)
+    for i in xrange(30):
+        Event.objects.create(kind='talk', day=start + datetime.timedelta(i),
+                             public=(i % 3 == 0), room='hall')
+
+    def ids(qs):
+        return [e.id for e in qs]
+
+    talks = Event.objects.filter(kind='talk')
+    eq_(ids(talks[3:8]), ids(talks)[3:8])
+    eq_(talks[3:8].query.as_groovy(DEFAULT_DB_ALIAS)[1]['maxHits'], 8)
+
+    public = talks.filter(public=True)
+    eq_(ids(public[2:6]), ids(public)[2:6])
+
+    # intersections of queries on separate indexes need every hit
+    in_hall = talks.filter(room='hall')
+    assert 'maxHits' not in in_hall[3:8].query.as_groovy(DEFAULT_DB_ALIAS)[1]
+    eq_(ids(in_hall[3:8]), ids(talks)[3:8])
+
+    latest = talks.filter(day__gte=start).order_by('-day')
+    params = latest[:4].query.as_groovy(DEFAULT_DB_ALIAS)[1]
+    eq_((params['sortKey'], params['sortReverse']), ('day', True))
+    eq_([e.day for e in latest[:4]],
+        [start + datetime.timedelta(i) for i in xrange(29, 25, -1)])
+    eq_(ids(latest.filter(public=True)[:4]),
+        ids(latest.filter(public=True))[:4])
+
+@with_setup(setup_mice, teardown)
+def test_index_plans():
+    """
+    Confirm indexed conditions combined with OR and NOT find the right nodes.
+    """
+    def names(qs):
+        return sorted(m.name for m in qs)
+
+    either = IndexedMouse.objects.filter(Q(name='jerry') | Q(age=3))
+    eq_(either.explain().strategy, 'index')
+    eq_(names(either), ['Brain', 'jerry'])
+
+    # negated index queries can't be run alone, so use the type tree
+    not_jerry = IndexedMouse.objects.filter(~Q(name='jerry'))
+    eq_(not_jerry.explain().strategy, 'type_tree')
+    eq_(names(not_jerry), ['Brain', 'Pinky'])
+
+    young_not_jerry = IndexedMouse.objects.filter(~Q(name='jerry'), age=2)
+    eq_(young_not_jerry.explain().strategy, 'index')
+    eq_(names(young_not_jerry), ['Pinky'])
+
+    eq_(names(IndexedMouse.objects.filter(Q(name='jerry') | Q(name='Pinky'),
+                                          Q(age=2) | Q(age=3))),
+        ['Pinky', 'jerry'])
@@ -379,3 +379,74 @@ def test_auto_property():
     #make sure the two child classes share an id 'collision domain'
     nodes = [ConcreteAutoNode2.objects.create() for i in xrange(6, 11)]
     eq_([n.some_id for n in nodes], range(6, 11))
+
+@with_setup(None, teardown)
+def test_save_changed_properties():
+    from neo4django.testcases import NumRequestsProfiler
+
+    class ChangedNode(models.NodeModel):
+        name = models.StringProperty()
+        age = models.IntegerProperty(indexed=True)
+
+    n = ChangedNode.objects.create(name='Pete', age=30)
+    loaded = ChangedNode.objects.get(id=n.id)
+
+    # nothing changed, so nothing should be sent
+    with NumRequestsProfiler(gdb, None) as profiler:
+        loaded.save()
+    eq_(profiler.num, 0)
+
+    # setting an equal value isn't a change
+    loaded.age = 30
+    eq_(loaded._property_map(loaded, loaded.node, False), {})
+
+    loaded.name = 'Peter'
+    eq_(loaded._property_map(loaded, loaded.node, False).keys(), ['name'])
+    loaded.save()
+    eq_(ChangedNode.objects.get(id=n.id).name, 'Peter')
+    eq_(ChangedNode.objects.get(age=30).id, n.id)
+
+@with_setup(None, teardown)
+def test_auto_property_blocks():
+    from neo4django.testcases import NumRequestsProfiler
+
+    class BlockAutoNode(models.NodeModel):
+        some_id = models.AutoProperty()
+
+    settings.NEO4DJANGO_AUTO_PROPERTY_BLOCK_SIZE = 3
+    try:
+        nodes = [BlockAutoNode.objects.create() for i in xrange(2)]
+        #the rest of the block shouldn't need another request
+        with NumRequestsProfiler(gdb, lambda n: eq_(n, 2)):
+            nodes.append(BlockAutoNode.objects.create())
+        nodes.append(BlockAutoNode.objects.create())
+        eq_([n.some_id for n in nodes], range(1, 5))
+
+        #another process would skip the values reserved by this one
+        gdb.caches.clear()
+        eq_(BlockAutoNode.objects.create().some_id, 7)
+    finally:
+        del settings.NEO4DJANGO_AUTO_PROPERTY_BLOCK_SIZE
+
+def test_range_index_terms_sort():
+    """
+    Confirm range index terms sort like their values, including negative
+    integers and datetimes with different offsets.
+    """
+    from neo4django.db.models.properties import MIN_INT, MAX_INT
+
+    def assert_sorted(prop, values):
+        terms = [prop.to_neo_range_index(v) for v in values]
+        eq_(terms, sorted(terms))
+        assert all(prop.INDEX_MIN < t < prop.INDEX_MAX for t in terms)
+
+    assert_sorted(models.IntegerProperty(),
+                  [MIN_INT, -100, -5, 0, 7, 10, MAX_INT])
+    assert_sorted(models.DateTimeProperty(),
+                  [datetime.datetime(2013, 1, 1, 12, tzinfo=tzutc()),
+                   datetime.datetime(2013, 1, 1, 9, tzinfo=tzoffset(None, -14400)),
+                   datetime.datetime(2013, 1, 1, 14, tzinfo=tzutc()),
+                   datetime.datetime(2013, 1, 1, 14, 0, 0, 1, tzinfo=tzutc())])
+    assert_sorted(models.StringProperty(),
+                  [u'Banana', u'Zed', u'apple', u'apple pie', u'b',
+                   u'\xe9clair'])
@@ -615,3 +615,97 @@ def test_conflicting_rel_types():
             second_rel = models.Relationship('self', rel_type=neo4django.Outgoing.CONFLICTS_WITH)
 
         assert len(w) > 0
+
+@with_setup(None, teardown)
+def test_batched_relationship_save():
+    """
+    Confirm all relationship changes for an instance are saved together, and
+    that ordered relationships keep their order across saves.
+    """
+    from neo4django.testcases import NumRequestsProfiler
+
+    class Tag(models.NodeModel):
+        name = models.StringProperty()
+
+    class TaggedDocument(models.NodeModel):
+        tags = models.Relationship(Tag, rel_type='tagged_with',
+                                   preserve_ordering=True)
+        authors = models.Relationship(Person, rel_type='written_by')
+
+    tags = [Tag.objects.create(name=str(i)) for i in xrange(30)]
+    authors = [Person.objects.create(name=str(i)) for i in xrange(3)]
+
+    doc = TaggedDocument()
+    doc.save()
+    doc.tags.add(*tags[:20])
+    doc.authors.add(*authors)
+    with NumRequestsProfiler(gdb, None) as profiler:
+        doc.save()
+    # saving the node itself, then all relationships at once
+    assert profiler.num <= 3, profiler.num
+
+    doc.tags.remove(tags[0])
+    doc.tags.add(*tags[20:])
+    doc.save()
+
+    same_doc = TaggedDocument.objects.get(id=doc.id)
+    eq_([t.name for t in same_doc.tags.all()], [str(i) for i in xrange(1, 30)])
+    eq_(set(same_doc.authors.all()), set(authors))
+
+@with_setup(None, teardown)
+def test_bulk_connect():
+    """
+    Confirm `bulk_connect()` relates existing nodes by id.
+    """
+    class Topic(models.NodeModel):
+        value = models.StringProperty()
+
+    class Outline(models.NodeModel):
+        topics = models.Relationship(Topic, rel_type='outlines',
+                                     preserve_ordering=True,
+                                     related_name='outlines')
+
+    outline = Outline.objects.create()
+    topics = [Topic.objects.create(value=str(i)) for i in xrange(10)]
+    outline.topics.add(topics[0])
+    outline.save()
+
+    created = Outline.topics.bulk_connect(
+        [(outline.id, t.id) for t in topics[1:5]] +
+        [(outline.id, t.id, {'weight': 2}) for t in topics[5:]],
+        batch_size=3)
+    eq_(created, 9)
+
+    outline = Outline.objects.get(id=outline.id)
+    eq_([t.value for t in outline.topics.all()], [str(i) for i in xrange(10)])
+    eq_(list(topics[7].outlines.all()), [outline])
+
+@with_setup(None, teardown)
+def test_ordered_slicing():
+    """
+    Confirm ordered relationships keep their order when appended to, sliced,
+    and loaded with select_related.
+    """
+    class Track(models.NodeModel):
+        name = models.StringProperty()
+
+    class Playlist(models.NodeModel):
+        tracks = models.Relationship(Track, rel_type='plays',
+                                     preserve_ordering=True)
+
+    tracks = [Track.objects.create(name=str(i)) for i in xrange(12)]
+    playlist = Playlist.objects.create()
+    playlist.tracks.add(*reversed(tracks[:6]))
+    playlist.save()
+    playlist.tracks.add(*reversed(tracks[6:]))
+    playlist.save()
+    expected = [t.name for t in reversed(tracks[:6])] + \
+               [t.name for t in reversed(tracks[6:])]
+
+    playlist = Playlist.objects.get(id=playlist.id)
+    eq_([t.name for t in playlist.tracks.all()[3:8]], expected[3:8])
+    eq_([t.name for t in playlist.tracks.all()[10:]], expected[10:])
+    eq_([t.name for t in playlist.tracks.order_by('name')[:2]], ['0', '1'])
+
+    playlist = Playlist.objects.filter(id=playlist.id).select_related(depth=1)[0]
+    eq_([m.name for r, m in playlist.tracks._cache], expected)
@@ -1,3 +1,5 @@
+from itertools import count
+
 from mock import Mock, patch
 from nose.tools import with_setup, raises
 from pretend import stub
@@ -364,3 +366,11 @@ def test_buffer_iterator():
     expected = [0, 1, 4, 9, 16]
     ret = [x for x in utils.buffer_iterator(lambda x: x**2, xrange(5), size=2)]
     assert_list_equal(ret, expected)
+
+
+def test_chunked():
+    assert_list_equal(list(utils.chunked(xrange(5), 2)), [[0, 1], [2, 3], [4]])
+    assert_list_equal(list(utils.chunked([], 2)), [])
+    # generators should be consumed lazily
+    chunks = utils.chunked(count(), 3)
+    assert_list_equal(chunks.next(), [0, 1, 2])
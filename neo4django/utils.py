@@ -160,6 +160,22 @@ def apply_to_buffer(constructor, items, size=1):
     return result
 
 
+def chunked(items, size):
+    """
+    Generator that yields lists of at most `size` consecutive values from an
+    iterable. For example::
+
+        >>> list(chunked(xrange(5), 2))
+        [[0, 1], [2, 3], [4]]
+    """
+    iteritems = iter(items)
+    while True:
+        chunk = list(itertools.islice(iteritems, size))
+        if not chunk:
+            return
+        yield chunk
+
+
 def countdown(number):
     """
     A method that returns a new method that will return True `number` amount
@@ -11,7 +11,8 @@ setup(
     packages=['neo4django','neo4django.graph_auth','neo4django.db',
               'neo4django.db.models','neo4django.tests', 'neo4django.gremlin',
               'neo4django.admin', 'neo4django.admin.templatetags', 
-              'neo4django.contenttypes'],
+              'neo4django.contenttypes', 'neo4django.management',
+              'neo4django.management.commands'],
     package_dir={'neo4django':'neo4django'},
     package_data={'neo4django':['gremlin/*.groovy']},
     long_description=open('README.rst').read(),